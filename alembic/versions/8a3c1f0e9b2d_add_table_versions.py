@@ -0,0 +1,88 @@
+"""add table_versions + change notify triggers
+
+Revision ID: 8a3c1f0e9b2d
+Revises: 6b2e0f1c5d7a
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8a3c1f0e9b2d"
+down_revision: Union[str, Sequence[str], None] = "6b2e0f1c5d7a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 변경 감지 대상 (RAG 임베딩 테이블)
+TRACKED_TABLES = ("schema_embeddings", "fewshot_embeddings")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("table_versions"):
+        op.create_table(
+            "table_versions",
+            sa.Column("table_name", sa.String(), nullable=False),
+            sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"),
+            sa.Column(
+                "updated_at",
+                sa.DateTime(timezone=True),
+                nullable=False,
+                server_default=sa.func.now(),
+            ),
+            sa.PrimaryKeyConstraint("table_name", name="pk_table_versions"),
+        )
+
+    # 문장 단위 트리거: 버전 +1 후 table_changed 채널로 테이블명 NOTIFY
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO table_versions (table_name, version, updated_at)
+            VALUES (TG_TABLE_NAME, 1, now())
+            ON CONFLICT (table_name)
+            DO UPDATE SET version = table_versions.version + 1, updated_at = now();
+            PERFORM pg_notify('table_changed', TG_TABLE_NAME);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+    # 아직 없는 테이블은 e5f7a9b1c3d4에서 생성 후 트리거 연결
+    for table in TRACKED_TABLES:
+        if inspector.has_table(table):
+            _create_version_trigger(table)
+
+
+def _create_version_trigger(table: str) -> None:
+    op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_version ON {table};")
+    op.execute(
+        f"""
+        CREATE TRIGGER trg_{table}_version
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TRACKED_TABLES:
+        op.execute(
+            f"""
+            DO $$
+            BEGIN
+                IF to_regclass('{table}') IS NOT NULL THEN
+                    DROP TRIGGER IF EXISTS trg_{table}_version ON {table};
+                END IF;
+            END $$;
+            """
+        )
+    op.execute("DROP FUNCTION IF EXISTS bump_table_version();")
+    op.drop_table("table_versions")
@@ -0,0 +1,47 @@
+"""add embedding_cache
+
+Revision ID: 9b4d2a1c7e3f
+Revises: 8a3c1f0e9b2d
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9b4d2a1c7e3f"
+down_revision: Union[str, Sequence[str], None] = "8a3c1f0e9b2d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("embedding_cache"):
+        op.create_table(
+            "embedding_cache",
+            # sha256(model + 정규화 텍스트)
+            sa.Column("cache_key", sa.String(), nullable=False),
+            sa.Column("model", sa.String(), nullable=False),
+            sa.Column("embedding", postgresql.ARRAY(sa.REAL()), nullable=False),
+            sa.Column(
+                "created_at",
+                sa.DateTime(timezone=True),
+                nullable=False,
+                server_default=sa.func.now(),
+            ),
+            sa.PrimaryKeyConstraint("cache_key", name="pk_embedding_cache"),
+        )
+        op.create_index("ix_embedding_cache_created_at", "embedding_cache", ["created_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_embedding_cache_created_at", table_name="embedding_cache")
+    op.drop_table("embedding_cache")
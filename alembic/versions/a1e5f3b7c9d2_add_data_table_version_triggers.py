@@ -0,0 +1,44 @@
+"""add version triggers on data tables
+
+Revision ID: a1e5f3b7c9d2
+Revises: 9b4d2a1c7e3f
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a1e5f3b7c9d2"
+down_revision: Union[str, Sequence[str], None] = "9b4d2a1c7e3f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 쿼리 결과 캐시 무효화 대상 (bump_table_version()은 8a3c1f0e9b2d에서 생성)
+DATA_TABLES = ("fact_production_daily", "fact_order_daily", "dim_process", "dim_worker")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for table in DATA_TABLES:
+        if not inspector.has_table(table):
+            continue
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_version ON {table};")
+        op.execute(
+            f"""
+            CREATE TRIGGER trg_{table}_version
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in DATA_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_version ON {table};")
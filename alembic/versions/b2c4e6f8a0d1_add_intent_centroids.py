@@ -0,0 +1,52 @@
+"""add intent_centroids
+
+Revision ID: b2c4e6f8a0d1
+Revises: a1e5f3b7c9d2
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b2c4e6f8a0d1"
+down_revision: Union[str, Sequence[str], None] = "a1e5f3b7c9d2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("intent_centroids"):
+        # fewshot_embeddings와 같은 모델(text-embedding-3-small, 1536차원)의 의도별 평균 벡터
+        op.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+        op.execute(
+            """
+            CREATE TABLE intent_centroids (
+                intent TEXT PRIMARY KEY,
+                embedding vector(1536) NOT NULL,
+                n_examples INTEGER NOT NULL,
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            );
+            """
+        )
+    # 다시 빌드하면 API 프로세스가 NOTIFY를 받아 centroid를 다시 읽도록
+    op.execute("DROP TRIGGER IF EXISTS trg_intent_centroids_version ON intent_centroids;")
+    op.execute(
+        """
+        CREATE TRIGGER trg_intent_centroids_version
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON intent_centroids
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS trg_intent_centroids_version ON intent_centroids;")
+    op.drop_table("intent_centroids")
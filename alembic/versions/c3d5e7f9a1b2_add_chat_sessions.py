@@ -0,0 +1,47 @@
+"""add chat_sessions
+
+Revision ID: c3d5e7f9a1b2
+Revises: b2c4e6f8a0d1
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c3d5e7f9a1b2"
+down_revision: Union[str, Sequence[str], None] = "b2c4e6f8a0d1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("chat_sessions"):
+        op.create_table(
+            "chat_sessions",
+            sa.Column("session_id", sa.String(), nullable=False),
+            # [{"role": "user"|"assistant", "content": ...}, ...] (턴/토큰 상한으로 잘린 최근 대화)
+            sa.Column("messages", postgresql.JSONB(), nullable=False, server_default=sa.text("'[]'::jsonb")),
+            sa.Column("token_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column(
+                "updated_at",
+                sa.DateTime(timezone=True),
+                nullable=False,
+                server_default=sa.func.now(),
+            ),
+            sa.PrimaryKeyConstraint("session_id", name="pk_chat_sessions"),
+        )
+        op.create_index("ix_chat_sessions_updated_at", "chat_sessions", ["updated_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_chat_sessions_updated_at", table_name="chat_sessions")
+    op.drop_table("chat_sessions")
@@ -0,0 +1,51 @@
+"""add content_hash to RAG embedding tables
+
+Revision ID: d4e6f8a0b2c3
+Revises: c3d5e7f9a1b2
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d4e6f8a0b2c3"
+down_revision: Union[str, Sequence[str], None] = "c3d5e7f9a1b2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 증분 적재(scripts/embedding/ingest.py) 대상
+INGEST_TABLES = ("schema_embeddings", "fewshot_embeddings")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for table in INGEST_TABLES:
+        if not inspector.has_table(table):
+            continue
+        # 기존 행은 NULL -> 다음 적재 때 hash를 붙여 다시 넣음
+        op.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS content_hash TEXT;")
+        op.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_content_hash ON {table} (content_hash);")
+        if "created_at" in {c["name"] for c in inspector.get_columns(table)}:
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN created_at SET DEFAULT now();")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in INGEST_TABLES:
+        op.execute(
+            f"""
+            DO $$
+            BEGIN
+                IF to_regclass('{table}') IS NOT NULL THEN
+                    DROP INDEX IF EXISTS ix_{table}_content_hash;
+                    ALTER TABLE {table} DROP COLUMN IF EXISTS content_hash;
+                END IF;
+            END $$;
+            """
+        )
@@ -0,0 +1,73 @@
+"""create RAG embedding tables + version triggers
+
+Revision ID: e5f7a9b1c3d4
+Revises: d4e6f8a0b2c3
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e5f7a9b1c3d4"
+down_revision: Union[str, Sequence[str], None] = "d4e6f8a0b2c3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 8a3c1f0e9b2d / d4e6f8a0b2c3는 테이블이 있을 때만 트리거/컬럼을 붙였음
+# -> 빈 DB에서도 여기서 테이블을 만들고 변경 감지 트리거를 확실히 연결
+# (임베딩 모델 text-embedding-3-small, 1536차원, 행은 scripts/embedding/embed_schema, embed_fewshot이 적재)
+TABLES = {
+    "schema_embeddings": """
+        CREATE TABLE schema_embeddings (
+            id BIGSERIAL PRIMARY KEY,
+            doc_type TEXT NOT NULL,
+            table_name TEXT,
+            column_name TEXT,
+            content TEXT NOT NULL,
+            embedding vector(1536) NOT NULL,
+            content_hash TEXT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """,
+    "fewshot_embeddings": """
+        CREATE TABLE fewshot_embeddings (
+            id BIGSERIAL PRIMARY KEY,
+            question TEXT NOT NULL,
+            sql_example TEXT NOT NULL,
+            embedding vector(1536) NOT NULL,
+            content_hash TEXT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """,
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+    for table, ddl in TABLES.items():
+        if not inspector.has_table(table):
+            op.execute(ddl)
+            op.execute(f"CREATE INDEX ix_{table}_content_hash ON {table} (content_hash);")
+        # 이미 있던 테이블이면 8a3c1f0e9b2d에서 붙인 트리거를 같은 정의로 다시 생성
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_version ON {table};")
+        op.execute(
+            f"""
+            CREATE TRIGGER trg_{table}_version
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # 임베딩 데이터는 이 리비전 이전에도 (수동 생성 테이블로) 존재할 수 있으므로 테이블은 남김
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS trg_{table}_version ON {table};")
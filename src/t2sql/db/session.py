@@ -1,5 +1,6 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 
@@ -10,10 +11,24 @@ _raw_url = os.getenv(
 # psycopg 3 드라이버 명시 (SQLAlchemy용)
 DATABASE_URL = _raw_url.replace("postgresql://", "postgresql+psycopg://")
 
+# psycopg 자동 prepared statement
+# - 같은 SQL 텍스트가 DB_PREPARE_THRESHOLD번 실행되면 서버에 PREPARE (생성 SQL은 shapes.py에서 리터럴을 파라미터로 뺌)
+# - 커넥션마다 최대 DB_PREPARED_MAX개, 넘으면 가장 오래 안 쓴 것부터 DEALLOCATE (LRU)
+PREPARE_THRESHOLD = int(os.getenv("DB_PREPARE_THRESHOLD", "2"))
+PREPARED_MAX = int(os.getenv("DB_PREPARED_MAX", "64"))
+
+
+def _configure_prepare(dbapi_connection, connection_record):
+    conn = getattr(dbapi_connection, "driver_connection", dbapi_connection)
+    conn.prepared_max = PREPARED_MAX
+
+
 engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,
+    connect_args={"prepare_threshold": PREPARE_THRESHOLD},
 )
+event.listen(engine, "connect", _configure_prepare)
 
 SessionLocal = sessionmaker(
     bind=engine,
@@ -26,4 +41,24 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# async 경로용 (psycopg 3 async 드라이버)
+async_engine = create_async_engine(
+    DATABASE_URL,
+    pool_pre_ping=True,
+    connect_args={"prepare_threshold": PREPARE_THRESHOLD},
+)
+event.listen(async_engine.sync_engine, "connect", _configure_prepare)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
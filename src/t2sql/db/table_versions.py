@@ -0,0 +1,109 @@
+"""
+테이블 변경 감지 (table_versions + LISTEN/NOTIFY)
+- 트리거가 변경 시 table_versions.version을 올리고 'table_changed' 채널로 NOTIFY
+- TableVersionTracker는 전용 커넥션에서 LISTEN하며 메모리의 버전을 갱신하고 구독자에게 알림
+- NOTIFY를 놓쳐도 poll_interval마다 버전 테이블을 다시 읽어 보정
+"""
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+
+import psycopg
+
+from t2sql.db.vector_pool import get_vector_db_url
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "table_changed"
+
+
+def fetch_table_versions(conn: psycopg.Connection) -> Dict[str, int]:
+    with conn.cursor() as cur:
+        cur.execute("SELECT table_name, version FROM table_versions")
+        return {name: int(version) for name, version in cur.fetchall()}
+
+
+class TableVersionTracker:
+    def __init__(self, poll_interval: float = 30.0):
+        self.poll_interval = poll_interval
+        self._versions: Dict[str, int] = {}
+        self._loaded = threading.Event()
+        self._subscribers: List[Callable[[str], None]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def version(self, table: str) -> int:
+        return self._versions.get(table, 0)
+
+    def versions(self, tables) -> Dict[str, int]:
+        return {t: self._versions.get(t, 0) for t in tables}
+
+    def subscribe(self, callback: Callable[[str], None]) -> None:
+        """테이블 버전이 바뀌면 callback(table_name) 호출 (리스너 스레드에서 실행)"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="table-version-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def wait_loaded(self, timeout: float = 5.0) -> bool:
+        """최초 버전 로딩 완료까지 대기"""
+        return self._loaded.wait(timeout)
+
+    def _apply(self, versions: Dict[str, int]) -> None:
+        changed = [t for t, v in versions.items() if self.version(t) != v]
+        self._versions = {**self._versions, **versions}
+        if not self._loaded.is_set():
+            # 최초 로딩은 변경으로 보지 않음
+            self._loaded.set()
+            return
+        for table in changed:
+            for cb in list(self._subscribers):
+                try:
+                    cb(table)
+                except Exception:
+                    logger.exception("table change callback failed: %s", table)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(get_vector_db_url(), autocommit=True) as conn:
+                    conn.execute(f"LISTEN {CHANNEL}")
+                    self._apply(fetch_table_versions(conn))
+                    while not self._stop.is_set():
+                        for _ in conn.notifies(timeout=self.poll_interval, stop_after=1):
+                            break
+                        # NOTIFY 수신 또는 타임아웃 -> 버전 테이블 재조회
+                        self._apply(fetch_table_versions(conn))
+            except psycopg.errors.UndefinedTable:
+                logger.warning("table_versions 테이블이 없습니다 (alembic upgrade head 필요). 변경 감지를 끕니다.")
+                self._loaded.set()
+                return
+            except Exception:
+                logger.exception("table version listener error, retrying")
+                self._stop.wait(5)
+
+
+_tracker: Optional[TableVersionTracker] = None
+
+
+def get_table_version_tracker() -> TableVersionTracker:
+    """프로세스 공용 tracker (start()는 앱 시작 시 호출)"""
+    global _tracker
+    if _tracker is None:
+        _tracker = TableVersionTracker(
+            poll_interval=float(os.getenv("TABLE_VERSION_POLL_SECONDS", "30")),
+        )
+    return _tracker
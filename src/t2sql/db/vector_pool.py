@@ -0,0 +1,87 @@
+"""
+RAG(pgvector) 검색용 psycopg 커넥션 풀
+- 검색마다 psycopg.connect()를 새로 여는 대신 프로세스 단위로 풀을 공유
+- sync(ConnectionPool) / async(AsyncConnectionPool) 두 가지 제공
+- 설정은 환경변수로 조정 (VECTOR_POOL_*)
+"""
+import asyncio
+import os
+import threading
+from typing import Optional
+
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
+
+
+def get_vector_db_url() -> str:
+    """DATABASE_URL 환경변수에서 DB URL 가져오기"""
+    url = os.environ.get("DATABASE_URL")
+    if not url:
+        raise RuntimeError("DATABASE_URL 환경변수가 설정되지 않았습니다.")
+    # psycopg는 순수 postgresql:// 형식만 받음
+    return url.replace("postgresql+psycopg://", "postgresql://")
+
+
+def _pool_kwargs() -> dict:
+    return {
+        "min_size": int(os.getenv("VECTOR_POOL_MIN_SIZE", "1")),
+        "max_size": int(os.getenv("VECTOR_POOL_MAX_SIZE", "10")),
+        # 유휴 커넥션 정리(초) / 최대 수명(초) / 커넥션 대기 타임아웃(초)
+        "max_idle": float(os.getenv("VECTOR_POOL_MAX_IDLE", "300")),
+        "max_lifetime": float(os.getenv("VECTOR_POOL_MAX_LIFETIME", "3600")),
+        "timeout": float(os.getenv("VECTOR_POOL_TIMEOUT", "30")),
+    }
+
+
+_pool: Optional[ConnectionPool] = None
+_async_pool: Optional[AsyncConnectionPool] = None
+_lock = threading.Lock()
+_async_lock = asyncio.Lock()
+
+
+def get_vector_pool() -> ConnectionPool:
+    """sync 풀 (최초 호출 시 생성)"""
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    get_vector_db_url(),
+                    name="vector",
+                    # 빌려줄 때마다 헬스체크 (끊긴 커넥션은 폐기 후 재연결)
+                    check=ConnectionPool.check_connection,
+                    open=True,
+                    **_pool_kwargs(),
+                )
+    return _pool
+
+
+async def get_async_vector_pool() -> AsyncConnectionPool:
+    """async 풀 (최초 호출 시 생성, 이벤트 루프 안에서 호출)"""
+    global _async_pool
+    if _async_pool is None:
+        async with _async_lock:
+            if _async_pool is None:
+                pool = AsyncConnectionPool(
+                    get_vector_db_url(),
+                    name="vector-async",
+                    check=AsyncConnectionPool.check_connection,
+                    open=False,
+                    **_pool_kwargs(),
+                )
+                await pool.open()
+                _async_pool = pool
+    return _async_pool
+
+
+def close_vector_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+
+
+async def close_async_vector_pool() -> None:
+    global _async_pool
+    if _async_pool is not None:
+        await _async_pool.close()
+        _async_pool = None
@@ -1,12 +1,35 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from t2sql.db.session import async_engine
+from t2sql.db.table_versions import get_table_version_tracker
+from t2sql.db.vector_pool import close_vector_pool, close_async_vector_pool
+from t2sql.services.llm.intent_classifier import get_intent_classifier
+from t2sql.services.rag.local_index import local_index_enabled, load_local_index
 from t2sql.routers.api import api_router as api_router
 from t2sql.routers.chat_sse import router as chat_router
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 테이블 변경 감지 (캐시 무효화 / 메모리 인덱스 갱신용)
+    get_table_version_tracker().start()
+    # 의도 분류기 준비 (n-gram 학습, intent_centroids 로딩)를 첫 요청 전에
+    get_intent_classifier()
+    # (옵션) schema/few-shot 임베딩을 메모리 인덱스로 로딩
+    if local_index_enabled():
+        load_local_index()
+    yield
+    get_table_version_tracker().stop()
+    # 종료 시 RAG 커넥션 풀 반납
+    close_vector_pool()
+    await close_async_vector_pool()
+    await async_engine.dispose()
+
 def create_app() -> FastAPI:
-    app = FastAPI(title="t2sql")
+    app = FastAPI(title="t2sql", lifespan=lifespan)
     app.include_router(chat_router)
     app.include_router(api_router, prefix="/api")
     return app
@@ -1,6 +1,18 @@
 from fastapi import APIRouter
 from t2sql.routers.query import router as query_router
 from t2sql.routers.question_generate import router as question_router
+from t2sql.services.llm.history import get_history_compactor
+from t2sql.services.llm.intent_classifier import get_intent_classifier
+from t2sql.services.llm.llm_client import prompt_cache_stats
+from t2sql.services.llm.session_store import get_session_store
+from t2sql.services.query.admission import get_admission_cache
+from t2sql.services.query.nl_cache import get_nl_cache
+from t2sql.services.query.result_cache import get_result_cache
+from t2sql.services.query.shapes import get_shape_registry
+from t2sql.services.query.sql_templates import get_template_generator
+from t2sql.services.query.sql_validator import validation_cache
+from t2sql.services.rag.embedding_cache import get_embedding_cache
+from t2sql.services.rag.vector_search import get_query_embed_batcher
 
 api_router = APIRouter()
 api_router.include_router(query_router)
@@ -9,3 +21,27 @@ api_router.include_router(question_router)
 @api_router.get("/health")
 def health():
     return {"ok": True}
+
+
+@api_router.get("/stats")
+def stats():
+    """캐시 등 런타임 카운터"""
+    nl_cache = get_nl_cache()
+    result_cache = get_result_cache()
+    intent_classifier = get_intent_classifier()
+    template_generator = get_template_generator()
+    embed_batcher = get_query_embed_batcher()
+    return {
+        "embedding_cache": get_embedding_cache().stats(),
+        "embedding_batcher": embed_batcher.stats() if embed_batcher else None,
+        "nl_cache": nl_cache.stats() if nl_cache else None,
+        "result_cache": result_cache.stats() if result_cache else None,
+        "intent_classifier": intent_classifier.stats() if intent_classifier else None,
+        "query_shapes": get_shape_registry().stats(),
+        "query_admission": get_admission_cache().stats(),
+        "sql_validation": validation_cache.stats(),
+        "sql_templates": template_generator.stats() if template_generator else None,
+        "chat_sessions": get_session_store().stats(),
+        "chat_history": get_history_compactor().stats(),
+        "sql_prompt": prompt_cache_stats.stats(),
+    }
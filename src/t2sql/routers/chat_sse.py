@@ -1,20 +1,30 @@
 from fastapi import APIRouter, Depends
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from typing import Optional, Dict, List
-import json
+from pydantic import BaseModel, Field
+from typing import Optional
 import asyncio
-from sqlalchemy.orm import Session
-
-from t2sql.services.llm.llm_stream_sse import llm_answer_stream, llm_answer_once
-from t2sql.services.llm.intent_classifier import classify_intent, RESPONSES
-from t2sql.services.query.query_service import run_nl_query
-from t2sql.db.session import get_db
+import json
+import os
+import time
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from t2sql.services.llm.history import get_history_compactor
+from t2sql.services.llm.llm_stream_sse import (
+    estimate_prompt_tokens,
+    llm_answer_once_async,
+    llm_answer_stream,
+    summarize_history_async,
+)
+from t2sql.services.llm.intent_classifier import classify_intent_async, RESPONSES
+from t2sql.services.llm.session_store import get_session_store
+from t2sql.services.query.query_service import prepare_sql_async, run_nl_query_async
+from t2sql.services.rag.vector_search import RetrievalContext
+from t2sql.db.session import get_async_db
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
-# 데모용 메모리(임시)
-_CHAT_MEMORY: Dict[str, List[dict]] = {}
+# 의도 분류와 동시에 미리 시작할 작업: "off" | "retrieve"(임베딩+검색) | "sql"(SQL 생성/검증까지)
+SPECULATION = os.getenv("CHAT_SPECULATION", "retrieve")
 
 
 class ChatRequest(BaseModel):
@@ -22,24 +32,33 @@ class ChatRequest(BaseModel):
     message: str
     system: Optional[str] = None
     role: str = "user"  # user 또는 admin
+    # 대화 기록 예산 (없으면 CHAT_HISTORY_* 기본값): 원문으로 보낼 최근 턴 수 / 기록 전체 토큰 상한
+    history_turns: Optional[int] = Field(None, ge=0)
+    history_tokens: Optional[int] = Field(None, ge=0)
 
 @router.post("")
-def chat_once(req: ChatRequest):
-    history = _CHAT_MEMORY.get(req.session_id, [])
-    answer = llm_answer_once(req.message, history=history, system=req.system)
-
-    # 메모리 새롭게
-    history = history + [
+async def chat_once(req: ChatRequest):
+    # 세션 저장소/요약/답변 모두 async 버전 사용 (스레드풀 워커를 LLM 응답 대기로 붙잡지 않음)
+    store = get_session_store()
+    # 최근 턴은 원문, 이전 턴은 캐시된 롤링 요약으로 (토큰 예산 안에서)
+    compact = await get_history_compactor().compact_async(
+        req.session_id, await store.get_async(req.session_id), summarize_history_async,
+        keep_turns=req.history_turns, budget_tokens=req.history_tokens,
+    )
+    usage = {"prompt_tokens_est": estimate_prompt_tokens(req.message, compact.messages, req.system), **compact.stats}
+    answer = await llm_answer_once_async(req.message, history=compact.messages, system=req.system, usage=usage)
+
+    # 세션 기록에 추가 (턴/토큰 상한을 넘으면 오래된 턴부터 잘림)
+    await store.append_async(req.session_id, [
         {"role": "user", "content":req.message},
         {"role": "assistant", "content":answer},
-    ]
-    _CHAT_MEMORY[req.session_id] = history
+    ])
 
-    return {"session_id": req.session_id, "answer": answer}
+    return {"session_id": req.session_id, "answer": answer, "usage": usage}
 
 @router.post("/stream")
 def chat_stream(req: ChatRequest):
-    history = _CHAT_MEMORY.get(req.session_id, [])
+    store = get_session_store()
 
     async def event_gen():
         # (선택) 시작 이벤트
@@ -47,23 +66,24 @@ def chat_stream(req: ChatRequest):
 
         acc = []
         try:
-            async for chunk in llm_answer_stream(req.message, history=history, system = req.system):
+            compact = await get_history_compactor().compact_async(
+                req.session_id, await store.get_async(req.session_id), summarize_history_async,
+                keep_turns=req.history_turns, budget_tokens=req.history_tokens,
+            )
+            usage = {"prompt_tokens_est": estimate_prompt_tokens(req.message, compact.messages, req.system), **compact.stats}
+            async for chunk in llm_answer_stream(req.message, history=compact.messages, system = req.system, usage=usage):
                 acc.append(chunk)
                 yield _sse({"event":"delta", "text": chunk})
 
-                # 너무 빡빡하면 살짝 양보(서버 과부하 방지용)
-                await asyncio.sleep(0)
-
             final_text = "".join(acc)
 
-            # 메모리 업데이트(스트림 끝나고 한번에 저장)
-            new_history = history + [
+            # 세션 기록 업데이트(스트림 끝나고 한번에 저장)
+            await store.append_async(req.session_id, [
                 {"role": "user", "content": req.message},
                 {"role": "assistant", "content": final_text},
-            ]
-            _CHAT_MEMORY[req.session_id] = new_history
+            ])
 
-            yield _sse({"event": "done"})
+            yield _sse({"event": "done", "usage": usage})
         except Exception as e:
             yield _sse({"event": "error", "message": str(e)})
 
@@ -77,41 +97,66 @@ def _sse(obj: dict) -> str:
 # ============ 통합 챗봇 엔드포인트 ============
 
 @router.post("/unified")
-def unified_chat(req: ChatRequest, db: Session = Depends(get_db)):
+async def unified_chat(req: ChatRequest, db: AsyncSession = Depends(get_async_db)):
     """
     통합 챗봇: 의도 분류 후 적절한 응답
     - greeting: 인사 응답
     - data_query: SQL 생성 + 실행
     - off_topic: 주제 외 안내
     """
-    intent = classify_intent(req.message)
-    history = _CHAT_MEMORY.get(req.session_id, [])
+    start = time.perf_counter()
+    # data_query가 대부분이므로 분류 결과를 기다리지 않고 검색(또는 SQL 생성)을 먼저 시작
+    ctx = RetrievalContext(question=req.message.strip())
+    speculative = None
+    if SPECULATION == "sql":
+        speculative = asyncio.ensure_future(prepare_sql_async(req.message, req.role, ctx))
+    elif SPECULATION == "retrieve":
+        speculative = ctx.prefetch()
+
+    intent_start = time.perf_counter()
+    try:
+        intent = await classify_intent_async(req.message, ctx=ctx)
+    except BaseException:
+        # 요청이 끊기는 등으로 분류가 중단되면 미리 시작한 작업도 정리
+        if speculative is not None:
+            speculative.cancel()
+        raise
+    intent_ms = round((time.perf_counter() - intent_start) * 1000, 2)
+
+    if intent != "data_query" and speculative is not None:
+        # 인사/주제 외이면 미리 시작한 작업 취소
+        speculative.cancel()
 
     if intent == "greeting":
         answer = RESPONSES["greeting"]
     elif intent == "off_topic":
         answer = RESPONSES["off_topic"]
     else:  # data_query
-        result = run_nl_query(db, req.message, role=req.role)
+        prepared = speculative if SPECULATION == "sql" else None
+        result = await run_nl_query_async(db, req.message, role=req.role, ctx=ctx, prepared=prepared)
         meta = result.get("meta", {})
         sql = result.get("sql", "")
         rows = result.get("rows", [])
+        timings = {
+            **meta.get("timings", {}),
+            "intent_ms": intent_ms,
+            "total_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
 
         return {
             "session_id": req.session_id,
             "intent": intent,
             "answer": None,
             "sql": sql,
-            "rows": [dict(r) for r in rows],
-            "meta": {**meta, "row_count": len(rows)}
+            "rows": rows,
+            "meta": {**meta, "row_count": len(rows), "speculation": SPECULATION, "timings": timings}
         }
 
-    # greeting/off_topic은 메모리에 저장
-    new_history = history + [
+    # greeting/off_topic은 세션 기록에 저장
+    await get_session_store().append_async(req.session_id, [
         {"role": "user", "content": req.message},
         {"role": "assistant", "content": answer},
-    ]
-    _CHAT_MEMORY[req.session_id] = new_history
+    ])
 
     return {
         "session_id": req.session_id,
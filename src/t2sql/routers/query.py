@@ -1,8 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from t2sql.db.session import get_db
-from t2sql.schemas.query import QueryRequest, QueryResponse
-from t2sql.services.query.query_service import run_nl_query
+from t2sql.db.session import AsyncSessionLocal, get_async_db, get_db
+from t2sql.schemas.query import BatchQueryRequest, QueryRequest, QueryResponse
+from t2sql.services.query.batch import run_batch_async
+from t2sql.services.query.columnar import (
+    ARROW_MEDIA_TYPE,
+    arrow_available,
+    encode_arrow,
+    encode_columns_json,
+    negotiate,
+)
+from t2sql.services.query.query_service import (
+    run_nl_query_async,
+    run_nl_query_columns_async,
+    stream_nl_query_async,
+)
+from t2sql.services.query.sql_validator import FORCE_LIMIT
 from sqlalchemy import text, inspect
 
 router = APIRouter(prefix="/query", tags=["query"])
@@ -17,12 +35,58 @@ ALLOWED_TABLES = {
 
 
 @router.post("", response_model=QueryResponse)
-def query(req: QueryRequest, db: Session = Depends(get_db)):
-    result = run_nl_query(db, req.question, role=req.role)
+async def query(req: QueryRequest, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    기본은 행 dict 목록(JSON). Accept로 열 단위 형식 선택 가능
+    - application/vnd.apache.arrow.stream: Arrow IPC stream (pyarrow 필요)
+    - application/vnd.t2sql.columns+json: {"columns", "data"} 열 단위 JSON
+    """
+    media_type = negotiate(request.headers.get("accept", ""))
+    if media_type is not None:
+        if media_type == ARROW_MEDIA_TYPE and not arrow_available():
+            raise HTTPException(status_code=406, detail="Arrow format requires pyarrow on the server")
+        result = await run_nl_query_columns_async(db, req.question, role=req.role)
+        encode = encode_arrow if media_type == ARROW_MEDIA_TYPE else encode_columns_json
+        return Response(content=encode(result), media_type=media_type)
+
+    result = await run_nl_query_async(db, req.question, role=req.role)
     result["meta"]["row_count"] = len(result.get("rows", []))
     return result
 
 
+@router.post("/stream")
+async def query_stream(req: QueryRequest, request: Request):
+    """
+    /query와 같지만 결과를 청크 단위로 스트리밍 (서버 사이드 커서)
+    - 기본: NDJSON (한 줄에 이벤트 하나)
+    - Accept: text/event-stream 이면 SSE
+    """
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    async def event_gen():
+        # 응답이 끝날 때까지 세션(서버 사이드 커서)을 유지해야 하므로 의존성 대신 여기서 연다
+        async with AsyncSessionLocal() as db:
+            async for event in stream_nl_query_async(db, req.question, role=req.role):
+                line = json.dumps(jsonable_encoder(event), ensure_ascii=False)
+                yield f"data:{line}\n\n" if sse else line + "\n"
+
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(event_gen(), media_type=media_type)
+
+
+@router.post("/batch")
+async def query_batch(req: BatchQueryRequest):
+    """
+    여러 질문을 한 번에 (NDJSON, 항목은 끝나는 순서대로 index와 함께)
+    - 임베딩/검색은 전체를 한 번에, SQL 생성/실행은 제한된 동시성으로
+    """
+    async def event_gen():
+        async for event in run_batch_async(req.questions, req.role, AsyncSessionLocal):
+            yield json.dumps(jsonable_encoder(event), ensure_ascii=False) + "\n"
+
+    return StreamingResponse(event_gen(), media_type="application/x-ndjson")
+
+
 @router.get("/tables")
 def list_tables():
     """허용된 테이블 목록 반환"""
@@ -49,7 +113,7 @@ def get_table_data(table_name: str, limit: int = 100, db: Session = Depends(get_
     if table_name not in ALLOWED_TABLES:
         raise HTTPException(status_code=404, detail=f"Table '{table_name}' not found")
 
-    result = db.execute(text(f"SELECT * FROM {table_name} LIMIT :limit"), {"limit": limit})
+    result = db.execute(text(f"SELECT * FROM {table_name} LIMIT :limit"), {"limit": min(limit, FORCE_LIMIT)})
     columns = result.keys()
     rows = [dict(zip(columns, row)) for row in result.fetchall()]
 
@@ -2,15 +2,15 @@ from fastapi import APIRouter
 
 from t2sql.schemas.query import GenerateQuestionsRequest, GenerateQuestionsResponse, EdgeQuestionItem
 from t2sql.services.llm.llm_edge_question_generator import (
-    generate_edge_questions_with_llm,
-    build_full_schema_context,
+    generate_edge_questions_with_llm_async,
+    build_full_schema_context_async,
 )
 
 router = APIRouter(prefix="/questions", tags=["questions"])
 
 
 @router.post("/generate", response_model=GenerateQuestionsResponse)
-def generate_questions(req: GenerateQuestionsRequest):
+async def generate_questions(req: GenerateQuestionsRequest):
     if req.total_questions is not None:
         total_questions = req.total_questions
     elif req.per_type is not None:
@@ -18,7 +18,7 @@ def generate_questions(req: GenerateQuestionsRequest):
     else:
         total_questions = 7
 
-    questions = generate_edge_questions_with_llm(
+    questions = await generate_edge_questions_with_llm_async(
         total_questions=total_questions,
         seed=req.seed,
         type_ids=req.type_ids,
@@ -34,5 +34,5 @@ def generate_questions(req: GenerateQuestionsRequest):
     ]
     schema_context = None
     if req.include_schema_context:
-        schema_context = build_full_schema_context()
+        schema_context = await build_full_schema_context_async()
     return GenerateQuestionsResponse(questions=items, schema_context=schema_context)
@@ -1,10 +1,14 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Any, Dict, List, Optional
 
 class QueryRequest(BaseModel):
     question: str
     role: str = "user"  # "user" 또는 "admin"
 
+class BatchQueryRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=500)
+    role: str = "user"
+
 class QueryResponse(BaseModel):
     sql: str
     rows: List[Dict[str, Any]]
@@ -0,0 +1,79 @@
+"""
+임베딩 마이크로 배칭 벤치마크 (로컬 가짜 임베딩 서버, API 키/네트워크 불필요)
+- 가짜 서버: /embeddings 요청마다 LATENCY_MS 지연, 동시 처리 MAX_CONNECTIONS개 (레이트 리밋/커넥션 한도 흉내)
+- 실제 AsyncOpenAI 클라이언트로 동시 질문 N개를 보내 업스트림 호출 수 / 처리량 비교
+  - direct: 질문마다 embeddings.create
+  - batched: EmbeddingBatcher 경유
+
+실행: python -m t2sql.scripts.embedding.bench_embedding_batcher
+"""
+import asyncio
+import json
+import time
+
+import httpx
+from openai import AsyncOpenAI
+
+from t2sql.services.rag.embedding_batcher import EmbeddingBatcher
+
+LATENCY_MS = 30
+MAX_CONNECTIONS = 8
+CONCURRENCY = [100, 200, 500]
+
+
+class FakeEmbeddingsServer:
+    def __init__(self, latency_ms: float = LATENCY_MS, max_connections: int = MAX_CONNECTIONS):
+        self.latency = latency_ms / 1000
+        self.max_connections = max_connections
+        self.calls = 0
+        self._slots = None
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        texts = json.loads(request.content)["input"]
+        async with self._slots:
+            self.calls += 1
+            await asyncio.sleep(self.latency)
+        data = [{"object": "embedding", "index": i, "embedding": [float(len(t)), 1.0]} for i, t in enumerate(texts)]
+        return httpx.Response(200, json={
+            "object": "list", "data": data, "model": "fake",
+            "usage": {"prompt_tokens": len(texts), "total_tokens": len(texts)},
+        })
+
+    def client(self) -> AsyncOpenAI:
+        transport = httpx.MockTransport(self.handle)
+        return AsyncOpenAI(api_key="sk-fake", base_url="http://fake/v1", http_client=httpx.AsyncClient(transport=transport))
+
+
+async def _run(n: int, batched: bool) -> dict:
+    server = FakeEmbeddingsServer()
+    client = server.client()
+
+    async def embed_fn(texts):
+        res = await client.embeddings.create(model="fake", input=texts)
+        return [d.embedding for d in res.data]
+
+    embed = EmbeddingBatcher(embed_fn).embed if batched else embed_fn
+    start = time.perf_counter()
+    await asyncio.gather(*(embed([f"질문 {i}"]) for i in range(n)))
+    elapsed = time.perf_counter() - start
+    await client.close()
+    return {
+        "mode": "batched" if batched else "direct",
+        "requests": n,
+        "upstream_calls": server.calls,
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "req_per_s": round(n / elapsed),
+    }
+
+
+def main():
+    print(f"fake server: latency={LATENCY_MS}ms, max_connections={MAX_CONNECTIONS}")
+    for n in CONCURRENCY:
+        for batched in (False, True):
+            print(asyncio.run(_run(n, batched)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+from pathlib import Path
+from dotenv import load_dotenv
+
+env_path = Path(__file__).resolve().parents[4] / ".env"
+load_dotenv(env_path)
+
+import os
+from collections import defaultdict
+
+import numpy as np
+from openai import OpenAI
+import psycopg
+
+from t2sql.services.llm.intent_classifier import EXAMPLES
+from t2sql.services.rag.embedding_cache import get_embedding_cache
+from t2sql.services.rag.fewshot_catalog import FEWSHOTS
+
+EMBED_MODEL = "text-embedding-3-small"
+DB_URL = os.getenv("DATABASE_URL", "").replace("postgresql+psycopg://", "postgresql://")
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+def _embed_batch(texts: list[str]) -> list[list[float]]:
+    res = client.embeddings.create(model=EMBED_MODEL, input=texts)
+    return [d.embedding for d in res.data]
+
+def labelled_examples() -> list[tuple[str, str]]:
+    """(intent, text) - 분류기 학습 예시 + few-shot 질문(data_query)"""
+    pairs = [(intent, t) for intent, texts in EXAMPLES.items() for t in texts]
+    pairs += [("data_query", fs["question"]) for fs in FEWSHOTS]
+    return pairs
+
+def build_centroids(pairs: list[tuple[str, str]]) -> dict[str, tuple[list[float], int]]:
+    """의도별 (단위 벡터 평균을 다시 정규화한 centroid, 예시 수)"""
+    vectors = get_embedding_cache().get_or_embed(EMBED_MODEL, [t for _, t in pairs], _embed_batch)
+    grouped = defaultdict(list)
+    for (intent, _), vec in zip(pairs, vectors):
+        v = np.asarray(vec, dtype=np.float64)
+        grouped[intent].append(v / np.linalg.norm(v))
+    centroids = {}
+    for intent, vs in grouped.items():
+        mean = np.mean(vs, axis=0)
+        centroids[intent] = ((mean / np.linalg.norm(mean)).tolist(), len(vs))
+    return centroids
+
+def main():
+    centroids = build_centroids(labelled_examples())
+    with psycopg.connect(DB_URL) as conn:
+        with conn.cursor() as cur:
+            for intent, (vec, n) in centroids.items():
+                cur.execute(
+                    """
+                    INSERT INTO intent_centroids (intent, embedding, n_examples, updated_at)
+                    VALUES (%s, %s::vector, %s, now())
+                    ON CONFLICT (intent)
+                    DO UPDATE SET embedding = EXCLUDED.embedding,
+                                  n_examples = EXCLUDED.n_examples,
+                                  updated_at = now()
+                    """,
+                    (intent, vec, n),
+                )
+                print(f"Upserted: {intent} ({n} examples)")
+            conn.commit()
+    print(f"\ncache={get_embedding_cache().stats()}")
+
+if __name__ == "__main__":
+    main()
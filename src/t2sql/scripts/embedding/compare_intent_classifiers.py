@@ -0,0 +1,112 @@
+"""
+의도 분류기 오프라인 비교 (정확도 / 지연)
+- llm: 기존 classify_intent (매 메시지 gpt-4o-mini 호출)
+- centroid: 질문 임베딩 vs intent_centroids (임베딩은 RAG와 공유되므로 점수 계산만 측정)
+- tiered: rule -> ngram -> centroid -> llm
+
+실행: python -m t2sql.scripts.embedding.compare_intent_classifiers
+"""
+from pathlib import Path
+from dotenv import load_dotenv
+
+env_path = Path(__file__).resolve().parents[4] / ".env"
+load_dotenv(env_path)
+
+import os
+import statistics
+import time
+
+from t2sql.services.llm.intent_classifier import (
+    CentroidIntentClassifier,
+    INTENTS,
+    classify_intent_llm,
+    get_intent_classifier,
+    load_intent_centroids,
+)
+from t2sql.services.rag.vector_search import _embed_batch, EMBED_MODEL
+from t2sql.services.rag.embedding_cache import get_embedding_cache
+
+# 학습 예시(EXAMPLES / FEWSHOTS)와 겹치지 않는 평가용 메시지
+EVAL_SET = [
+    ("안녕하세요 처음 써봐요", "greeting"),
+    ("하이 반가워", "greeting"),
+    ("좋은 저녁이에요", "greeting"),
+    ("잘 지내?", "greeting"),
+    ("오랜만이야", "greeting"),
+    ("감사합니다!", "greeting"),
+    ("2월 공정 D 생산량 합계 알려줘", "data_query"),
+    ("출고 완료된 주문 수량은?", "data_query"),
+    ("물건3 생산하는 공정은 어디야?", "data_query"),
+    ("작업자가 가장 많은 공정은?", "data_query"),
+    ("지난달 대비 이번 달 증가율", "data_query"),
+    ("어제 만든 개수 알려줘", "data_query"),
+    ("미출고 물량이 제일 많은 날은?", "data_query"),
+    ("하루 평균 얼마나 만들어?", "data_query"),
+    ("최근 7일 추이 보여줘", "data_query"),
+    ("다음 주 비 와?", "off_topic"),
+    ("저녁 메뉴 추천 좀", "off_topic"),
+    ("자바스크립트 배열 정렬 방법", "off_topic"),
+    ("재밌는 얘기 해줘", "off_topic"),
+    ("비트코인 살까?", "off_topic"),
+    ("이 문장 영어로 번역해줘", "off_topic"),
+    ("가장 높은 산이 어디야?", "off_topic"),
+    ("월드컵 우승국은?", "off_topic"),
+    ("시 한 편 써줘", "off_topic"),
+]
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def _run(name: str, predict) -> dict:
+    latencies, correct = [], 0
+    for message, expected in EVAL_SET:
+        start = time.perf_counter()
+        got = predict(message)
+        latencies.append((time.perf_counter() - start) * 1000)
+        correct += got == expected
+    return {
+        "name": name,
+        "accuracy": correct / len(EVAL_SET),
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": _percentile(latencies, 0.95),
+    }
+
+
+def main():
+    messages = [m for m, _ in EVAL_SET]
+    start = time.perf_counter()
+    vectors = dict(zip(messages, get_embedding_cache().get_or_embed(EMBED_MODEL, messages, _embed_batch)))
+    embed_ms = (time.perf_counter() - start) * 1000 / len(messages)
+
+    results = [_run("llm", classify_intent_llm)]
+
+    centroids = load_intent_centroids()
+    if set(centroids) == set(INTENTS):
+        # margin 없이 argmax만 (centroid 단독 정확도)
+        argmax = CentroidIntentClassifier(centroids, margin=0.0)
+        results.append(_run("centroid", lambda m: argmax.decide(vectors[m]).intent))
+    else:
+        print("intent_centroids가 비어 있음: build_intent_centroids.py를 먼저 실행하세요")
+
+    tiered = get_intent_classifier()
+    if tiered is not None:
+        if set(centroids) == set(INTENTS):
+            # 앱에서는 백그라운드로 로딩되므로 여기서는 바로 설정
+            tiered.centroids = CentroidIntentClassifier(
+                centroids, margin=float(os.getenv("INTENT_CENTROID_MARGIN", "0.05"))
+            )
+        results.append(_run("tiered", lambda m: tiered.classify(m, classify_intent_llm, lambda: vectors[m]).intent))
+
+    print(f"{'classifier':<10} {'accuracy':>8} {'p50_ms':>9} {'p95_ms':>9}")
+    for r in results:
+        print(f"{r['name']:<10} {r['accuracy']:>8.2%} {r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f}")
+    print(f"\n(참고) 질문 임베딩 평균 {embed_ms:.1f}ms/건 - RAG에서 어차피 계산하므로 centroid 비용에는 미포함")
+    if tiered is not None:
+        print(f"tiered 단계별: {tiered.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+임베딩 테이블 증분 적재 (embed_schema / embed_fewshot 공용)
+- 문서마다 content_hash(임베딩 모델 + 저장 컬럼 값)를 계산해 테이블에 없는 것만 임베딩
+- 임베딩은 INGEST_EMBED_BATCH개씩 묶어 호출 (임베딩 캐시 경유)
+- 한 트랜잭션에서 빠진/바뀐 행 DELETE + 새 행 COPY -> 커밋 시점에 한 번에 교체
+  (검색 쪽은 이전 또는 새 상태만 보며, 바뀐 게 없으면 쓰기도 없음)
+- 같은 테이블에 동시에 적재하지 않도록 advisory lock
+"""
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+import psycopg
+
+from t2sql.services.rag.embedding_cache import EmbeddingCache, get_embedding_cache
+
+EmbedFn = Callable[[List[str]], List[List[float]]]
+
+INGEST_EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "256"))
+
+
+@dataclass(frozen=True)
+class IngestTarget:
+    table: str
+    columns: Sequence[str]  # embedding / content_hash 외에 저장할 컬럼
+    text_column: str  # 임베딩할 컬럼
+
+
+@dataclass
+class IngestPlan:
+    hashes: Set[str]  # 적재 후 테이블에 있어야 할 전체 hash
+    new_docs: List[dict] = field(default_factory=list)  # 임베딩 + 삽입할 문서 (hash 포함)
+
+
+def content_hash(model: str, target: IngestTarget, doc: dict) -> str:
+    payload = json.dumps([model] + [doc.get(c) for c in target.columns], ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def plan_ingest(model: str, target: IngestTarget, docs: Sequence[dict], existing: Set[str]) -> IngestPlan:
+    """같은 내용의 문서는 하나로, 이미 테이블에 있는 hash는 건너뜀"""
+    plan = IngestPlan(hashes=set())
+    for doc in docs:
+        h = content_hash(model, target, doc)
+        if h in plan.hashes:
+            continue
+        plan.hashes.add(h)
+        if h not in existing:
+            plan.new_docs.append({**doc, "content_hash": h})
+    return plan
+
+
+def embed_in_batches(
+    model: str,
+    texts: List[str],
+    embed_fn: EmbedFn,
+    batch_size: int = INGEST_EMBED_BATCH,
+    cache: Optional[EmbeddingCache] = None,
+) -> List[List[float]]:
+    cache = cache or get_embedding_cache()
+    vectors: List[List[float]] = []
+    for i in range(0, len(texts), batch_size):
+        vectors += cache.get_or_embed(model, texts[i:i + batch_size], embed_fn)
+    return vectors
+
+
+def _vector_literal(vec: Sequence[float]) -> str:
+    # COPY 텍스트 형식의 pgvector 값
+    return "[" + ",".join(repr(float(x)) for x in vec) + "]"
+
+
+def sync_embeddings(
+    conn: psycopg.Connection,
+    target: IngestTarget,
+    docs: Sequence[dict],
+    model: str,
+    embed_fn: EmbedFn,
+    batch_size: int = INGEST_EMBED_BATCH,
+) -> Dict[str, int]:
+    """docs를 target 테이블의 전체 내용으로 맞춤 -> {"docs", "unchanged", "inserted", "deleted"}"""
+    table = target.table
+    conn.execute("SELECT pg_advisory_lock(hashtext(%s))", (table,))
+    try:
+        current = [h for (h,) in conn.execute(f"SELECT content_hash FROM {table}")]
+        conn.commit()
+        plan = plan_ingest(model, target, docs, {h for h in current if h is not None})
+        # hash가 없는(이전 방식으로 넣은) 행과 더 이상 없는/바뀐 문서는 삭제 대상
+        stale = sum(1 for h in current if h not in plan.hashes)
+        if stale == 0 and not plan.new_docs:
+            return {"docs": len(plan.hashes), "unchanged": len(plan.hashes), "inserted": 0, "deleted": 0}
+
+        # API 호출은 트랜잭션 밖에서 (테이블 락을 오래 잡지 않도록)
+        vectors = embed_in_batches(model, [d[target.text_column] for d in plan.new_docs], embed_fn, batch_size)
+
+        columns = list(target.columns) + ["content_hash", "embedding"]
+        deleted = 0
+        with conn.transaction():
+            if stale:
+                deleted = conn.execute(
+                    f"DELETE FROM {table} WHERE content_hash IS NULL OR NOT (content_hash = ANY(%s))",
+                    (list(plan.hashes),),
+                ).rowcount
+            if plan.new_docs:
+                with conn.cursor().copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+                    for doc, vec in zip(plan.new_docs, vectors):
+                        copy.write_row([doc.get(c) for c in target.columns] + [doc["content_hash"], _vector_literal(vec)])
+    finally:
+        # 실패한 트랜잭션이 남아 있어도 세션 락은 풀리도록
+        conn.rollback()
+        conn.execute("SELECT pg_advisory_unlock(hashtext(%s))", (table,))
+        conn.commit()
+    return {
+        "docs": len(plan.hashes),
+        "unchanged": len(plan.hashes) - len(plan.new_docs),
+        "inserted": len(plan.new_docs),
+        "deleted": deleted,
+    }
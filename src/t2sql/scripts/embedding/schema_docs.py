@@ -0,0 +1,169 @@
+"""
+실제 DB 카탈로그에서 schema_embeddings 문서 생성 (embed_schema에서 사용)
+- table: 설명/힌트 + 컬럼 이름 목록만 (컬럼 상세는 column 문서로 분리해 테이블 폭과 무관하게 짧게)
+- column: 테이블.컬럼, 타입/NULL/PK (pg_catalog) + 설명 (컬럼 주석 또는 DOCS의 컬럼 줄)
+- value: 값 종류가 적은 텍스트 컬럼의 실제 값 목록 (공정 코드, order_status 등) + DOCS의 값 정의 줄
+- 대상 테이블: 일반 사용자가 조회 가능한 테이블만 (ALLOWED_TABLES_BY_ROLE["user"])
+  admin 전용 테이블(dim_worker 등)의 컬럼/값(작업자 이름 등)은 공용 임베딩 테이블과 임베딩 API로 보내지 않음
+"""
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import psycopg
+from psycopg import sql
+
+from t2sql.services.query.sql_validator import ALLOWED_TABLES_BY_ROLE
+
+# 값 목록 문서를 만들 최대 값 종류 수 / 값을 모을 때 읽는 최대 행 수
+VALUE_DOC_MAX_DISTINCT = int(os.getenv("SCHEMA_VALUE_DOC_MAX_DISTINCT", "30"))
+VALUE_SAMPLE_ROWS = int(os.getenv("SCHEMA_VALUE_SAMPLE_ROWS", "100000"))
+
+CATALOG_TABLES = frozenset(ALLOWED_TABLES_BY_ROLE["user"])
+
+_COLUMN_LINE_RE = re.compile(r"^-\s*([a-z_][a-z0-9_]*)\b\s*(.*)$")
+
+_CATALOG_SQL = """
+    SELECT c.relname, a.attname, format_type(a.atttypid, a.atttypmod), a.attnotnull,
+           EXISTS (
+               SELECT 1 FROM pg_index i
+               WHERE i.indrelid = c.oid AND i.indisprimary AND a.attnum = ANY(i.indkey)
+           ),
+           col_description(c.oid, a.attnum),
+           obj_description(c.oid, 'pg_class')
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+    WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p') AND c.relname = ANY(%s)
+    ORDER BY c.relname, a.attnum
+"""
+
+
+@dataclass(frozen=True)
+class CatalogColumn:
+    table: str
+    column: str
+    data_type: str
+    not_null: bool = False
+    primary_key: bool = False
+    comment: Optional[str] = None
+
+    @property
+    def is_text(self) -> bool:
+        return self.data_type == "text" or self.data_type.startswith("character")
+
+
+def _column_section(content: str) -> Tuple[List[str], Dict[str, str]]:
+    """DOCS content -> (컬럼 줄을 뺀 나머지 줄, {컬럼: 설명})"""
+    kept, notes, in_columns = [], {}, False
+    for line in content.splitlines():
+        stripped = line.strip()
+        if stripped == "컬럼:":
+            in_columns = True
+            kept.append(line)
+            continue
+        if in_columns:
+            m = _COLUMN_LINE_RE.match(stripped)
+            if m:
+                note = m.group(2)
+                # "DATE: 생산 집계 날짜" -> "생산 집계 날짜" (타입은 카탈로그에서, 타입만 있으면 설명 없음)
+                note = note.split(":", 1)[1].strip() if ":" in note else note
+                if not re.fullmatch(r"[A-Z]*", note):
+                    notes[m.group(1)] = note
+                continue
+            in_columns = False
+        kept.append(line)
+    return kept, notes
+
+
+def table_doc(table: str, columns: Sequence[CatalogColumn], curated: Optional[dict], comment: Optional[str]) -> dict:
+    names = ", ".join(c.column for c in columns)
+    if curated is not None:
+        lines, _ = _column_section(curated["content"])
+        content = "\n".join(f"    컬럼: {names}" if l.strip() == "컬럼:" else l for l in lines)
+    else:
+        content = f"[TABLE] {table}\n    설명: {comment or ''}\n    컬럼: {names}"
+    return {"doc_type": "table", "table_name": table, "column_name": None, "content": content}
+
+
+def column_doc(col: CatalogColumn, note: Optional[str]) -> dict:
+    flags = " ".join(f for f, on in (("NOT NULL", col.not_null), ("PK", col.primary_key)) if on)
+    content = f"[COLUMN] {col.table}.{col.column}\n    타입: {col.data_type}{(' ' + flags) if flags else ''}"
+    description = col.comment or note
+    if description:
+        content += f"\n    설명: {description}"
+    return {"doc_type": "column", "table_name": col.table, "column_name": col.column, "content": content}
+
+
+def value_doc(col: CatalogColumn, values: Sequence[str], curated: Optional[dict]) -> dict:
+    content = f"[VALUES] {col.table}.{col.column}\n    값: " + ", ".join(f"'{v}'" for v in values)
+    # DOCS의 "- '값'=의미" 줄 (값 정의) 중 이 컬럼 값에 대한 것
+    if curated is not None:
+        for line in curated["content"].splitlines():
+            stripped = line.strip()
+            if stripped.startswith("- '") and any(f"'{v}'" in stripped for v in values):
+                content += f"\n    {stripped}"
+    return {"doc_type": "value", "table_name": col.table, "column_name": col.column, "content": content}
+
+
+def build_schema_docs(
+    catalog: Dict[str, List[CatalogColumn]],
+    values: Dict[Tuple[str, str], List[str]],
+    curated_docs: Sequence[dict],
+    table_comments: Optional[Dict[str, str]] = None,
+) -> List[dict]:
+    """카탈로그 + 값 목록 + 손으로 쓴 DOCS -> table/column/value 문서"""
+    table_comments = table_comments or {}
+    curated = {d["table_name"]: d for d in curated_docs if d["doc_type"] == "table"}
+    docs: List[dict] = []
+    for table, columns in catalog.items():
+        doc = curated.get(table)
+        notes = _column_section(doc["content"])[1] if doc else {}
+        docs.append(table_doc(table, columns, doc, table_comments.get(table)))
+        for col in columns:
+            docs.append(column_doc(col, notes.get(col.column)))
+            if (table, col.column) in values:
+                docs.append(value_doc(col, values[(table, col.column)], doc))
+    # 카탈로그에 없는(아직 생성 전이거나 admin 전용인) 테이블은 DOCS의 테이블 설명 그대로
+    docs += [d for t, d in curated.items() if t not in catalog]
+    return docs
+
+
+def read_catalog(conn: psycopg.Connection, tables: Sequence[str]) -> Tuple[Dict[str, List[CatalogColumn]], Dict[str, str]]:
+    catalog: Dict[str, List[CatalogColumn]] = {}
+    comments: Dict[str, str] = {}
+    for table, column, data_type, not_null, pk, col_comment, table_comment in conn.execute(_CATALOG_SQL, (list(tables),)):
+        catalog.setdefault(table, []).append(CatalogColumn(table, column, data_type, not_null, pk, col_comment))
+        if table_comment:
+            comments[table] = table_comment
+    return catalog, comments
+
+
+def read_values(
+    conn: psycopg.Connection,
+    catalog: Dict[str, List[CatalogColumn]],
+    max_distinct: int = VALUE_DOC_MAX_DISTINCT,
+    sample_rows: int = VALUE_SAMPLE_ROWS,
+) -> Dict[Tuple[str, str], List[str]]:
+    """텍스트 컬럼 중 값 종류가 max_distinct 이하인 것의 값 목록 (앞쪽 sample_rows행 기준)"""
+    values: Dict[Tuple[str, str], List[str]] = {}
+    for table, columns in catalog.items():
+        for col in columns:
+            if not col.is_text:
+                continue
+            query = sql.SQL(
+                "SELECT DISTINCT v FROM (SELECT {col} AS v FROM {table} WHERE {col} IS NOT NULL LIMIT %s) s "
+                "ORDER BY v LIMIT %s"
+            ).format(col=sql.Identifier(col.column), table=sql.Identifier(table))
+            found = [v for (v,) in conn.execute(query, (sample_rows, max_distinct + 1))]
+            if 0 < len(found) <= max_distinct:
+                values[(table, col.column)] = found
+    return values
+
+
+def catalog_docs(conn: psycopg.Connection, curated_docs: Sequence[dict]) -> List[dict]:
+    catalog, comments = read_catalog(conn, sorted(CATALOG_TABLES))
+    values = read_values(conn, catalog)
+    conn.commit()
+    return build_schema_docs(catalog, values, curated_docs, comments)
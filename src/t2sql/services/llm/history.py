@@ -0,0 +1,220 @@
+"""
+채팅 프롬프트용 대화 기록 압축 (토큰 예산)
+- 최근 keep_turns 턴은 원문 그대로, 그 이전 턴은 롤링 요약(system 메시지 1개)으로 접음
+- 요약은 세션별로 캐시하고, 아직 접지 않은 이전 턴이 refresh_turns 이상 쌓이거나
+  예산을 넘었는데 접으면 예산 안에 들어올 때만 (이전 요약 + 새 턴)으로 다시 만든다
+  (최근 턴만으로 예산을 넘으면 접어도 소용없으므로 매 요청 요약하지 않음)
+- 요약 위치는 접을 당시의 턴 위치에서 "마지막으로 접은 턴 + 그때 뒤따르던 턴들"이 그대로인지 확인해 찾음
+  (같은 내용의 턴이 반복돼도 어긋나지 않도록, 세션 저장소가 앞쪽 턴을 잘랐으면 그만큼 앞으로)
+- 요약이 접은 턴이 history에 하나도 없으면(세션 만료 후 같은 session_id 재사용 등) 요약을 버림
+- 그래도 예산을 넘으면 오래된 원문 턴부터 뺌
+- 토큰 수는 session_store.estimate_tokens로 로컬 추정
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from t2sql.services.llm.session_store import message_tokens
+
+# (이전 요약, 새로 접을 메시지들) -> 새 요약
+SummarizeFn = Callable[[str, List[dict]], str]
+AsyncSummarizeFn = Callable[[str, List[dict]], Awaitable[str]]
+
+SUMMARY_PREFIX = "이전 대화 요약:\n"
+
+
+def _fingerprint(messages: List[dict]) -> str:
+    return hashlib.sha256(json.dumps(messages, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CompactHistory:
+    messages: List[dict]  # 프롬프트에 넣을 기록 (요약 system 메시지 + 원문 턴)
+    stats: dict = field(default_factory=dict)
+
+
+@dataclass
+class _Summary:
+    text: str
+    anchor: Tuple[str, ...]  # 마지막으로 접은 턴 + 그때 뒤따르던(원문) 턴들의 fingerprint
+    position: int  # 접을 당시 기록에서 마지막으로 접은 턴의 index
+    turns: int  # 지금까지 접은 턴 수
+
+
+@dataclass
+class _Plan:
+    summary: Optional[_Summary]
+    pending: List[dict]  # 요약에 아직 안 들어간 이전 턴
+    recent: List[dict]  # 원문으로 보낼 최근 턴
+    refresh: bool
+    last_older: int = -1  # 이번 기록에서 마지막 이전 턴의 index (접으면 여기까지 요약에 들어감)
+
+
+def _turns(messages: List[dict]) -> List[List[dict]]:
+    return [messages[i:i + 2] for i in range(0, len(messages), 2)]
+
+
+def _find_anchor(marks: List[str], summary: "_Summary") -> Optional[int]:
+    """지금 기록에서 마지막으로 접은 턴의 index, 없으면 None"""
+    # 이후로는 뒤에 턴이 붙거나(위치 그대로) 앞쪽이 잘리기만(앞으로 이동) 하므로 접은 위치부터 앞으로 확인
+    anchor = summary.anchor
+    for i in range(min(summary.position, len(marks) - len(anchor)), -1, -1):
+        if tuple(marks[i:i + len(anchor)]) == anchor:
+            return i
+    return None
+
+
+class HistoryCompactor:
+    def __init__(
+        self,
+        keep_turns: int = 4,
+        budget_tokens: int = 1500,
+        refresh_turns: int = 4,
+        max_sessions: int = 10_000,
+    ):
+        self.keep_turns = keep_turns
+        self.budget_tokens = budget_tokens
+        self.refresh_turns = refresh_turns
+        self.max_sessions = max_sessions
+        self._summaries: "OrderedDict[str, _Summary]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"summary_hits": 0, "summary_refreshes": 0, "summary_failures": 0, "summary_dropped": 0}
+
+    def _plan(self, session_id: str, history: List[dict], keep_turns: int, budget: int) -> _Plan:
+        turns = _turns(history)
+        older, recent = turns[:max(len(turns) - keep_turns, 0)], turns[max(len(turns) - keep_turns, 0):]
+        marks = [_fingerprint(t) for t in turns]
+        with self._lock:
+            summary = self._summaries.get(session_id)
+            last = _find_anchor(marks, summary) if summary is not None else None
+            if summary is not None and last is None:
+                # 접은 턴은 history 앞쪽에 순서대로 있으므로 마지막 턴이 없으면 전부 없음 -> 다른 대화의 요약
+                del self._summaries[session_id]
+                self._counters["summary_dropped"] += 1
+                summary = None
+            elif summary is not None:
+                self._summaries.move_to_end(session_id)
+
+        # 이미 접은 턴 다음부터가 pending
+        pending = older[last + 1:] if last is not None else older
+
+        flat_recent = [m for t in recent for m in t]
+        flat_pending = [m for t in pending for m in t]
+        summary_tokens = self._summary_tokens(summary)
+        over_budget = message_tokens(flat_pending + flat_recent) + summary_tokens > budget
+        # 새 요약 길이는 이전 요약 정도로 보고, 접은 뒤(요약 + 최근 턴)가 예산 안일 때만 예산 때문에 요약
+        fold_fits = message_tokens(flat_recent) + summary_tokens <= budget
+        refresh = bool(pending) and (len(pending) >= self.refresh_turns or (over_budget and fold_fits))
+        return _Plan(summary, flat_pending, flat_recent, refresh, len(older) - 1)
+
+    @staticmethod
+    def _summary_tokens(summary: Optional[_Summary]) -> int:
+        return message_tokens([{"content": SUMMARY_PREFIX + summary.text}]) if summary else 0
+
+    def _store(self, session_id: str, plan: _Plan, text: str) -> _Summary:
+        previous, folded = plan.summary, plan.pending
+        summary = _Summary(
+            text=text,
+            anchor=(_fingerprint(folded[-2:]),) + tuple(_fingerprint(t) for t in _turns(plan.recent)),
+            position=plan.last_older,
+            turns=(previous.turns if previous else 0) + len(folded) // 2,
+        )
+        with self._lock:
+            self._summaries[session_id] = summary
+            self._summaries.move_to_end(session_id)
+            while len(self._summaries) > self.max_sessions:
+                self._summaries.popitem(last=False)
+            self._counters["summary_refreshes"] += 1
+        return summary
+
+    def _finish(self, summary: Optional[_Summary], verbatim: List[dict], budget: int, status: str) -> CompactHistory:
+        head = [{"role": "system", "content": SUMMARY_PREFIX + summary.text}] if summary else []
+        # 예산을 넘으면 오래된 원문 턴부터 제외 (최근 1턴은 남김)
+        while len(verbatim) > 2 and message_tokens(head + verbatim) > budget:
+            verbatim = verbatim[2:]
+        messages = head + verbatim
+        if status == "cached":
+            with self._lock:
+                self._counters["summary_hits"] += 1
+        return CompactHistory(messages, {
+            "history_tokens": message_tokens(messages),
+            "history_budget": budget,
+            "turns_verbatim": len(verbatim) // 2,
+            "turns_summarized": summary.turns if summary else 0,
+            "summary": status,
+        })
+
+    def _args(self, keep_turns: Optional[int], budget_tokens: Optional[int]) -> Tuple[int, int]:
+        return (
+            self.keep_turns if keep_turns is None else keep_turns,
+            self.budget_tokens if budget_tokens is None else budget_tokens,
+        )
+
+    def compact(
+        self,
+        session_id: str,
+        history: List[dict],
+        summarize: SummarizeFn,
+        keep_turns: Optional[int] = None,
+        budget_tokens: Optional[int] = None,
+    ) -> CompactHistory:
+        """keep_turns/budget_tokens를 주면 이 요청에만 기본값 대신 적용"""
+        keep_turns, budget = self._args(keep_turns, budget_tokens)
+        plan = self._plan(session_id, history, keep_turns, budget)
+        if not plan.refresh:
+            return self._finish(plan.summary, plan.pending + plan.recent, budget, "cached" if plan.summary else "none")
+        try:
+            text = summarize(plan.summary.text if plan.summary else "", plan.pending)
+        except Exception:
+            return self._failed(plan, budget)
+        summary = self._store(session_id, plan, text)
+        return self._finish(summary, plan.recent, budget, "refreshed")
+
+    async def compact_async(
+        self,
+        session_id: str,
+        history: List[dict],
+        summarize: AsyncSummarizeFn,
+        keep_turns: Optional[int] = None,
+        budget_tokens: Optional[int] = None,
+    ) -> CompactHistory:
+        """compact의 async 버전 (요약 생성을 await)"""
+        keep_turns, budget = self._args(keep_turns, budget_tokens)
+        plan = self._plan(session_id, history, keep_turns, budget)
+        if not plan.refresh:
+            return self._finish(plan.summary, plan.pending + plan.recent, budget, "cached" if plan.summary else "none")
+        try:
+            text = await summarize(plan.summary.text if plan.summary else "", plan.pending)
+        except Exception:
+            return self._failed(plan, budget)
+        summary = self._store(session_id, plan, text)
+        return self._finish(summary, plan.recent, budget, "refreshed")
+
+    def _failed(self, plan: _Plan, budget: int) -> CompactHistory:
+        # 요약 실패 시 기존 요약 + 원문(예산만큼)으로 진행
+        with self._lock:
+            self._counters["summary_failures"] += 1
+        return self._finish(plan.summary, plan.pending + plan.recent, budget, "failed")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, "sessions": len(self._summaries)}
+
+
+_compactor: Optional[HistoryCompactor] = None
+
+
+def get_history_compactor() -> HistoryCompactor:
+    """프로세스 공용 압축기 (CHAT_HISTORY_* 환경변수로 설정)"""
+    global _compactor
+    if _compactor is None:
+        _compactor = HistoryCompactor(
+            keep_turns=int(os.getenv("CHAT_HISTORY_KEEP_TURNS", "4")),
+            budget_tokens=int(os.getenv("CHAT_HISTORY_BUDGET_TOKENS", "1500")),
+            refresh_turns=int(os.getenv("CHAT_HISTORY_SUMMARY_REFRESH_TURNS", "4")),
+        )
+    return _compactor
@@ -3,11 +3,38 @@
 - greeting: 인사
 - data_query: 데이터/테이블 관련 질문
 - off_topic: 주제 외 질문
+
+단계별 분류 (INTENT_CLASSIFIER=tiered, 기본값)
+- rule: 인사 정규식 / 스키마 식별자, 또는 스키마 용어(schema_catalog.DOCS) 바로 뒤에 컬럼을 가리키는 말
+- ngram: 라벨된 예시로 학습한 문자 n-gram 나이브 베이즈 (확신도가 HELD_OUT으로 보정한 임계값 이상일 때만)
+- centroid: RAG용으로 계산한 질문 임베딩을 intent_centroids(의도별 평균 벡터)와 비교 (추가 네트워크 호출 없음)
+- llm: 위에서 결정하지 못한 메시지만 gpt-4o-mini로
+단계별 hit 수/평균 지연은 stats()로 확인
 """
-from openai import OpenAI
+from collections import Counter
+from dataclasses import dataclass
+from openai import AsyncOpenAI, OpenAI
+import logging
+import math
 import os
+import re
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from t2sql.db.table_versions import get_table_version_tracker
+from t2sql.db.vector_pool import get_vector_pool
+from t2sql.services.rag.fewshot_catalog import FEWSHOTS
+from t2sql.services.rag.schema_catalog import DOCS
+
+logger = logging.getLogger(__name__)
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+INTENTS = ("greeting", "data_query", "off_topic")
 
 SYSTEM_PROMPT = """당신은 사용자 의도를 분류하는 분류기입니다.
 사용자 메시지를 읽고 다음 중 하나로 분류하세요:
@@ -19,29 +46,364 @@ SYSTEM_PROMPT = """당신은 사용자 의도를 분류하는 분류기입니다
 반드시 greeting, data_query, off_topic 중 하나만 출력하세요. 다른 말은 하지 마세요."""
 
 
-def classify_intent(message: str) -> str:
+def _request(message: str) -> dict:
+    return dict(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": message}
+        ],
+        max_tokens=20,
+        temperature=0
+    )
+
+
+def _parse_intent(response) -> str:
+    intent = response.choices[0].message.content.strip().lower()
+
+    # 유효한 의도인지 확인
+    if intent in INTENTS:
+        return intent
+    return "off_topic"
+
+
+def classify_intent_llm(message: str) -> str:
+    """LLM 단계만 사용한 분류"""
+    try:
+        return _parse_intent(client.chat.completions.create(**_request(message)))
+    except Exception:
+        return "data_query"  # 실패 시 기본값
+
+
+async def classify_intent_llm_async(message: str) -> str:
+    try:
+        return _parse_intent(await async_client.chat.completions.create(**_request(message)))
+    except Exception:
+        return "data_query"
+
+
+# ============ 로컬 단계 (rule / n-gram) ============
+
+# n-gram 학습용 라벨 예시 (data_query에는 fewshot_catalog.FEWSHOTS 질문도 추가됨)
+EXAMPLES: Dict[str, List[str]] = {
+    "greeting": [
+        "안녕", "안녕하세요", "하이", "헬로", "반가워", "반갑습니다", "뭐해", "좋은 아침",
+        "안녕 반가워", "ㅎㅇ", "hi", "hello", "hey", "처음 왔어요", "잘 지냈어?", "고마워",
+    ],
+    "data_query": [
+        "이번 달 생산량은?", "주문 현황 알려줘", "공정별 생산 합계 보여줘", "어제 생산량 알려줘",
+        "출고 대기 주문량은?", "작업자 수는 몇 명이야?", "제품별 생산량 비교해줘",
+        "지난주 주문량 추이", "공정 A 실적", "달성률이 가장 낮은 공정은?", "월별 생산 합계",
+        "미출고 물량 얼마나 남았어?", "생산 데이터 보여줘", "테이블 목록 알려줘",
+    ],
+    "off_topic": [
+        "오늘 날씨 어때?", "맛집 추천해줘", "코드 짜줘", "농담 하나 해줘", "주식 전망 알려줘",
+        "영화 추천해줘", "파이썬 공부 방법", "여행지 추천", "노래 불러줘", "점심 메뉴 골라줘",
+        "너는 누가 만들었어?", "축구 경기 결과 알려줘", "환율 알려줘", "번역해줘",
+    ],
+}
+
+# n-gram 임계값 보정용 held-out 예시 (EXAMPLES와 겹치지 않음, 도메인 밖 짧은 질문 / 애매한 현장 질문 위주)
+HELD_OUT: Dict[str, List[str]] = {
+    "greeting": ["안녕하세요 반갑습니다", "하이 하이", "좋은 저녁이에요", "잘 지냈어요?", "헬로우", "감사합니다", "오랜만이야"],
+    "data_query": [
+        "이번 주 생산량 합계", "공정 B 주문량 알려줘", "출고 완료 주문 수량", "제품별 생산 실적",
+        "어제 공정별 생산량", "작업자 목록 보여줘", "3월 주문량 추이", "A 구역 어때?",
+    ],
+    "off_topic": [
+        "갤럭시 가격 얼마야?", "지금 뭐 보고 있어?", "뭐 먹고 있어?", "요즘 뭐 해?", "택배 언제 와?",
+        "저녁 뭐 먹지", "운동 루틴 추천", "비행기표 예약해줘", "노트북 추천해줘", "내일 비 와?",
+        "오늘 기분 어때?", "피자 배달 몇 시까지 돼?", "커피 주문하고 싶어",
+    ],
+}
+
+_GREETING_RE = re.compile(
+    r"^(안녕(하세요|하십니까)?|하이|헬로|반가(워|워요|습니다)|ㅎㅇ|hi|hello|hey|좋은\s?(아침|저녁|하루)|뭐해|고마워(요)?|감사(합니다|해요)?)"
+    r"[\s!~.?ㅎㅋ^]*$",
+    re.IGNORECASE,
+)
+# 한국어 스키마 용어("주문", "생산")는 일상 문장에도 나오므로 컬럼을 가리키는 말이 바로 붙어야 규칙으로 결정
+# (생산량, 주문 수량, 공정별, 공정 c, 작업자 수 ... / "피자 주문 몇 시까지 돼?"는 규칙에서 걸리지 않음)
+_COLUMN_CUE = r"\s?(?:량|수량|합계|총합|합|실적|현황|추이|목록|대기|완료|별|수(?:는|가|를|도)?(?![가-힣])|[a-i](?![a-z0-9_]))"
+_KOREAN_RE = re.compile(r"[가-힣]{2,}")
+# DOCS 설명에서 스키마 용어로 쓰지 않을 일반 단어
+_TERM_STOPWORDS = {"단위", "어떤", "사전", "테이블", "매핑", "목록", "일자"}
+_TERM_SUFFIXES = ("하는지", "별", "을", "를", "이", "가")
+
+
+def schema_terms(docs: Iterable[dict]) -> frozenset:
+    """schema_catalog.DOCS에서 테이블/컬럼 이름과 설명의 한국어 명사를 뽑는다"""
+    terms = set()
+    for d in docs:
+        content = d["content"]
+        terms.add(d["table_name"])
+        terms.update(m for m in re.findall(r"^\s*-\s*([a-z_]+)\s", content, re.MULTILINE))
+        for line in content.splitlines():
+            if "설명:" not in line:
+                continue
+            for word in _KOREAN_RE.findall(line.split("설명:", 1)[1]):
+                for suffix in _TERM_SUFFIXES:
+                    if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+                        word = word[: -len(suffix)]
+                        break
+                if word not in _TERM_STOPWORDS:
+                    terms.add(word)
+    return frozenset(terms)
+
+
+def _normalize(message: str) -> str:
+    return " ".join(message.lower().split())
+
+
+def _ngrams(text: str, n_max: int = 3) -> Counter:
+    padded = f" {text} "
+    return Counter(padded[i:i + n] for n in range(1, n_max + 1) for i in range(len(padded) - n + 1))
+
+
+class NgramNaiveBayes:
     """
-    사용자 메시지의 의도를 분류
-    Returns: "greeting" | "data_query" | "off_topic"
+    문자 1~3-gram 다항 나이브 베이즈 (라플라스 스무딩).
+    n-gram 수만큼 곱해지는 우도는 과신하기 쉬워서, n-gram당 평균 로그우도에 sharpness를 곱해 확률로 바꾼다.
     """
+
+    def __init__(self, examples: Dict[str, Sequence[str]], alpha: float = 0.5, sharpness: float = 10.0):
+        self.alpha = alpha
+        self.sharpness = sharpness
+        self.labels = tuple(examples)
+        self._counts: Dict[str, Counter] = {k: Counter() for k in self.labels}
+        for label, texts in examples.items():
+            for t in texts:
+                self._counts[label].update(_ngrams(_normalize(t)))
+        self._vocab = len(set().union(*self._counts.values()))
+        self._totals = {k: sum(c.values()) for k, c in self._counts.items()}
+
+    def predict(self, message: str) -> Tuple[str, float]:
+        """(label, 사후확률)"""
+        feats = _ngrams(_normalize(message))
+        n_feats = sum(feats.values())
+        scores = {}
+        for label in self.labels:
+            counts, denom = self._counts[label], self._totals[label] + self.alpha * self._vocab
+            loglik = sum(n * math.log((counts.get(g, 0) + self.alpha) / denom) for g, n in feats.items())
+            scores[label] = self.sharpness * loglik / n_feats
+        top = max(scores.values())
+        exp = {k: math.exp(v - top) for k, v in scores.items()}
+        best = max(exp, key=exp.get)
+        return best, exp[best] / sum(exp.values())
+
+
+def training_examples() -> Dict[str, List[str]]:
+    """n-gram 학습 예시: EXAMPLES + few-shot 질문(data_query)"""
+    examples = {k: list(v) for k, v in EXAMPLES.items()}
+    examples["data_query"] += [fs["question"] for fs in FEWSHOTS]
+    return examples
+
+
+def calibrate_threshold(
+    model: NgramNaiveBayes, held_out: Dict[str, Sequence[str]], floor: float = 0.9, margin: float = 0.05
+) -> float:
+    """held-out에서 틀린 예측 중 가장 높은 확신도 + margin (최소 floor) -> 그 이상만 n-gram 단계에서 결정"""
+    wrong = []
+    for label, texts in held_out.items():
+        for text in texts:
+            predicted, prob = model.predict(text)
+            if predicted != label:
+                wrong.append(prob + margin)
+    return min(max([floor] + wrong), 0.999)
+
+
+@dataclass(frozen=True)
+class IntentDecision:
+    intent: str
+    tier: str  # "rule" | "ngram" | "llm"
+    confidence: float = 1.0
+
+
+class CentroidIntentClassifier:
+    """질문 임베딩과 의도별 centroid의 코사인 유사도. 1, 2위 차이가 margin 이상일 때만 결정"""
+
+    def __init__(self, centroids: Dict[str, Sequence[float]], margin: float = 0.05):
+        self.labels = tuple(centroids)
+        matrix = np.asarray([centroids[k] for k in self.labels], dtype=np.float64)
+        self.matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.margin = margin
+
+    def scores(self, qvec: Sequence[float]) -> Dict[str, float]:
+        query = np.asarray(qvec, dtype=np.float64)
+        sims = self.matrix @ (query / np.linalg.norm(query))
+        return {k: float(v) for k, v in zip(self.labels, sims)}
+
+    def decide(self, qvec: Sequence[float]) -> Optional[IntentDecision]:
+        ranked = sorted(self.scores(qvec).items(), key=lambda kv: kv[1], reverse=True)
+        gap = ranked[0][1] - ranked[1][1] if len(ranked) > 1 else 1.0
+        if gap < self.margin:
+            return None
+        return IntentDecision(ranked[0][0], "centroid", round(gap, 4))
+
+
+def load_intent_centroids() -> Dict[str, List[float]]:
+    """intent_centroids 테이블 (없거나 읽을 수 없으면 빈 dict)"""
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": message}
-            ],
-            max_tokens=20,
-            temperature=0
+        with get_vector_pool().connection() as conn:
+            rows = conn.execute("SELECT intent, embedding::real[] FROM intent_centroids").fetchall()
+    except Exception:
+        logger.warning("intent_centroids not available; centroid tier disabled", exc_info=True)
+        return {}
+    return {intent: list(vec) for intent, vec in rows}
+
+
+class TieredIntentClassifier:
+    TIERS = ("rule", "ngram", "centroid", "llm")
+
+    def __init__(
+        self,
+        examples: Dict[str, Sequence[str]],
+        terms: Iterable[str],
+        threshold: Optional[float] = None,
+        centroids: Optional[CentroidIntentClassifier] = None,
+    ):
+        self.centroids = centroids
+        terms = set(terms)
+        # 영문 식별자는 단어 경계로 (예: "day"가 "today"에 걸리지 않도록), 한국어는 부분 문자열로
+        idents = sorted(t for t in terms if t.isascii())
+        self._ident_re = re.compile(r"\b(" + "|".join(map(re.escape, idents)) + r")\b") if idents else None
+        korean = sorted((t for t in terms if not t.isascii()), key=len, reverse=True)
+        self._term_re = re.compile("(?:" + "|".join(map(re.escape, korean)) + ")" + _COLUMN_CUE) if korean else None
+        self.model = NgramNaiveBayes(examples)
+        # 지정하지 않으면 HELD_OUT으로 보정 (학습 문장과 비슷하기만 한 도메인 밖 질문을 확신하지 않도록)
+        self.threshold = calibrate_threshold(self.model, HELD_OUT) if threshold is None else threshold
+        self._lock = threading.Lock()
+        self._counters = {t: {"hits": 0, "ms": 0.0} for t in self.TIERS}
+
+    def classify_local(self, message: str) -> Optional[IntentDecision]:
+        """로컬 단계에서 확신할 수 있으면 결정, 아니면 None (LLM으로 넘김)"""
+        text = _normalize(message)
+        if (self._ident_re and self._ident_re.search(text)) or (self._term_re and self._term_re.search(text)):
+            return IntentDecision("data_query", "rule")
+        if _GREETING_RE.match(text):
+            return IntentDecision("greeting", "rule")
+        label, prob = self.model.predict(text)
+        if prob >= self.threshold:
+            return IntentDecision(label, "ngram", round(prob, 4))
+        return None
+
+    def classify(
+        self,
+        message: str,
+        llm_fn: Callable[[str], str],
+        vector_fn: Optional[Callable[[], Sequence[float]]] = None,
+    ) -> IntentDecision:
+        """vector_fn: 질문 임베딩을 돌려주는 함수 (RetrievalContext.vector 등, RAG와 같은 벡터 재사용)"""
+        start = time.perf_counter()
+        decision = self.classify_local(message)
+        if decision is None and self.centroids is not None and vector_fn is not None:
+            try:
+                decision = self.centroids.decide(vector_fn())
+            except Exception:
+                # 임베딩 실패(API 오류/타임아웃)는 centroid 단계만 건너뛰고 LLM으로
+                logger.warning("question embedding failed; skipping centroid tier", exc_info=True)
+        if decision is None:
+            decision = IntentDecision(llm_fn(message), "llm")
+        self._record(decision.tier, start)
+        return decision
+
+    async def classify_async(
+        self,
+        message: str,
+        llm_fn: Callable[[str], Awaitable[str]],
+        vector_fn: Optional[Callable[[], Awaitable[Sequence[float]]]] = None,
+    ) -> IntentDecision:
+        start = time.perf_counter()
+        decision = self.classify_local(message)
+        if decision is None and self.centroids is not None and vector_fn is not None:
+            try:
+                decision = self.centroids.decide(await vector_fn())
+            except Exception:
+                logger.warning("question embedding failed; skipping centroid tier", exc_info=True)
+        if decision is None:
+            decision = IntentDecision(await llm_fn(message), "llm")
+        self._record(decision.tier, start)
+        return decision
+
+    def _record(self, tier: str, start: float) -> None:
+        elapsed = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._counters[tier]["hits"] += 1
+            self._counters[tier]["ms"] += elapsed
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = sum(c["hits"] for c in self._counters.values())
+            return {
+                tier: {
+                    "hits": c["hits"],
+                    "hit_rate": round(c["hits"] / total, 4) if total else 0.0,
+                    "avg_ms": round(c["ms"] / c["hits"], 3) if c["hits"] else 0.0,
+                }
+                for tier, c in self._counters.items()
+            }
+
+
+_classifier: Optional[TieredIntentClassifier] = None
+
+
+def get_intent_classifier() -> Optional[TieredIntentClassifier]:
+    """프로세스 공용 분류기 (INTENT_CLASSIFIER=llm 이면 None -> 항상 LLM)"""
+    global _classifier
+    if os.getenv("INTENT_CLASSIFIER", "tiered") != "tiered":
+        return None
+    if _classifier is None:
+        _classifier = TieredIntentClassifier(
+            training_examples(),
+            schema_terms(DOCS),
+            threshold=float(os.environ["INTENT_LOCAL_THRESHOLD"]) if os.getenv("INTENT_LOCAL_THRESHOLD") else None,
         )
-        intent = response.choices[0].message.content.strip().lower()
+        # centroid는 DB에서 읽으므로 백그라운드로 (로딩 전에는 centroid 단계 없이 동작)
+        threading.Thread(target=_reload_centroids, name="intent-centroids", daemon=True).start()
+        get_table_version_tracker().subscribe(_on_table_changed)
+    return _classifier
 
-        # 유효한 의도인지 확인
-        if intent in ("greeting", "data_query", "off_topic"):
-            return intent
-        return "off_topic"
-    except Exception:
-        return "data_query"  # 실패 시 기본값
+
+def _build_centroids() -> Optional[CentroidIntentClassifier]:
+    if os.getenv("INTENT_CENTROIDS", "1") != "1":
+        return None
+    centroids = load_intent_centroids()
+    if set(centroids) != set(INTENTS):
+        return None
+    return CentroidIntentClassifier(centroids, margin=float(os.getenv("INTENT_CENTROID_MARGIN", "0.05")))
+
+
+def _reload_centroids() -> None:
+    if _classifier is not None:
+        _classifier.centroids = _build_centroids()
+
+
+def _on_table_changed(table: str) -> None:
+    # build_intent_centroids.py로 다시 빌드하면 반영
+    if table == "intent_centroids":
+        _reload_centroids()
+
+
+def classify_intent(message: str, ctx=None) -> str:
+    """
+    사용자 메시지의 의도를 분류 (로컬 단계에서 결정 못 한 경우만 LLM 호출)
+    ctx(RetrievalContext)를 넘기면 그 질문 임베딩으로 centroid 단계를 거친다
+    Returns: "greeting" | "data_query" | "off_topic"
+    """
+    classifier = get_intent_classifier()
+    if classifier is None:
+        return classify_intent_llm(message)
+    vector_fn = (lambda: ctx.vector) if ctx is not None else None
+    return classifier.classify(message, classify_intent_llm, vector_fn).intent
+
+
+async def classify_intent_async(message: str, ctx=None) -> str:
+    """classify_intent의 async 버전"""
+    classifier = get_intent_classifier()
+    if classifier is None:
+        return await classify_intent_llm_async(message)
+    vector_fn = ctx.vector_async if ctx is not None else None
+    return (await classifier.classify_async(message, classify_intent_llm_async, vector_fn)).intent
 
 
 # 하드코딩된 응답
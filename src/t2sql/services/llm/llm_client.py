@@ -1,83 +1,181 @@
 import os
+import threading
 from datetime import date
+from functools import lru_cache
+from typing import List, Optional
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
-from t2sql.services.rag.vector_search import search_schema, search_fewshots
+from t2sql.services.query.sql_validator import ALLOWED_TABLES_BY_ROLE
+from t2sql.services.rag.fewshot_catalog import FEWSHOTS
+from t2sql.services.rag.schema_catalog import DOCS
+from t2sql.services.rag.vector_search import SCHEMA_K, RetrievalContext
 
 client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+async_client = AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+
+MODEL = "gpt-4o-mini"
+
+
+# 프롬프트 구조: [system: 고정 규칙 + 테이블 설명 + 전체 예제 SQL(버전 관리)] + [user: 날짜 규칙 -> few-shot -> 스키마 -> 질문]
+# 앞부분이 호출마다 바이트 단위로 같아야 provider 쪽 prompt caching이 적중하므로 바뀌는 값은 모두 뒤로.
+# provider 캐시는 prefix가 1024토큰 이상일 때만 적용되므로 고정부에 DOCS/FEWSHOTS를 포함.
+# 고정부 예제 SQL의 날짜는 EXAMPLE_DAY로 치환 (placeholder를 그대로 두면 모델이 {BASE_YEAR}를 출력할 수 있음)
+# 규칙/DOCS/FEWSHOTS를 고치면 PROMPT_VERSION도 올릴 것 (캐시 키 / 통계 구분용)
+PROMPT_VERSION = "sql-v4"
+# 실제 날짜와 헷갈리지 않도록 눈에 띄게 지난 날짜
+EXAMPLE_DAY = date(2000, 1, 15)
+
+_SQL_RULES = """너는 Postgres SQL 생성기야.
+규칙:
+- SELECT만 생성
+- 출력은 반드시 SQL 텍스트만. (``` 같은 코드블럭/설명/주석 금지)
+- 금지: 테이블 중 dim_worker를 SELECT 접근 금지
+- 위험한 쿼리(INSERT/UPDATE/DELETE/DROP/ALTER) 금지
+- 스키마 컨텍스트에 있는 것만 작성(추측 금지)
+- 날짜는 사용자 메시지의 "날짜 기준"을 따름
+- "최근"/"최근 현황"/"최근 주문" = 이번 달로 해석
+- 기간은 [start, end) 반열림구간 사용 (end는 다음날/다음월 1일)
+- WHERE vs HAVING:
+    - 집계함수(SUM/AVG/COUNT 등) 조건이면 HAVING
+    - 기간/상태/상품 같은 필터는 WHERE
+- SQL은 가능한 단순하게 작성
+- 아래 조건에 해당하면 CTE(WITH) 사용:
+  1) 서로 다른 집계 결과를 결합할 때(예 주문 vs 생산)
+  2) 집계 결과를 다시 필터링/정렬/비율 계산할 때
+  3) 같은 서브쿼리가 2번 이상 반복될 때
+- CTE 이름은 의미가 드러나게 작성 (예 orders_waiting, production_total, by_process).
+- 사용자 메시지의 "참고할 유사 예제"와 같은 패턴이면 그 SQL 구조를 따를 것"""
+
+
+def _static_prompt() -> str:
+    """규칙 + 일반 사용자 조회 가능 테이블 설명 + 전체 예제 SQL (날짜/질문과 무관한 고정 문자열)"""
+    tables = "\n\n".join(
+        d["content"] for d in DOCS
+        if d["doc_type"] == "table" and d["table_name"] in ALLOWED_TABLES_BY_ROLE["user"]
+    )
+    examples = "\n\n".join(f"Q: {fs['question']}\n{_fewshot_sql(fs['sql'], EXAMPLE_DAY)}" for fs in FEWSHOTS)
+    return f"""{_SQL_RULES}
 
+테이블 설명:
+{tables}
 
-def llm_generate_sql(question: str) -> str:
-    today = date.today()
-    base_year = str(today.year)
-    base_month = f"{today.month:02d}"
+예제 SQL 모음 (예시 날짜 {EXAMPLE_DAY.year}년 {EXAMPLE_DAY.month:02d}월 기준 -> 실제 SQL은 사용자 메시지 "날짜 기준"의 올해/이번 달을 사용할 것):
+{examples}"""
 
-    # 다음 달 계산 (12월 -> 1월 처리)
-    next_month = today.month + 1
-    next_year = today.year
-    if next_month > 12:
-        next_month = 1
-        next_year += 1
-    next_month_str = f"{next_year}-{next_month:02d}-01"
 
-    q = question.strip()
-    rows = search_schema(q, k=8)
+@lru_cache(maxsize=4)
+def _date_rules(today: date) -> str:
+    """날짜 기준 블록 (하루 동안 같은 문자열)"""
+    base_year, base_month = str(today.year), f"{today.month:02d}"
+    # 다음 달 (12월 -> 다음 해 1월)
+    next_year, next_month = (today.year + 1, 1) if today.month == 12 else (today.year, today.month + 1)
+    return f"""날짜 기준:
+- 오늘 날짜: {base_year}-{base_month}-{today.day:02d}
+- "올해" = {base_year}년
+- "이번달"/"이번 달" = {base_year}년 {base_month}월
+- 예: "이번달" → WHERE day >= '{base_year}-{base_month}-01' AND day < '{next_year}-{next_month:02d}-01'"""
+
+
+@lru_cache(maxsize=512)
+def _fewshot_sql(sql: str, today: date) -> str:
+    """few-shot SQL의 {BASE_YEAR}/{BASE_MONTH} 치환 (날짜별 메모)"""
+    return sql.replace("{BASE_YEAR}", str(today.year)).replace("{BASE_MONTH}", f"{today.month:02d}")
+
+
+SQL_SYSTEM_PROMPT = _static_prompt()
+
+
+def build_sql_messages(q: str, rows, fewshot_rows, today: Optional[date] = None) -> List[dict]:
+    """검색된 schema/few-shot 행으로 SQL 생성 메시지 구성 (고정 system + 요청별 user)"""
+    today = today or date.today()
 
+    # semantic few-shot: 질문과 유사한 예제 3개
+    few_shots = "\n\n".join(
+        f"Example {i}:\nQ: {fq}\n{_fewshot_sql(fsql, today)}"
+        for i, (fq, fsql, dist) in enumerate(fewshot_rows, 1)
+    )
     schema_context = "\n".join(
         f"- ({doc_type}) {table_name}{('.' + column_name) if column_name else ''}\n {content}"
         for doc_type, table_name, column_name, content, dist in rows
         if table_name != "dim_worker"
     )
+    user = f"""{_date_rules(today)}
+
+참고할 유사 예제:
+{few_shots}
+
+스키마 컨텍스트:
+{schema_context}
+
+질문: {q}
+SQL만 출력해"""
+    return [{"role": "system", "content": SQL_SYSTEM_PROMPT}, {"role": "user", "content": user}]
+
+
+class PromptCacheStats:
+    """OpenAI usage.prompt_tokens_details.cached_tokens 집계 (prefix 캐시 적중률)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0}
 
-    # semantic few-shot: 질문과 유사한 예제 3개 검색
-    fewshot_rows = search_fewshots(q, k=3)
-    few_shots_parts = []
-    for i, (fq, fsql, dist) in enumerate(fewshot_rows, 1):
-        sql_with_vars = fsql.replace("{BASE_YEAR}", base_year).replace("{BASE_MONTH}", base_month)
-        few_shots_parts.append(f"Example {i}:\nQ: {fq}\n{sql_with_vars}")
-    few_shots = "\n\n".join(few_shots_parts)
-
-    prompt = f"""
-    너는 Postgres SQL 생성기야.
-    규칙:
-    - SELECT만 생성
-    - 출력은 반드시 SQL 텍스트만. (``` 같은 코드블럭/설명/주석 금지)
-    - 금지: 테이블 중 dim_worker를 SELECT 접근 금지
-    - 위험한 쿼리(INSERT/UPDATE/DELETE/DROP/ALTER) 금지
-    - 아래 스키마 컨텍스트에 있는 것만 작성(추측 금지)
-    - 날짜 규칙:
-    - 오늘 날짜: {base_year}-{base_month}-{today.day:02d}
-    - "올해" = {base_year}년
-    - "이번달"/"이번 달" = {base_year}년 {base_month}월
-    - "최근"/"최근 현황"/"최근 주문" = 이번 달({base_year}년 {base_month}월)로 해석
-    - 기간은 [start, end) 반열림구간 사용 (end는 다음날/다음월 1일)
-    - 예: "이번달" → WHERE day >= '{base_year}-{base_month}-01' AND day < '{next_month_str}'
-    - WHERE vs HAVING:
-        - 집계함수(SUM/AVG/COUNT 등) 조건이면 HAVING
-        - 기간/상태/상품 같은 필터는 WHERE
-    - SQL은 가능한 단순하게 작성
-    - 아래 조건에 해당하면 CTE(WITH) 사용:
-    1) 서로 다른 집계 결과를 결합할 때(예 주문 vs 생산)
-    2) 집계 결과를 다시 필터링/정렬/비율 계산할 때
-    3) 같은 서브쿼리가 2번 이상 반복될 때
-    - CTE 이름은 의미가 드러나게 작성 (예 orders_waiting, production_total, by_process).
-
-
-    참고할 유사 예제:
-    {few_shots}
-
-    스키마 컨텍스트:
-    {schema_context}
-
-    질문: {q}
-    SQL만 출력해
+    def record(self, usage) -> None:
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        with self._lock:
+            self._counters["calls"] += 1
+            self._counters["prompt_tokens"] += usage.prompt_tokens or 0
+            self._counters["cached_tokens"] += (getattr(details, "cached_tokens", None) or 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            prompt = self._counters["prompt_tokens"]
+            return {
+                "version": PROMPT_VERSION,
+                **self._counters,
+                "cached_ratio": round(self._counters["cached_tokens"] / prompt, 4) if prompt else 0.0,
+            }
+
+
+prompt_cache_stats = PromptCacheStats()
+
+
+def _completion_kwargs(messages: List[dict]) -> dict:
+    # prompt_cache_key: 같은 prefix 요청을 같은 캐시로 라우팅 (버전이 바뀌면 새 키)
+    return {"model": MODEL, "messages": messages, "temperature": 0, "prompt_cache_key": f"t2sql-{PROMPT_VERSION}"}
+
+
+def llm_generate_sql(question: str, ctx: Optional[RetrievalContext] = None) -> str:
+    """
+    질문 -> SQL 생성.
+    ctx를 넘기면 그 안의 질문 임베딩/타이밍을 공유한다 (임베딩은 요청당 1회).
     """
+    q = question.strip()
+    if ctx is None:
+        ctx = RetrievalContext(question=q)
+    # schema(테이블 -> 컬럼/값 2단계) + few-shot을 한 번의 DB 왕복으로 검색
+    rows, fewshot_rows = ctx.retrieve(k_schema=SCHEMA_K, k_fewshot=3)
+    messages = build_sql_messages(q, rows, fewshot_rows)
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0,
-    )
+    with ctx.timer("llm_ms"):
+        response = client.chat.completions.create(**_completion_kwargs(messages))
+    prompt_cache_stats.record(response.usage)
+
+    return response.choices[0].message.content.strip()
+
+
+async def llm_generate_sql_async(question: str, ctx: Optional[RetrievalContext] = None) -> str:
+    """llm_generate_sql의 async 버전 (AsyncOpenAI + async 벡터 검색)"""
+    q = question.strip()
+    if ctx is None:
+        ctx = RetrievalContext(question=q)
+    rows, fewshot_rows = await ctx.retrieve_async(k_schema=SCHEMA_K, k_fewshot=3)
+    messages = build_sql_messages(q, rows, fewshot_rows)
+
+    with ctx.timer("llm_ms"):
+        response = await async_client.chat.completions.create(**_completion_kwargs(messages))
+    prompt_cache_stats.record(response.usage)
 
     return response.choices[0].message.content.strip()
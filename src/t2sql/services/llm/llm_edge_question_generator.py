@@ -5,11 +5,12 @@ from dataclasses import dataclass
 from datetime import date
 from typing import Iterable, List, Optional
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
-from t2sql.services.rag.vector_search import fetch_all_schema
+from t2sql.services.rag.vector_search import fetch_all_schema, fetch_all_schema_async
 
 client = OpenAI()
+async_client = AsyncOpenAI()
 
 
 @dataclass(frozen=True)
@@ -32,14 +33,21 @@ _TYPE_NAMES = {
 }
 
 
-def build_full_schema_context() -> str:
-    rows = fetch_all_schema()
+def _format_schema_rows(rows) -> str:
     return "\n".join(
         f"- ({doc_type}) {table_name}{('.' + column_name) if column_name else ''}\n {content}"
         for doc_type, table_name, column_name, content, dist in rows
     )
 
 
+def build_full_schema_context() -> str:
+    return _format_schema_rows(fetch_all_schema())
+
+
+async def build_full_schema_context_async() -> str:
+    return _format_schema_rows(await fetch_all_schema_async())
+
+
 def _parse_questions_json(raw: str) -> List[dict]:
     raw = raw.strip()
     if not raw:
@@ -60,18 +68,16 @@ def _parse_questions_json(raw: str) -> List[dict]:
     return data
 
 
-def generate_edge_questions_with_llm(
-    total_questions: int = 7,
-    seed: Optional[int] = None,
-    base_date: Optional[date] = None,
-    type_ids: Optional[List[int]] = None,
-) -> List[EdgeQuestion]:
-    base_date = base_date or date.today()
+def _build_edge_prompt(
+    schema_context: str,
+    total_questions: int,
+    seed: Optional[int],
+    base_date: date,
+    type_ids: Optional[List[int]],
+) -> str:
     base_year = base_date.year
     base_month = base_date.month
 
-    schema_context = build_full_schema_context()
-
     # 특정 유형만 생성할 경우 유형 정의 필터링
     type_filter_note = ""
     if type_ids:
@@ -113,14 +119,11 @@ def generate_edge_questions_with_llm(
 
 JSON만 출력해.
 """.strip()
+    return prompt
 
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.7,
-    )
 
-    data = _parse_questions_json(resp.choices[0].message.content)
+def _to_edge_questions(raw: str) -> List[EdgeQuestion]:
+    data = _parse_questions_json(raw)
     results: List[EdgeQuestion] = []
     for item in data:
         type_id = int(item["type_id"])
@@ -136,6 +139,41 @@ JSON만 출력해.
     return results
 
 
+def generate_edge_questions_with_llm(
+    total_questions: int = 7,
+    seed: Optional[int] = None,
+    base_date: Optional[date] = None,
+    type_ids: Optional[List[int]] = None,
+) -> List[EdgeQuestion]:
+    prompt = _build_edge_prompt(
+        build_full_schema_context(), total_questions, seed, base_date or date.today(), type_ids
+    )
+    resp = client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.7,
+    )
+    return _to_edge_questions(resp.choices[0].message.content)
+
+
+async def generate_edge_questions_with_llm_async(
+    total_questions: int = 7,
+    seed: Optional[int] = None,
+    base_date: Optional[date] = None,
+    type_ids: Optional[List[int]] = None,
+) -> List[EdgeQuestion]:
+    """generate_edge_questions_with_llm의 async 버전"""
+    prompt = _build_edge_prompt(
+        await build_full_schema_context_async(), total_questions, seed, base_date or date.today(), type_ids
+    )
+    resp = await async_client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.7,
+    )
+    return _to_edge_questions(resp.choices[0].message.content)
+
+
 def edge_questions_as_text(questions: Iterable[EdgeQuestion]) -> str:
     lines = []
     for q in questions:
@@ -1,9 +1,13 @@
 import os
 from typing import Dict, List, Optional, AsyncGenerator
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+
+from t2sql.services.llm.session_store import message_tokens
 
 client = OpenAI(api_key = os.environ.get("OPEN_API_KEY"))
+# 스트리밍은 async 클라이언트로 (토큰 대기 중 이벤트 루프를 막지 않도록)
+async_client = AsyncOpenAI(api_key = os.environ.get("OPEN_API_KEY"))
 
 MODEL = "gpt-4o-mini"
 
@@ -15,36 +19,108 @@ def _build_messages(user_msg: str, history: List[dict], system: Optional[str]) -
     msgs.append({"role":"user", "content": user_msg})
     return msgs
 
-def llm_answer_once(user_msg: str, history: List[dict], system: Optional[str] = None) -> str:
+def estimate_prompt_tokens(user_msg: str, history: List[dict], system: Optional[str] = None) -> int:
+    """실제로 보낼 메시지 기준 프롬프트 토큰 수 (로컬 추정)"""
+    return message_tokens(_build_messages(user_msg, history, system))
+
+def _record_usage(usage: Optional[dict], resp_usage) -> None:
+    if usage is not None and resp_usage is not None:
+        usage["prompt_tokens"] = resp_usage.prompt_tokens
+        usage["completion_tokens"] = resp_usage.completion_tokens
+
+def llm_answer_once(
+    user_msg: str,
+    history: List[dict],
+    system: Optional[str] = None,
+    usage: Optional[dict] = None,
+) -> str:
+    """usage(dict)를 넘기면 OpenAI가 보고한 prompt/completion 토큰 수를 채움"""
     messages = _build_messages(user_msg, history, system)
     resp = client.chat.completions.create(
         model=MODEL,
         messages=messages,
-        temparature=0.2,
+        temperature=0.2,
     )
+    _record_usage(usage, getattr(resp, "usage", None))
     return resp.choices[0].message.content or""
 
+async def llm_answer_once_async(
+    user_msg: str,
+    history: List[dict],
+    system: Optional[str] = None,
+    usage: Optional[dict] = None,
+) -> str:
+    """llm_answer_once의 async 버전 (응답 대기 중 이벤트 루프를 막지 않음)"""
+    messages = _build_messages(user_msg, history, system)
+    resp = await async_client.chat.completions.create(
+        model=MODEL,
+        messages=messages,
+        temperature=0.2,
+    )
+    _record_usage(usage, getattr(resp, "usage", None))
+    return resp.choices[0].message.content or ""
+
 async def llm_answer_stream(
     user_msg: str,
     history: List[dict],
     system: Optional[str] = None,
+    usage: Optional[dict] = None,
 ) -> AsyncGenerator[str, None]:
     """
     SSE에 흘릴 delta text를 yield.
-    openai SDK stream 동작은 버전에 따라 인터페이스 다를 수 있음
+    - AsyncOpenAI 스트림을 그대로 await 하므로 다른 요청을 막지 않음
+    - 소비자가 다음 청크를 요청할 때만 읽음 (느린 클라이언트면 업스트림 읽기도 멈춤 = backpressure)
+    - 클라이언트가 끊겨 generator가 닫히면 업스트림 HTTP 응답도 닫음
+    - usage(dict)를 넘기면 마지막 usage 이벤트의 토큰 수를 채움
     """
     messages = _build_messages(user_msg, history, system)
 
-    stream = client.chat.completions.create(
+    stream = await async_client.chat.completions.create(
         model=MODEL,
         messages= messages,
         temperature=0.2,
-        stream=True
+        stream=True,
+        **({"stream_options": {"include_usage": True}} if usage is not None else {}),
     )
 
-    for event in stream:
-        #event.choices[0].delta.content 형태(sdk나 모델에 따라 차이)
-        delta = getattr(event.choices[0].delta, "content", None)
-        if delta:
-            yield delta
+    async with stream:
+        async for event in stream:
+            _record_usage(usage, getattr(event, "usage", None))
+            if not event.choices:
+                continue
+            #event.choices[0].delta.content 형태(sdk나 모델에 따라 차이)
+            delta = getattr(event.choices[0].delta, "content", None)
+            if delta:
+                yield delta
+
+
+# ============ 대화 기록 요약 (history.HistoryCompactor용) ============
+
+def _summary_messages(previous: str, messages: List[dict]) -> List[Dict]:
+    dialog = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    return [
+        {
+            "role": "system",
+            "content": "너는 대화 요약기야. 이전 요약과 새 대화를 합쳐 이후 답변에 필요한 사실/요청/결론만 "
+                       "한국어 5문장 이내로 요약해. 숫자, 기간, 공정/제품명은 그대로 유지해.",
+        },
+        {"role": "user", "content": f"이전 요약:\n{previous or '(없음)'}\n\n새 대화:\n{dialog}"},
+    ]
 
+def summarize_history(previous: str, messages: List[dict]) -> str:
+    resp = client.chat.completions.create(
+        model=MODEL,
+        messages=_summary_messages(previous, messages),
+        temperature=0,
+        max_tokens=300,
+    )
+    return (resp.choices[0].message.content or "").strip()
+
+async def summarize_history_async(previous: str, messages: List[dict]) -> str:
+    resp = await async_client.chat.completions.create(
+        model=MODEL,
+        messages=_summary_messages(previous, messages),
+        temperature=0,
+        max_tokens=300,
+    )
+    return (resp.choices[0].message.content or "").strip()
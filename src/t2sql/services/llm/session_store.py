@@ -0,0 +1,291 @@
+"""
+채팅 세션(대화 기록) 저장소
+- MemorySessionStore: 프로세스 내 LRU(최대 세션 수) + TTL
+- PostgresSessionStore: chat_sessions 테이블 (여러 워커/재시작 간 공유, TTL + 최대 세션 수로 주기적 정리)
+- 공통: 세션마다 최근 max_turns 턴, max_tokens 토큰까지만 보관 (오래된 턴부터 버림)
+- CHAT_SESSION_STORE=memory|postgres 로 선택
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+
+from psycopg.types.json import Jsonb
+
+from t2sql.db.vector_pool import get_vector_pool
+
+logger = logging.getLogger(__name__)
+
+# 메시지 하나당 role/구분자 등 고정 오버헤드 (OpenAI chat 포맷 기준 대략)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """tokenizer 없이 대략적인 토큰 수 (영문/숫자 약 4자당 1토큰, 한글 등은 1자당 1토큰으로 보수적으로)"""
+    ascii_chars = sum(1 for c in text if c.isascii())
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def message_tokens(messages: Sequence[dict]) -> int:
+    return sum(estimate_tokens(m.get("content") or "") + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+def trim_history(messages: List[dict], max_turns: int, max_tokens: int) -> List[dict]:
+    """최근 max_turns 턴(user+assistant)만, 그래도 max_tokens를 넘으면 오래된 턴부터 버림"""
+    kept = messages[-max_turns * 2:] if max_turns > 0 else []
+    total = message_tokens(kept)
+    while kept and total > max_tokens:
+        total -= message_tokens(kept[:2])
+        kept = kept[2:]
+    return kept
+
+
+class SessionStore(ABC):
+    """세션 저장소 공통 인터페이스 (async 버전은 기본적으로 sync 호출)"""
+
+    def __init__(self, max_turns: int = 20, max_tokens: int = 4000):
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+
+    @abstractmethod
+    def get(self, session_id: str) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def append(self, session_id: str, messages: Sequence[dict]) -> List[dict]:
+        """대화 추가 후 (잘린) 새 기록 반환"""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+    async def get_async(self, session_id: str) -> List[dict]:
+        return self.get(session_id)
+
+    async def append_async(self, session_id: str, messages: Sequence[dict]) -> List[dict]:
+        return self.append(session_id, messages)
+
+    def _trim(self, messages: List[dict]) -> List[dict]:
+        return trim_history(messages, self.max_turns, self.max_tokens)
+
+
+class MemorySessionStore(SessionStore):
+    def __init__(
+        self,
+        max_sessions: int = 10_000,
+        ttl_seconds: float = 24 * 3600,
+        max_turns: int = 20,
+        max_tokens: int = 4000,
+    ):
+        super().__init__(max_turns, max_tokens)
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        # 접근 순서 = LRU 순서 (앞쪽이 가장 오래 안 쓴 세션)
+        self._sessions: "OrderedDict[str, tuple[float, List[dict]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evicted": 0, "expired": 0}
+
+    def _live(self, session_id: str) -> Optional[List[dict]]:
+        item = self._sessions.get(session_id)
+        if item is None:
+            return None
+        touched_at, history = item
+        if time.monotonic() - touched_at > self.ttl_seconds:
+            del self._sessions[session_id]
+            self._counters["expired"] += 1
+            return None
+        return history
+
+    def get(self, session_id: str) -> List[dict]:
+        with self._lock:
+            history = self._live(session_id)
+            self._counters["misses" if history is None else "hits"] += 1
+            if history is None:
+                return []
+            self._sessions.move_to_end(session_id)
+            return list(history)
+
+    def append(self, session_id: str, messages: Sequence[dict]) -> List[dict]:
+        with self._lock:
+            history = self._trim((self._live(session_id) or []) + list(messages))
+            now = time.monotonic()
+            self._sessions[session_id] = (now, history)
+            self._sessions.move_to_end(session_id)
+            self._sweep(now)
+            return list(history)
+
+    def _sweep(self, now: float) -> None:
+        # 앞쪽(오래 안 쓴 세션)부터 만료분 정리 후 최대 세션 수 초과분 제거
+        while self._sessions:
+            touched_at, _ = next(iter(self._sessions.values()))
+            if now - touched_at <= self.ttl_seconds:
+                break
+            self._sessions.popitem(last=False)
+            self._counters["expired"] += 1
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self._counters["evicted"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                **self._counters,
+                "sessions": len(self._sessions),
+                "messages": sum(len(h) for _, h in self._sessions.values()),
+            }
+
+
+class PostgresSessionStore(SessionStore):
+    """
+    chat_sessions 테이블 (마이그레이션 필요).
+    테이블이 없거나 DB 오류가 나면 로그를 남기고 retry_seconds 동안 프로세스 내 MemorySessionStore로 처리,
+    이후 다시 Postgres 시도 (일시적인 DB 오류로 워커가 계속 메모리에 머물지 않도록).
+    풀 대기는 db_timeout초까지만 (장애 중 쿨다운이 끝날 때마다 요청이 풀 기본 대기 30초에 묶이지 않도록)
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 100_000,
+        ttl_seconds: float = 24 * 3600,
+        max_turns: int = 20,
+        max_tokens: int = 4000,
+        prune_every: int = 500,
+        retry_seconds: float = 30.0,
+        db_timeout: float = 1.0,
+    ):
+        super().__init__(max_turns, max_tokens)
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.prune_every = prune_every
+        self.retry_seconds = retry_seconds
+        self.db_timeout = db_timeout
+        self._writes = 0
+        self._failures = 0
+        self._retry_at = 0.0  # 이 시각(monotonic) 전까지는 메모리로 처리
+        self._fallback = MemorySessionStore(ttl_seconds=ttl_seconds, max_turns=max_turns, max_tokens=max_tokens)
+
+    def _cooling_down(self) -> bool:
+        return time.monotonic() < self._retry_at
+
+    def _fail(self) -> MemorySessionStore:
+        self._failures += 1
+        self._retry_at = time.monotonic() + self.retry_seconds
+        logger.exception("chat session store failed; using in-process memory for %.0fs", self.retry_seconds)
+        return self._fallback
+
+    def get(self, session_id: str) -> List[dict]:
+        if self._cooling_down():
+            return self._fallback.get(session_id)
+        try:
+            with get_vector_pool().connection(timeout=self.db_timeout) as conn:
+                row = conn.execute(
+                    """
+                    SELECT messages FROM chat_sessions
+                    WHERE session_id = %s
+                      AND updated_at > now() - make_interval(secs => %s)
+                    """,
+                    (session_id, self.ttl_seconds),
+                ).fetchone()
+            return list(row[0]) if row else []
+        except Exception:
+            return self._fail().get(session_id)
+
+    def append(self, session_id: str, messages: Sequence[dict]) -> List[dict]:
+        if self._cooling_down():
+            return self._fallback.append(session_id, messages)
+        try:
+            with get_vector_pool().connection(timeout=self.db_timeout) as conn:
+                with conn.transaction():
+                    # 같은 세션에 동시에 쓰는 워커끼리 덮어쓰지 않도록 행 잠금
+                    row = conn.execute(
+                        """
+                        SELECT messages, updated_at > now() - make_interval(secs => %s)
+                        FROM chat_sessions WHERE session_id = %s FOR UPDATE
+                        """,
+                        (self.ttl_seconds, session_id),
+                    ).fetchone()
+                    history = list(row[0]) if row and row[1] else []
+                    history = self._trim(history + list(messages))
+                    conn.execute(
+                        """
+                        INSERT INTO chat_sessions (session_id, messages, token_count, updated_at)
+                        VALUES (%s, %s, %s, now())
+                        ON CONFLICT (session_id) DO UPDATE
+                        SET messages = EXCLUDED.messages, token_count = EXCLUDED.token_count, updated_at = now()
+                        """,
+                        (session_id, Jsonb(history), message_tokens(history)),
+                    )
+        except Exception:
+            return self._fail().append(session_id, messages)
+        self._writes += 1
+        if self._writes >= self.prune_every:
+            self._writes = 0
+            self.prune()
+        return history
+
+    def prune(self) -> None:
+        """만료 세션 + 최대 세션 수 초과분(오래된 순) 삭제 (실패해도 요청은 계속)"""
+        try:
+            self._prune()
+        except Exception:
+            logger.exception("chat session prune failed")
+
+    def _prune(self) -> None:
+        with get_vector_pool().connection(timeout=self.db_timeout) as conn:
+            conn.execute(
+                "DELETE FROM chat_sessions WHERE updated_at <= now() - make_interval(secs => %s)",
+                (self.ttl_seconds,),
+            )
+            conn.execute(
+                """
+                DELETE FROM chat_sessions
+                WHERE session_id IN (
+                    SELECT session_id FROM chat_sessions
+                    ORDER BY updated_at DESC
+                    OFFSET %s
+                )
+                """,
+                (self.max_sessions,),
+            )
+
+    async def get_async(self, session_id: str) -> List[dict]:
+        return await asyncio.to_thread(self.get, session_id)
+
+    async def append_async(self, session_id: str, messages: Sequence[dict]) -> List[dict]:
+        return await asyncio.to_thread(self.append, session_id, messages)
+
+    def stats(self) -> dict:
+        stats = {"backend": "postgres", "failures": self._failures}
+        if self._cooling_down():
+            stats["backend"] = "memory (postgres failed)"
+            stats["retry_in_s"] = round(self._retry_at - time.monotonic(), 1)
+        return {**stats, "fallback": self._fallback.stats()} if self._failures else stats
+
+
+_store: Optional[SessionStore] = None
+
+
+def get_session_store() -> SessionStore:
+    """프로세스 공용 세션 저장소 (CHAT_SESSION_* 환경변수로 설정)"""
+    global _store
+    if _store is None:
+        kwargs = {
+            "ttl_seconds": float(os.getenv("CHAT_SESSION_TTL_SECONDS", str(24 * 3600))),
+            "max_turns": int(os.getenv("CHAT_SESSION_MAX_TURNS", "20")),
+            "max_tokens": int(os.getenv("CHAT_SESSION_MAX_TOKENS", "4000")),
+        }
+        if os.getenv("CHAT_SESSION_STORE", "memory") == "postgres":
+            _store = PostgresSessionStore(
+                max_sessions=int(os.getenv("CHAT_SESSION_MAX", "100000")),
+                retry_seconds=float(os.getenv("CHAT_SESSION_RETRY_SECONDS", "30")),
+                db_timeout=float(os.getenv("CHAT_SESSION_DB_TIMEOUT_SECONDS", "1")),
+                **kwargs,
+            )
+        else:
+            _store = MemorySessionStore(max_sessions=int(os.getenv("CHAT_SESSION_MAX", "10000")), **kwargs)
+    return _store
@@ -0,0 +1,204 @@
+"""
+생성된 SQL 실행 전 승인 단계 (admission control)
+- 모든 실행에 statement_timeout (set_config(..., true) = SET LOCAL, 트랜잭션 단위)
+- EXPLAIN (FORMAT JSON)의 예상 비용 / 노드별 최대 예상 행 수를 role별 한도(QUERY_LIMITS_BY_ROLE)와 비교
+  - 한도 초과: 실행하지 않고 거절 (QueryRejected)
+  - throttle_cost 초과: 무거운 쿼리는 세마포어로 동시 실행 수 제한 (공용 커넥션 풀 보호)
+- 판단 결과는 (쿼리 모양, role)별로 ADMISSION_CACHE_TTL_SECONDS 동안 캐시 -> 같은 모양은 EXPLAIN 없이 바로 실행
+  (매 실행마다 EXPLAIN으로 한 번 더 계획하면 모양 단위 prepared plan 재사용 효과가 사라지므로)
+- 판단 결과는 meta["admission"]에 기록 (캐시에서 가져왔으면 cached=True)
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from typing import Optional, Tuple
+
+import psycopg
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from t2sql.services.query.sql_validator import QUERY_LIMITS_BY_ROLE, SqlRejected
+
+# 동시에 실행할 수 있는 무거운(throttled) 쿼리 수
+HEAVY_QUERY_CONCURRENCY = int(os.getenv("HEAVY_QUERY_CONCURRENCY", "2"))
+
+_heavy_sync = threading.BoundedSemaphore(HEAVY_QUERY_CONCURRENCY)
+_heavy_async = asyncio.Semaphore(HEAVY_QUERY_CONCURRENCY)
+
+_TIMEOUT_SQL = text("SELECT set_config('statement_timeout', :ms, true)")
+
+
+class QueryRejected(SqlRejected):
+    """비용/행 수 한도 초과 또는 statement_timeout"""
+
+
+@dataclass
+class Admission:
+    decision: str  # "admitted" | "throttled" | "rejected" | "skipped"
+    timeout_ms: int
+    cost: Optional[float] = None
+    rows: Optional[float] = None
+    reason: Optional[str] = None
+
+
+def admission_enabled() -> bool:
+    return os.getenv("QUERY_ADMISSION", "1") == "1"
+
+
+def limits_for(role: str) -> dict:
+    return QUERY_LIMITS_BY_ROLE.get(role, QUERY_LIMITS_BY_ROLE["user"])
+
+
+def plan_estimates(plan) -> Tuple[float, float]:
+    """EXPLAIN JSON -> (최상위 Total Cost, 모든 노드 중 최대 Plan Rows)"""
+    root = plan[0]["Plan"]
+    max_rows, stack = 0.0, [root]
+    while stack:
+        node = stack.pop()
+        max_rows = max(max_rows, float(node.get("Plan Rows", 0)))
+        stack.extend(node.get("Plans", []))
+    return float(root["Total Cost"]), max_rows
+
+
+def decide(cost: float, rows: float, limits: dict) -> Admission:
+    timeout_ms = limits["timeout_ms"]
+    if cost > limits["max_cost"]:
+        return Admission("rejected", timeout_ms, cost, rows, f"Estimated cost {cost:.0f} exceeds {limits['max_cost']}")
+    if rows > limits["max_rows"]:
+        return Admission("rejected", timeout_ms, cost, rows, f"Estimated rows {rows:.0f} exceed {limits['max_rows']}")
+    if cost > limits["throttle_cost"]:
+        return Admission("throttled", timeout_ms, cost, rows)
+    return Admission("admitted", timeout_ms, cost, rows)
+
+
+class AdmissionCache:
+    """(모양 SQL, role) -> Admission (TTL + LRU 최대 개수)"""
+
+    def __init__(self, ttl_seconds: float = 60.0, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Admission]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0}
+
+    def get(self, sql: str, role: str) -> Optional[Admission]:
+        with self._lock:
+            item = self._entries.get((sql, role))
+            if item is not None and time.monotonic() - item[0] > self.ttl_seconds:
+                del self._entries[(sql, role)]
+                item = None
+            self._counters["misses" if item is None else "hits"] += 1
+            if item is None:
+                return None
+            self._entries.move_to_end((sql, role))
+            return item[1]
+
+    def put(self, sql: str, role: str, admission: Admission) -> None:
+        with self._lock:
+            self._entries[(sql, role)] = (time.monotonic(), admission)
+            self._entries.move_to_end((sql, role))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "size": len(self._entries),
+                "hit_rate": round(self._counters["hits"] / total, 4) if total else 0.0,
+            }
+
+
+_admission_cache = AdmissionCache(
+    ttl_seconds=float(os.getenv("ADMISSION_CACHE_TTL_SECONDS", "60")),
+    max_entries=int(os.getenv("ADMISSION_CACHE_MAX", "1024")),
+)
+
+
+def get_admission_cache() -> AdmissionCache:
+    return _admission_cache
+
+
+def _cached_admission(sql: str, role: str, meta: dict) -> Optional[Admission]:
+    """EXPLAIN 없이 정할 수 있으면 Admission (검사 꺼짐 / 캐시 적중), 아니면 None"""
+    if not admission_enabled():
+        admission = Admission("skipped", limits_for(role)["timeout_ms"])
+        meta["admission"] = asdict(admission)
+        return admission
+    admission = _admission_cache.get(sql, role)
+    if admission is not None:
+        meta["admission"] = {**asdict(admission), "cached": True}
+    return admission
+
+
+def _record(sql: str, role: str, admission: Admission, meta: dict) -> None:
+    _admission_cache.put(sql, role, admission)
+    meta["admission"] = {**asdict(admission), "cached": False}
+
+
+def _timeout_reason(e: DBAPIError, timeout_ms: int) -> Optional[str]:
+    if isinstance(e.orig, psycopg.errors.QueryCanceled):
+        return f"Statement timeout ({timeout_ms}ms)"
+    return None
+
+
+@contextmanager
+def admit(db: Session, sql: str, role: str, meta: dict, params: Optional[dict] = None):
+    """with 블록 안에서 sql을 실행 (timeout 설정 -> EXPLAIN 판단 -> 필요하면 세마포어)"""
+    limits = limits_for(role)
+    db.execute(_TIMEOUT_SQL, {"ms": str(limits["timeout_ms"])})
+    admission = _cached_admission(sql, role, meta)
+    if admission is None:
+        plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params or {}).scalar()
+        admission = decide(*plan_estimates(plan), limits)
+        _record(sql, role, admission, meta)
+    if admission.decision == "rejected":
+        raise QueryRejected(admission.reason)
+
+    start = time.perf_counter()
+    with _heavy_sync if admission.decision == "throttled" else nullcontext():
+        meta["admission"]["wait_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        try:
+            yield admission
+        except DBAPIError as e:
+            reason = _timeout_reason(e, admission.timeout_ms)
+            if reason is None:
+                raise
+            raise QueryRejected(reason) from e
+
+
+@asynccontextmanager
+async def admit_async(db: AsyncSession, sql: str, role: str, meta: dict, params: Optional[dict] = None):
+    """admit의 async 버전"""
+    limits = limits_for(role)
+    await db.execute(_TIMEOUT_SQL, {"ms": str(limits["timeout_ms"])})
+    admission = _cached_admission(sql, role, meta)
+    if admission is None:
+        plan = (await db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params or {})).scalar()
+        admission = decide(*plan_estimates(plan), limits)
+        _record(sql, role, admission, meta)
+    if admission.decision == "rejected":
+        raise QueryRejected(admission.reason)
+
+    start = time.perf_counter()
+    async with _heavy_async if admission.decision == "throttled" else nullcontext():
+        meta["admission"]["wait_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        try:
+            yield admission
+        except DBAPIError as e:
+            reason = _timeout_reason(e, admission.timeout_ms)
+            if reason is None:
+                raise
+            raise QueryRejected(reason) from e
+
@@ -0,0 +1,108 @@
+"""
+여러 질문을 한 번에 처리하는 배치 NL -> SQL (/api/query/batch)
+- 임베딩: 전체 질문을 캐시에 없는 것만 모아 EMBED_BATCH_MAX개 단위로 호출
+- 검색: 전체 질문 벡터를 unnest + LATERAL 단일 SQL로 (질문별 RetrievalContext에 결과를 넣어 둠)
+- SQL 생성: BATCH_LLM_CONCURRENCY개까지 동시에 (템플릿/NL 캐시 적중이면 LLM 없음)
+- 실행: BATCH_DB_CONCURRENCY개 커넥션까지만 동시에 사용 (항목마다 세션을 열고 닫음)
+- 결과는 끝나는 순서대로 이벤트로 내보냄 ({"type": "result", "index", ...})
+- 임베딩/검색이 실패하면 {"type": "error"} 다음 done(전부 failed)으로 스트림을 닫음
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import AsyncIterator, Callable, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from t2sql.services.query.query_service import prepare_sql_async, run_nl_query_async
+from t2sql.services.rag.vector_search import (
+    RetrievalContext,
+    embed_many_async,
+    search_schema_and_fewshots_many_async,
+)
+
+LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+DB_CONCURRENCY = int(os.getenv("BATCH_DB_CONCURRENCY", "4"))
+
+logger = logging.getLogger(__name__)
+
+
+async def _ready(value):
+    return value
+
+
+async def _run_item(
+    index: int,
+    ctx: RetrievalContext,
+    role: str,
+    session_factory: Callable[[], AsyncSession],
+    llm_slots: asyncio.Semaphore,
+    db_slots: asyncio.Semaphore,
+) -> dict:
+    try:
+        async with llm_slots:
+            prepared = await prepare_sql_async(ctx.question, role, ctx)
+        # AsyncSession은 첫 실행 때 커넥션을 빌리므로 검증 실패 항목은 커넥션을 쓰지 않음
+        async with db_slots, session_factory() as db:
+            result = await run_nl_query_async(db, ctx.question, role=role, ctx=ctx, prepared=_ready(prepared))
+    except Exception as e:
+        result = {"sql": None, "rows": [], "meta": {"ok": False, "reason": f"{type(e).__name__}: {e}", "timings": ctx.stats()}}
+    result["meta"]["row_count"] = len(result.get("rows", []))
+    return {"type": "result", "index": index, "question": ctx.question, **result}
+
+
+async def run_batch_async(
+    questions: List[str],
+    role: str,
+    session_factory: Callable[[], AsyncSession],
+) -> AsyncIterator[dict]:
+    """
+    {"type": "start", "count", "timings"} -> {"type": "result", "index", "question", "sql", "rows", "meta"} * N (완료 순)
+    -> {"type": "done", "count", "ok", "failed", "timings"}
+    임베딩/검색 실패: {"type": "error", "stage", "message"} -> {"type": "done", "ok": 0, ...}
+    """
+    start = time.perf_counter()
+    contexts = [RetrievalContext(question=q.strip()) for q in questions]
+    timings: dict = {}
+
+    stage = "embed"
+    try:
+        t0 = time.perf_counter()
+        vectors = await embed_many_async([c.question for c in contexts])
+        timings["embed_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+
+        stage = "retrieval"
+        t0 = time.perf_counter()
+        retrievals = await search_schema_and_fewshots_many_async(vectors)
+        timings["retrieval_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    except Exception as e:
+        # 항목별로 나눌 수 없는 실패 -> 클라이언트가 done을 기다리다 끊기지 않도록 종료 이벤트까지 보냄
+        logger.warning("batch %s failed for %d questions", stage, len(contexts), exc_info=True)
+        timings["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        yield {"type": "error", "stage": stage, "message": f"{type(e).__name__}: {e}"}
+        yield {"type": "done", "count": len(contexts), "ok": 0, "failed": len(contexts), "timings": timings}
+        return
+    for ctx, qvec, retrieval in zip(contexts, vectors, retrievals):
+        ctx.qvec = qvec
+        ctx.provide(retrieval)
+    yield {"type": "start", "count": len(contexts), "timings": timings}
+
+    llm_slots, db_slots = asyncio.Semaphore(LLM_CONCURRENCY), asyncio.Semaphore(DB_CONCURRENCY)
+    tasks = [
+        asyncio.ensure_future(_run_item(i, ctx, role, session_factory, llm_slots, db_slots))
+        for i, ctx in enumerate(contexts)
+    ]
+    ok = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            item = await next_done
+            ok += bool(item["meta"].get("ok"))
+            yield item
+    finally:
+        # 클라이언트가 끊기면 남은 항목 취소
+        for task in tasks:
+            task.cancel()
+
+    timings["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    yield {"type": "done", "count": len(tasks), "ok": ok, "failed": len(tasks) - ok, "timings": timings}
@@ -0,0 +1,60 @@
+"""
+쿼리 결과 열(column) 단위 직렬화 (/api/query Accept 협상용)
+- columns JSON: {"sql", "columns": [...], "data": [[1열 값...], [2열 값...]], "meta"} (컬럼명이 행마다 반복되지 않음)
+- Arrow IPC stream: pyarrow가 설치된 경우만. sql/meta는 스키마 metadata에 JSON으로
+"""
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Optional
+
+try:
+    import pyarrow as pa
+except ImportError:  # 선택 의존성
+    pa = None
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+COLUMNS_MEDIA_TYPE = "application/vnd.t2sql.columns+json"
+
+
+def arrow_available() -> bool:
+    return pa is not None
+
+
+def negotiate(accept: str) -> Optional[str]:
+    """Accept 헤더에서 열 단위 형식 선택 (없으면 None = 기존 행 dict JSON)"""
+    if ARROW_MEDIA_TYPE in accept:
+        return ARROW_MEDIA_TYPE
+    if COLUMNS_MEDIA_TYPE in accept:
+        return COLUMNS_MEDIA_TYPE
+    return None
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def encode_columns_json(result: dict) -> bytes:
+    return json.dumps(result, default=_json_default, ensure_ascii=False).encode("utf-8")
+
+
+def encode_arrow(result: dict) -> bytes:
+    """{"sql", "columns", "data", "meta"} -> Arrow IPC stream bytes"""
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+    table = pa.table(
+        [pa.array(values) for values in result["data"]],
+        names=result["columns"],
+        metadata={
+            "sql": result["sql"],
+            "meta": json.dumps(result["meta"], default=_json_default, ensure_ascii=False),
+        },
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,189 @@
+"""
+질문 -> 검증된 SQL 캐시
+- 1단계: 정규화된 질문 텍스트 정확 일치
+- 2단계(옵션): 질문 임베딩 코사인 유사도가 임계값 이상인 가장 가까운 항목
+  (숫자/따옴표 값/공정 코드/상대 기간 등 리터럴이 다르면 재사용하지 않음: "3월" vs "4월", "이번 달" vs "지난달")
+- 캐시 컨텍스트 = (role, 기준 날짜, RAG 버전). 하나라도 바뀌면 다른 키가 되어 자연히 무효화
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Hashable, Optional, Tuple
+
+import numpy as np
+
+from t2sql.db.table_versions import get_table_version_tracker
+from t2sql.services.rag.embedding_cache import normalize_text
+from t2sql.services.rag.local_index import INDEX_TABLES
+from t2sql.services.rag.vector_search import RetrievalContext
+
+_LITERAL_RE = re.compile(r"'[^']*'|\"[^\"]*\"|\d+|(?<![A-Za-z])[A-I](?![A-Za-z])")
+# 상대 기간 표현 ("이번 달" vs "지난달"은 임베딩이 거의 같아도 다른 SQL)
+_RELATIVE_RE = re.compile(
+    r"오늘|어제|그제|그저께|내일|최근|올해|작년|내년|금년|전년|금월|전월|당월|"
+    r"(?:이번|지난|저번|다음)\s*(?:달|주|해|분기)"
+)
+
+
+def normalize_question(question: str) -> str:
+    return normalize_text(question).lower().rstrip("?.!？ ")
+
+
+def literal_signature(question: str) -> Tuple[str, ...]:
+    """질문에 등장하는 숫자/따옴표 값/공정 코드/상대 기간 표현 (정렬)"""
+    text = normalize_text(question)
+    relative = [m.replace(" ", "") for m in _RELATIVE_RE.findall(text)]
+    return tuple(sorted(_LITERAL_RE.findall(text) + relative))
+
+
+def cache_context(role: str, today: Optional[date] = None) -> Tuple[Hashable, ...]:
+    """
+    SQL 재사용이 가능한 조건: 같은 role, 같은 기준 날짜, 같은 schema/few-shot 버전.
+    프롬프트에 오늘 날짜가 들어가므로(오늘/어제/최근 N일 -> 날짜 리터럴) 날짜 단위로 나눈다
+    """
+    today = today or date.today()
+    rag_version = tuple(get_table_version_tracker().versions(INDEX_TABLES).values())
+    return (role, today.isoformat(), rag_version)
+
+
+@dataclass(frozen=True)
+class CacheHit:
+    sql: str
+    kind: str  # "exact" | "semantic"
+    similarity: float = 1.0
+    tables: frozenset = frozenset()
+
+
+@dataclass
+class _Entry:
+    context: Tuple[Hashable, ...]
+    sql: str
+    tables: frozenset
+    signature: Tuple[str, ...]
+    vector: Optional[np.ndarray]
+    stored_at: float
+
+
+class NlQueryCache:
+    def __init__(self, max_entries: int = 2000, ttl_seconds: float = 24 * 3600, similarity: float = 0.95):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # 0 이하이면 유사도 매칭 비활성
+        self.similarity = similarity
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+
+    def _expired(self, entry: _Entry) -> bool:
+        return time.monotonic() - entry.stored_at > self.ttl_seconds
+
+    def lookup(self, question: str, context: Tuple[Hashable, ...], ctx: Optional[RetrievalContext] = None) -> Optional[CacheHit]:
+        hit = self._exact_lookup(question, context)
+        if hit is None and ctx is not None:
+            candidates = self._semantic_candidates(question, context)
+            if candidates:
+                # 후보가 있을 때만 임베딩 (RAG에서도 같은 벡터를 재사용)
+                hit = self._best_match(candidates, ctx.vector)
+        return self._count(hit)
+
+    async def lookup_async(self, question: str, context: Tuple[Hashable, ...], ctx: Optional[RetrievalContext] = None) -> Optional[CacheHit]:
+        """lookup의 async 버전 (임베딩을 AsyncOpenAI로 계산)"""
+        hit = self._exact_lookup(question, context)
+        if hit is None and ctx is not None:
+            candidates = self._semantic_candidates(question, context)
+            if candidates:
+                hit = self._best_match(candidates, await ctx.vector_async())
+        return self._count(hit)
+
+    def _count(self, hit: Optional[CacheHit]) -> Optional[CacheHit]:
+        name = "misses" if hit is None else f"{hit.kind}_hits"
+        with self._lock:
+            self._counters[name] += 1
+        return hit
+
+    def _exact_lookup(self, question: str, context) -> Optional[CacheHit]:
+        key = (context, normalize_question(question))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry):
+                self._entries.move_to_end(key)
+                return CacheHit(entry.sql, "exact", tables=entry.tables)
+        return None
+
+    def _semantic_candidates(self, question: str, context) -> list:
+        if self.similarity <= 0:
+            return []
+        signature = literal_signature(question)
+        with self._lock:
+            return [
+                e for e in self._entries.values()
+                if e.context == context and e.signature == signature
+                and e.vector is not None and not self._expired(e)
+            ]
+
+    def _best_match(self, candidates: list, qvec) -> Optional[CacheHit]:
+        query = _unit(qvec)
+        scores = np.stack([e.vector for e in candidates]) @ query
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity:
+            return None
+        best_entry = candidates[best]
+        return CacheHit(best_entry.sql, "semantic", round(float(scores[best]), 4), best_entry.tables)
+
+    def put(
+        self,
+        question: str,
+        context: Tuple[Hashable, ...],
+        sql: str,
+        qvec: Optional[list] = None,
+        tables: frozenset = frozenset(),
+    ) -> None:
+        key = (context, normalize_question(question))
+        entry = _Entry(
+            context=context,
+            sql=sql,
+            tables=tables,
+            signature=literal_signature(question),
+            vector=_unit(qvec) if qvec is not None else None,
+            stored_at=time.monotonic(),
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, "size": len(self._entries)}
+
+
+def _unit(vec) -> np.ndarray:
+    arr = np.asarray(vec, dtype=np.float64)
+    norm = np.linalg.norm(arr)
+    return arr / norm if norm else arr
+
+
+_cache: Optional[NlQueryCache] = None
+
+
+def get_nl_cache() -> Optional[NlQueryCache]:
+    """프로세스 공용 캐시 (NL_CACHE_ENABLED=0 이면 None)"""
+    global _cache
+    if os.getenv("NL_CACHE_ENABLED", "1") != "1":
+        return None
+    if _cache is None:
+        _cache = NlQueryCache(
+            max_entries=int(os.getenv("NL_CACHE_MAX_ENTRIES", "2000")),
+            ttl_seconds=float(os.getenv("NL_CACHE_TTL_SECONDS", str(24 * 3600))),
+            similarity=float(os.getenv("NL_CACHE_SIMILARITY", "0.95")),
+        )
+    return _cache
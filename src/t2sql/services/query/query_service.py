@@ -1,14 +1,295 @@
+import os
+from typing import AsyncIterator, Awaitable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from t2sql.services.llm.llm_client import llm_generate_sql
-from t2sql.services.query.sql_validator import validate_and_normalize, SqlRejected
+from t2sql.services.llm.llm_client import llm_generate_sql, llm_generate_sql_async
+from t2sql.services.query.admission import admit, admit_async
+from t2sql.services.query.nl_cache import cache_context, get_nl_cache
+from t2sql.services.query.result_cache import estimate_size, get_result_cache
+from t2sql.services.query.shapes import QueryShape, get_shape_registry, parameterize
+from t2sql.services.query.sql_templates import get_template_generator
+from t2sql.services.query.sql_validator import validate_sql, SqlRejected
+from t2sql.services.rag.vector_search import RetrievalContext
+
+# 서버 사이드 커서에서 한 번에 가져올 행 수 (스트리밍 응답의 청크 크기)
+FETCH_CHUNK_ROWS = int(os.getenv("QUERY_FETCH_CHUNK_ROWS", "500"))
+
+
+def _shape(sql: str, meta: dict) -> QueryShape:
+    """리터럴을 파라미터로 뺀 모양 SQL (같은 모양은 커넥션마다 prepare된 계획 재사용)"""
+    shape = parameterize(sql)
+    seen = get_shape_registry().record(shape.sql)
+    meta["query_shape"] = {"params": len(shape.params), "executions": seen}
+    return shape
+
+
+def _template_sql(question: str, ctx: RetrievalContext) -> Optional[dict]:
+    """few-shot 템플릿으로 SQL 생성 (확신도가 낮으면 None -> 캐시/LLM 경로)"""
+    generator = get_template_generator()
+    if generator is None:
+        return None
+    with ctx.timer("template_ms"):
+        match = generator.generate(question)
+    if match is None:
+        return None
+    return {
+        "sql": match.sql,
+        "meta": {"generator": "template", "template": match.name, "template_confidence": match.confidence},
+    }
 
 def run_nl_query(db: Session, question: str, role: str = "user") -> dict:
-    raw_sql = llm_generate_sql(question)
+    # 질문 임베딩은 ctx에서 한 번만 계산되어 캐시 조회/schema/few-shot 검색에 공유됨
+    ctx = RetrievalContext(question=question.strip())
+    cache = get_nl_cache()
+    cache_ctx = cache_context(role)
+    meta = {"cache": "miss", "generator": "llm"}
+
+    # 자주 나오는 few-shot 모양 질문은 임베딩/캐시 조회/LLM 없이 템플릿으로
+    template = _template_sql(question, ctx)
+    hit = cache.lookup(question, cache_ctx, ctx) if cache and template is None else None
+    if hit is not None:
+        # 검증을 통과한 SQL만 캐시에 저장되므로 LLM/검증 생략
+        sql, tables = hit.sql, hit.tables
+        meta.update({"cache": hit.kind, "cache_similarity": hit.similarity})
+    else:
+        if template is not None:
+            raw_sql = template["sql"]
+            meta.update({"cache": "skip", **template["meta"]})
+        else:
+            raw_sql = llm_generate_sql(question, ctx=ctx)
+        try:
+            validated = validate_sql(raw_sql, role=role)
+        except SqlRejected as e:
+            return {"sql": raw_sql, "rows": [], "meta": {**meta, "ok": False, "reason": str(e), "timings": ctx.stats()}}
+        sql, tables = validated.sql, validated.tables
+        if validated.limit_action:
+            meta["limit_action"] = validated.limit_action
+        if cache and template is None:
+            cache.put(question, cache_ctx, sql, ctx.qvec, tables=tables)
+
+    try:
+        rows = execute_cached(db, sql, role, tables, meta, ctx)
+    except SqlRejected as e:
+        # 비용 한도 초과 / statement_timeout
+        return {"sql": sql, "rows": [], "meta": {**meta, "ok": False, "reason": str(e), "timings": ctx.stats()}}
+    return {"sql": sql, "rows": rows, "meta": {**meta, "ok": True, "timings": ctx.stats()}}
+
+
+def execute_cached(db: Session, sql: str, role: str, tables: frozenset, meta: dict, ctx: RetrievalContext) -> list:
+    """검증된 SQL 실행. 참조 테이블이 바뀌지 않았다면 결과 캐시에서 반환"""
+    result_cache = get_result_cache()
+    if result_cache is not None:
+        rows = result_cache.get(sql, role)
+        if rows is not None:
+            meta["result_cache"] = "hit"
+            return rows
+        versions = result_cache.versions(tables)
+    shape = _shape(sql, meta)
+    with ctx.timer("db_ms"), admit(db, shape.sql, role, meta, shape.params):
+        result = db.execute(text(shape.sql), shape.params)
+        rows = [dict(r) for r in result.mappings()]
+    if result_cache is not None:
+        stored = result_cache.put(sql, role, tables, rows, versions)
+        meta["result_cache"] = "miss" if stored else "skip"
+    return rows
+
+
+# ============ async 경로 (AsyncOpenAI + AsyncSession) ============
+
+async def prepare_sql_async(question: str, role: str = "user", ctx: Optional[RetrievalContext] = None) -> dict:
+    """
+    질문 -> 검증된 SQL (캐시 조회 / LLM 생성 / 검증까지, 실행은 하지 않음).
+    반환: {"sql", "tables", "meta"}. 검증 실패 시 tables=None, meta.ok=False
+    """
+    ctx = ctx or RetrievalContext(question=question.strip())
+    cache = get_nl_cache()
+    cache_ctx = cache_context(role)
+    meta = {"cache": "miss", "generator": "llm"}
+
+    template = _template_sql(question, ctx)
+    if template is not None:
+        raw_sql = template["sql"]
+        meta.update({"cache": "skip", **template["meta"]})
+    else:
+        hit = await cache.lookup_async(question, cache_ctx, ctx) if cache else None
+        if hit is not None:
+            meta.update({"cache": hit.kind, "cache_similarity": hit.similarity})
+            return {"sql": hit.sql, "tables": hit.tables, "meta": meta}
+        raw_sql = await llm_generate_sql_async(question, ctx=ctx)
+
+    try:
+        validated = validate_sql(raw_sql, role=role)
+    except SqlRejected as e:
+        return {"sql": raw_sql, "tables": None, "meta": {**meta, "ok": False, "reason": str(e)}}
+    if validated.limit_action:
+        meta["limit_action"] = validated.limit_action
+    if cache and template is None:
+        cache.put(question, cache_ctx, validated.sql, ctx.qvec, tables=validated.tables)
+    return {"sql": validated.sql, "tables": validated.tables, "meta": meta}
+
+
+async def run_nl_query_async(
+    db: AsyncSession,
+    question: str,
+    role: str = "user",
+    ctx: Optional[RetrievalContext] = None,
+    prepared: Optional[Awaitable[dict]] = None,
+) -> dict:
+    """
+    run_nl_query의 async 버전 (임베딩/LLM/DB 대기 중 이벤트 루프를 막지 않음).
+    ctx/prepared를 넘기면 미리 시작해 둔 검색/SQL 생성 결과를 이어서 사용한다.
+    """
+    ctx = ctx or RetrievalContext(question=question.strip())
+    prepared = await (prepared or prepare_sql_async(question, role, ctx))
+    sql, tables, meta = prepared["sql"], prepared["tables"], dict(prepared["meta"])
+    if tables is None:
+        return {"sql": sql, "rows": [], "meta": {**meta, "timings": ctx.stats()}}
+
     try:
-        sql = validate_and_normalize(raw_sql, role=role)
+        rows = await execute_cached_async(db, sql, role, tables, meta, ctx)
     except SqlRejected as e:
-        return {"sql": raw_sql, "rows": [], "meta": {"ok": False, "reason": str(e)}}
-    rows = db.execute(text(sql)).mappings().all()
-    return {"sql": sql, "rows": rows, "meta": {"ok": True}}
-    
+        return {"sql": sql, "rows": [], "meta": {**meta, "ok": False, "reason": str(e), "timings": ctx.stats()}}
+    return {"sql": sql, "rows": rows, "meta": {**meta, "ok": True, "timings": ctx.stats()}}
+
+
+async def stream_nl_query_async(db: AsyncSession, question: str, role: str = "user") -> AsyncIterator[dict]:
+    """
+    run_nl_query_async의 스트리밍 버전. 결과를 메모리에 모으지 않고 청크 단위 이벤트로 내보냄
+    - {"type": "meta", "sql", "meta"} -> {"type": "rows", "rows"} * N -> {"type": "done", "row_count", "meta"}
+    """
+    ctx = RetrievalContext(question=question.strip())
+    prepared = await prepare_sql_async(question, role, ctx)
+    sql, tables, meta = prepared["sql"], prepared["tables"], dict(prepared["meta"])
+    yield {"type": "meta", "sql": sql, "meta": meta}
+    if tables is None:
+        yield {"type": "done", "row_count": 0, "meta": {**meta, "timings": ctx.stats()}}
+        return
+
+    row_count = 0
+    try:
+        async for chunk in iter_rows_cached_async(db, sql, role, tables, meta, ctx):
+            row_count += len(chunk)
+            yield {"type": "rows", "rows": chunk}
+    except SqlRejected as e:
+        yield {"type": "done", "row_count": row_count, "meta": {**meta, "ok": False, "reason": str(e), "timings": ctx.stats()}}
+        return
+    yield {"type": "done", "row_count": row_count, "meta": {**meta, "ok": True, "timings": ctx.stats()}}
+
+
+async def execute_cached_async(db: AsyncSession, sql: str, role: str, tables: frozenset, meta: dict, ctx: RetrievalContext) -> list:
+    # FORCE_LIMIT으로 행 수가 제한되므로 일반 커서 (prepare된 계획 재사용 가능)
+    chunks = iter_rows_cached_async(db, sql, role, tables, meta, ctx, server_side=False)
+    return [row async for chunk in chunks for row in chunk]
+
+
+async def iter_rows_cached_async(
+    db: AsyncSession,
+    sql: str,
+    role: str,
+    tables: frozenset,
+    meta: dict,
+    ctx: RetrievalContext,
+    server_side: bool = True,
+) -> AsyncIterator[list]:
+    """
+    검증된 SQL 결과를 FETCH_CHUNK_ROWS 단위로.
+    server_side=True면 서버 사이드 커서(스트리밍용), False면 일반 커서 (psycopg 자동 prepare 대상).
+    결과 캐시 적중 시 캐시에서, 아니면 캐시에 넣을 수 있는 크기까지만 모아 두었다가 저장
+    """
+    result_cache = get_result_cache()
+    if result_cache is not None:
+        rows = result_cache.get(sql, role)
+        if rows is not None:
+            meta["result_cache"] = "hit"
+            for i in range(0, len(rows), FETCH_CHUNK_ROWS):
+                yield rows[i:i + FETCH_CHUNK_ROWS]
+            return
+        versions = result_cache.versions(tables)
+
+    kept, kept_bytes = ([] if result_cache is not None else None), 0
+    shape = _shape(sql, meta)
+    async with admit_async(db, shape.sql, role, meta, shape.params):
+        async for chunk in _fetch_chunks_async(db, shape, ctx, server_side):
+            if kept is not None:
+                kept_bytes += estimate_size(chunk)
+                # 캐시 한 항목 상한을 넘으면 모으기 중단 (큰 결과를 메모리에 쌓지 않음)
+                if kept_bytes <= result_cache.max_entry_bytes:
+                    kept.extend(chunk)
+                else:
+                    kept = None
+            yield chunk
+
+    if result_cache is not None:
+        stored = kept is not None and result_cache.put(sql, role, tables, kept, versions, size=kept_bytes)
+        meta["result_cache"] = "miss" if stored else "skip"
+
+
+async def _fetch_chunks_async(db: AsyncSession, shape: QueryShape, ctx: RetrievalContext, server_side: bool) -> AsyncIterator[list]:
+    if not server_side:
+        with ctx.timer("db_ms"):
+            result = await db.execute(text(shape.sql), shape.params)
+        for part in result.mappings().partitions(FETCH_CHUNK_ROWS):
+            yield [dict(r) for r in part]
+        return
+
+    with ctx.timer("db_ms"):
+        result = await db.stream(text(shape.sql), shape.params, execution_options={"max_row_buffer": FETCH_CHUNK_ROWS})
+    try:
+        parts = result.mappings().partitions(FETCH_CHUNK_ROWS)
+        while True:
+            with ctx.timer("db_ms"):
+                part = await anext(parts, None)
+            if part is None:
+                break
+            yield [dict(r) for r in part]
+    finally:
+        await result.close()
+
+
+# ============ 열(column) 단위 결과 (/api/query Accept 협상) ============
+
+async def run_nl_query_columns_async(db: AsyncSession, question: str, role: str = "user") -> dict:
+    """run_nl_query_async와 같지만 결과를 {"columns": [...], "data": [[열 값...], ...]}로"""
+    ctx = RetrievalContext(question=question.strip())
+    prepared = await prepare_sql_async(question, role, ctx)
+    sql, tables, meta = prepared["sql"], prepared["tables"], dict(prepared["meta"])
+    if tables is None:
+        return {"sql": sql, "columns": [], "data": [], "meta": {**meta, "row_count": 0, "timings": ctx.stats()}}
+
+    try:
+        result = await fetch_columns_cached_async(db, sql, role, tables, meta, ctx)
+    except SqlRejected as e:
+        return {"sql": sql, "columns": [], "data": [], "meta": {**meta, "ok": False, "reason": str(e), "row_count": 0, "timings": ctx.stats()}}
+    row_count = len(result["data"][0]) if result["data"] else 0
+    return {"sql": sql, **result, "meta": {**meta, "ok": True, "row_count": row_count, "timings": ctx.stats()}}
+
+
+async def fetch_columns_cached_async(
+    db: AsyncSession, sql: str, role: str, tables: frozenset, meta: dict, ctx: RetrievalContext
+) -> dict:
+    """커서의 튜플을 바로 열 목록으로 옮김 (행 dict를 만들지 않음). 결과 캐시는 kind="columns"로 따로 둔다"""
+    result_cache = get_result_cache()
+    if result_cache is not None:
+        cached = result_cache.get(sql, role, kind="columns")
+        if cached is not None:
+            meta["result_cache"] = "hit"
+            return cached
+        versions = result_cache.versions(tables)
+
+    shape = _shape(sql, meta)
+    async with admit_async(db, shape.sql, role, meta, shape.params):
+        with ctx.timer("db_ms"):
+            result = await db.execute(text(shape.sql), shape.params)
+            names = list(result.keys())
+            data = [[] for _ in names]
+            for part in result.partitions(FETCH_CHUNK_ROWS):
+                for column, values in zip(data, zip(*part)):
+                    column.extend(values)
+    payload = {"columns": names, "data": data}
+
+    if result_cache is not None:
+        stored = result_cache.put(sql, role, tables, payload, versions, kind="columns")
+        meta["result_cache"] = "miss" if stored else "skip"
+    return payload
@@ -0,0 +1,135 @@
+"""
+검증된 SQL의 실행 결과 캐시
+- 키: (정규화된 SQL, role, kind) - kind: "rows"(행 dict 목록) | "columns"(열 단위 결과)
+- 메모리는 항목 수가 아니라 결과 크기(bytes, JSON 직렬화 기준)로 제한 (LRU)
+- 항목마다 참조 테이블의 버전(table_versions)을 함께 저장하고,
+  조회 시 현재 버전과 다르면 버림. NOTIFY 수신 시에는 해당 테이블 항목을 즉시 제거
+- 변경 감지가 꺼져 있을 때를 대비해 TTL도 둔다
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Optional
+
+from t2sql.db.table_versions import get_table_version_tracker
+
+
+@dataclass
+class _Entry:
+    rows: Any  # kind="rows"면 List[dict], "columns"면 {"columns", "data"}
+    tables: FrozenSet[str]
+    versions: Dict[str, int]
+    size: int
+    stored_at: float
+
+
+def estimate_size(rows: Any) -> int:
+    return len(json.dumps(rows, default=str, ensure_ascii=False).encode("utf-8"))
+
+
+class ResultCache:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 3600, max_entry_ratio: float = 0.1):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # 한 항목이 전체 용량에서 차지할 수 있는 최대 비율
+        self.max_entry_bytes = int(max_bytes * max_entry_ratio)
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def _drop(self, key: tuple) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def get(self, sql: str, role: str, kind: str = "rows") -> Optional[Any]:
+        key = (sql, role, kind)
+        tracker = get_table_version_tracker()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stale = (
+                    time.monotonic() - entry.stored_at > self.ttl_seconds
+                    or tracker.versions(entry.tables) != entry.versions
+                )
+                if stale:
+                    self._drop(key)
+                    self._counters["invalidations"] += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return entry.rows
+            self._counters["misses"] += 1
+            return None
+
+    def versions(self, tables: FrozenSet[str]) -> Dict[str, int]:
+        """실행 직전에 찍어 두는 테이블 버전 (실행 중 변경된 결과가 최신으로 저장되지 않도록)"""
+        return get_table_version_tracker().versions(tables)
+
+    def put(
+        self,
+        sql: str,
+        role: str,
+        tables: FrozenSet[str],
+        rows: Any,
+        versions: Dict[str, int],
+        size: Optional[int] = None,
+        kind: str = "rows",
+    ) -> bool:
+        """저장 성공 여부 반환 (너무 큰 결과는 저장하지 않음). size를 이미 계산했다면 넘겨서 재계산 생략"""
+        size = estimate_size(rows) if size is None else size
+        if size > self.max_entry_bytes:
+            return False
+        entry = _Entry(
+            rows=rows,
+            tables=tables,
+            versions=versions,
+            size=size,
+            stored_at=time.monotonic(),
+        )
+        key = (sql, role, kind)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+        return True
+
+    def invalidate_table(self, table: str) -> None:
+        """table을 참조하는 항목 제거 (TableVersionTracker 구독 콜백)"""
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if table in e.tables]
+            for k in stale:
+                self._drop(k)
+            self._counters["invalidations"] += len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, "entries": len(self._entries), "bytes": self._bytes}
+
+
+_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """프로세스 공용 캐시 (RESULT_CACHE_ENABLED=0 이면 None)"""
+    global _cache
+    if os.getenv("RESULT_CACHE_ENABLED", "1") != "1":
+        return None
+    if _cache is None:
+        _cache = ResultCache(
+            max_bytes=int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            ttl_seconds=float(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600")),
+        )
+        get_table_version_tracker().subscribe(_cache.invalidate_table)
+    return _cache
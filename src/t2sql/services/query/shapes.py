@@ -0,0 +1,108 @@
+"""
+생성 SQL의 리터럴을 바인드 파라미터로 빼내 "쿼리 모양(shape)" 단위로 묶는다
+- WHERE / HAVING 안의 비교(=, <, IN, BETWEEN, LIKE ...) 피연산자 리터럴만
+  (SELECT 목록, GROUP/ORDER BY 위치 번호, INTERVAL, TO_CHAR/TO_DATE 형식 문자열 등 함수 인자는 그대로)
+- 같은 모양이면 SQL 텍스트가 같아지므로 psycopg 자동 prepare(db.session의 prepare_threshold/prepared_max)로
+  커넥션마다 한 번만 계획(plan)을 세우고 재사용
+- ShapeRegistry: 모양별 실행 횟수 (stats()로 확인)
+"""
+import os
+import threading
+from collections import OrderedDict
+from decimal import Decimal
+from functools import lru_cache
+from typing import NamedTuple
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.dialects.postgres import Postgres
+
+
+class _BindPostgres(Postgres):
+    """Postgres 문법 그대로, 이름 있는 플레이스홀더만 SQLAlchemy text() 형식(:name)으로"""
+
+    class Generator(Postgres.Generator):
+        def placeholder_sql(self, expression: exp.Placeholder) -> str:
+            return f":{expression.name}"
+
+
+class QueryShape(NamedTuple):
+    sql: str  # 리터럴 자리에 :p0, :p1 ... 이 들어간 SQL
+    params: dict
+
+
+# 리터럴이 바로 피연산자일 때만 파라미터로 (DATE '...' 캐스트, 음수, 괄호는 거쳐 올라감)
+_COMPARISONS = (exp.EQ, exp.NEQ, exp.GT, exp.GTE, exp.LT, exp.LTE, exp.In, exp.Between, exp.Like, exp.ILike)
+_WRAPPERS = (exp.Cast, exp.Neg, exp.Paren)
+
+
+def _literal_value(literal: exp.Literal):
+    # sqlglot이 literal.this를 바꿔 저장하는 경우가 있어(형식 문자열 -> strftime) 생성된 SQL 텍스트 기준으로
+    text = literal.sql(dialect="postgres")
+    if literal.is_string:
+        return text[1:-1].replace("''", "'")
+    return int(text) if literal.is_int else Decimal(text)
+
+
+def _parameterizable(literal: exp.Literal) -> bool:
+    # 함수 인자(TO_CHAR 형식, TO_DATE 입력 등) / INTERVAL '1 day'은 리터럴 그대로 두어야 의미가 유지됨
+    node = literal.parent
+    while isinstance(node, _WRAPPERS):
+        node = node.parent
+    return isinstance(node, _COMPARISONS)
+
+
+@lru_cache(maxsize=1024)
+def parameterize(sql: str) -> QueryShape:
+    """검증된 SQL -> (모양 SQL, 파라미터). 같은 SQL은 다시 파싱하지 않음"""
+    ast = sqlglot.parse_one(sql, read="postgres")
+    params = {}
+    for clause in list(ast.find_all(exp.Where, exp.Having)):
+        for literal in list(clause.find_all(exp.Literal)):
+            if not _parameterizable(literal):
+                continue
+            name = f"p{len(params)}"
+            params[name] = _literal_value(literal)
+            literal.replace(exp.Placeholder(this=name))
+    if not params:
+        return QueryShape(sql, {})
+    return QueryShape(ast.sql(dialect=_BindPostgres), params)
+
+
+class ShapeRegistry:
+    """모양별 실행 횟수 (LRU로 최대 max_shapes개만 추적)"""
+
+    def __init__(self, max_shapes: int = 256):
+        self.max_shapes = max_shapes
+        self._counts: "OrderedDict[str, int]" = OrderedDict()
+        self._executions = 0
+        self._lock = threading.Lock()
+
+    def record(self, shape_sql: str) -> int:
+        """실행 기록, 이 모양의 누적 횟수 반환"""
+        with self._lock:
+            self._executions += 1
+            count = self._counts.pop(shape_sql, 0) + 1
+            self._counts[shape_sql] = count
+            while len(self._counts) > self.max_shapes:
+                self._counts.popitem(last=False)
+            return count
+
+    def stats(self, top: int = 10) -> dict:
+        with self._lock:
+            shapes = len(self._counts)
+            ranked = sorted(self._counts.items(), key=lambda kv: kv[1], reverse=True)[:top]
+            return {
+                "shapes": shapes,
+                "executions": self._executions,
+                # 이미 본 모양으로 실행된 비율 (= prepare된 계획을 재사용할 수 있는 비율의 상한)
+                "reuse_rate": round((self._executions - shapes) / self._executions, 4) if self._executions else 0.0,
+                "top": [{"count": n, "shape": s[:200]} for s, n in ranked],
+            }
+
+
+_registry = ShapeRegistry(max_shapes=int(os.getenv("QUERY_SHAPES_MAX", "256")))
+
+
+def get_shape_registry() -> ShapeRegistry:
+    return _registry
@@ -0,0 +1,389 @@
+"""
+few-shot 패턴 기반 SQL 템플릿 (LLM 없이 슬롯 채우기)
+- 질문에서 기간(년/월/일, 범위, 이번 달/올해 등), 공정 코드, 제품명, 출고 상태, 임계값, "공정별"을 추출
+- fewshot_catalog.FEWSHOTS와 같은 모양의 템플릿 중 질문을 가장 많이 설명하는 것으로 SQL 생성
+- 확신도 = 슬롯/템플릿 단어로 설명되는 어절 비율. "평균", "작업자"처럼 모르는 단어가 있으면 낮아져 LLM으로 넘김
+- 기간/값이 두 개 이상이거나 없는 날짜(2월 30일), 끝이 시작보다 앞서는 범위면 템플릿을 쓰지 않음
+"""
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Callable, List, Optional, Tuple
+
+from t2sql.services.rag.embedding_cache import normalize_text
+
+# ---- 슬롯 추출 ----
+
+_Y = r"(?:(?:(?P<y>\d{4})\s*년|(?P<ry>올해|작년))\s*)?"
+_TO = r"\s*(?:~|-|부터)\s*"
+_UNTIL = r"(?:\s*까지)?"
+
+# 긴 패턴부터 (앞에서 잡힌 글자는 뒤 패턴이 다시 잡지 않음)
+_PERIOD_PATTERNS = [
+    re.compile(_Y + r"(?P<m>\d{1,2})\s*월\s*(?P<d>\d{1,2})\s*일?" + _TO + r"(?:(?P<m2>\d{1,2})\s*월\s*)?(?P<d2>\d{1,2})\s*일" + _UNTIL),
+    re.compile(_Y + r"(?P<m>\d{1,2})\s*월" + _TO + r"(?P<m2>\d{1,2})\s*월" + _UNTIL),
+    re.compile(_Y + r"(?P<m>\d{1,2})\s*월\s*(?P<d>\d{1,2})\s*일"),
+    re.compile(_Y + r"(?P<m>\d{1,2})\s*월"),
+    re.compile(r"(?P<d>\d{1,2})\s*일?" + _TO + r"(?P<d2>\d{1,2})\s*일" + _UNTIL),
+    re.compile(r"(?P<d>\d{1,2})\s*일"),
+    re.compile(r"(?P<y>\d{4})\s*년|(?P<ry>올해|작년)"),
+    re.compile(r"(?P<rel>이번\s*달|지난\s*달|오늘|어제)"),
+]
+_PROCESS_RE = re.compile(r"(?:공정\s*(?P<p>[A-I])|(?P<p2>[A-I])\s*공정)(?![A-Za-z])")
+_PRODUCT_RE = re.compile(r"물건\s*(?P<n>[1-3])")
+_STATUS_RE = re.compile(r"(?P<wait>미출고|출고\s*대기)|(?P<done>출고\s*완료)")
+_THRESHOLD_RE = re.compile(r"(?P<n>\d+)\s*(?P<op>이상|초과|이하|미만)")
+_BY_PROCESS_RE = re.compile(r"공정\s*별|공정마다")
+
+_OPS = {"이상": ">=", "초과": ">", "이하": "<=", "미만": "<"}
+
+
+@dataclass
+class Slots:
+    start: Optional[date] = None  # [start, end) 반열림구간
+    end: Optional[date] = None
+    process: Optional[str] = None
+    product: Optional[str] = None
+    status: Optional[str] = None
+    threshold: Optional[Tuple[str, int]] = None  # (">=", 10)
+    by_process: bool = False
+    spans: List[Tuple[int, int]] = field(default_factory=list)  # 슬롯으로 설명된 글자 범위
+    conflict: bool = False  # 같은 슬롯에 다른 값이 둘 이상 / 없는 날짜
+
+    def set(self, name: str, value) -> None:
+        current = getattr(self, name)
+        if current is not None and current != value:
+            self.conflict = True
+        setattr(self, name, value)
+
+    def asdict(self) -> dict:
+        return {
+            k: (v.isoformat() if isinstance(v, date) else v)
+            for k, v in self.__dict__.items()
+            if k not in ("spans", "conflict") and v not in (None, False)
+        }
+
+
+def _month_start(year: int, month: int) -> date:
+    return date(year + (month - 1) // 12, (month - 1) % 12 + 1, 1)
+
+
+def _period(g: dict, today: date) -> Tuple[date, date]:
+    rel = (g.get("rel") or "").replace(" ", "")
+    if rel == "오늘":
+        return today, today + timedelta(days=1)
+    if rel == "어제":
+        return today - timedelta(days=1), today
+    if rel == "이번달":
+        return _month_start(today.year, today.month), _month_start(today.year, today.month + 1)
+    if rel == "지난달":
+        return _month_start(today.year, today.month - 1), _month_start(today.year, today.month)
+
+    # 연도가 없으면 올해, 월이 없으면 이번 달 (FEWSHOTS의 {BASE_YEAR}/{BASE_MONTH}와 같은 규칙)
+    year = int(g["y"]) if g.get("y") else today.year - (g.get("ry") == "작년")
+    month = int(g["m"]) if g.get("m") else None
+    if g.get("d"):
+        month = month or today.month
+        start = date(year, month, int(g["d"]))
+        m2, d2 = int(g.get("m2") or month), int(g.get("d2") or g["d"])
+        # "12월 30일 ~ 1월 2일"처럼 끝 월이 앞서면 다음 해로
+        last = date(year + (g.get("m2") is not None and (m2, d2) < (month, int(g["d"]))), m2, d2)
+        return _checked(start, last + timedelta(days=1))
+    if month:
+        m2 = int(g.get("m2") or month)
+        if not (1 <= month <= 12 and 1 <= m2 <= 12):
+            raise ValueError(f"month {month}~{m2}")
+        # "2025년 12월 ~ 2월"처럼 끝 월이 앞서면 다음 해로
+        return _checked(_month_start(year, month), _month_start(year + (m2 < month), m2 + 1))
+    return date(year, 1, 1), date(year + 1, 1, 1)
+
+
+def _checked(start: date, end: date) -> Tuple[date, date]:
+    # 끝이 시작보다 앞서는 범위("7일~5일")는 해석하지 않음
+    if end <= start:
+        raise ValueError(f"empty period {start}~{end}")
+    return start, end
+
+
+def _scan(pattern: re.Pattern, text: str, slots: Slots):
+    """이미 다른 슬롯이 차지한 글자와 겹치지 않는 매치만"""
+    for m in pattern.finditer(text):
+        if any(m.start() < e and s < m.end() for s, e in slots.spans):
+            continue
+        slots.spans.append(m.span())
+        yield m
+
+
+def extract_slots(question: str, today: Optional[date] = None) -> Slots:
+    text = normalize_text(question)
+    today = today or date.today()
+    slots = Slots()
+
+    for pattern in _PERIOD_PATTERNS:
+        for m in _scan(pattern, text, slots):
+            try:
+                start, end = _period(m.groupdict(), today)
+            except ValueError:
+                slots.conflict = True
+                continue
+            slots.set("start", start)
+            slots.set("end", end)
+    for m in _scan(_PROCESS_RE, text, slots):
+        slots.set("process", m.group("p") or m.group("p2"))
+    for m in _scan(_PRODUCT_RE, text, slots):
+        slots.set("product", f"물건{m.group('n')}")
+    for m in _scan(_STATUS_RE, text, slots):
+        slots.set("status", "출고 대기" if m.group("wait") else "출고 완료")
+    for m in _scan(_THRESHOLD_RE, text, slots):
+        slots.set("threshold", (_OPS[m.group("op")], int(m.group("n"))))
+    for _ in _scan(_BY_PROCESS_RE, text, slots):
+        slots.by_process = True
+    return slots
+
+
+# ---- SQL 조각 ----
+
+def _period_conds(s: Slots, col: str = "day") -> List[str]:
+    if s.start is None:
+        return []
+    if s.end - s.start == timedelta(days=1):
+        return [f"{col} = DATE '{s.start}'"]
+    return [f"{col} >= DATE '{s.start}'", f"{col} < DATE '{s.end}'"]
+
+
+def _where(conds: List[str], indent: str = "") -> str:
+    if not conds:
+        return ""
+    return f"\n{indent}WHERE " + f"\n{indent}  AND ".join(conds)
+
+
+def _status_alias(s: Slots) -> str:
+    return {"출고 대기": "total_ordered_waiting", "출고 완료": "total_ordered_done"}.get(s.status, "total_ordered")
+
+
+def _render_production(s: Slots) -> str:
+    conds = ([f"process = '{s.process}'"] if s.process else []) + _period_conds(s)
+    if not s.by_process:
+        return f"SELECT SUM(produced_qty) AS total_produced\nFROM fact_production_daily{_where(conds)};"
+    having = f"\nHAVING SUM(produced_qty) {s.threshold[0]} {s.threshold[1]}" if s.threshold else ""
+    return (
+        f"SELECT process, SUM(produced_qty) AS total_produced\nFROM fact_production_daily{_where(conds)}"
+        f"\nGROUP BY process{having}\nORDER BY total_produced DESC;"
+    )
+
+
+def _render_product(s: Slots) -> str:
+    conds = [f"dp.product = '{s.product}'"] + _period_conds(s, "fp.day")
+    return (
+        "SELECT dp.product, SUM(fp.produced_qty) AS total_produced\n"
+        "FROM fact_production_daily AS fp\n"
+        f"JOIN dim_process AS dp ON fp.process = dp.process{_where(conds)}\n"
+        "GROUP BY dp.product;"
+    )
+
+
+def _render_process_count(s: Slots) -> str:
+    return "SELECT COUNT(DISTINCT process) AS process_count\nFROM fact_production_daily;"
+
+
+def _render_orders(s: Slots) -> str:
+    conds = (
+        ([f"process = '{s.process}'"] if s.process else [])
+        + ([f"order_status = '{s.status}'"] if s.status else [])
+        + _period_conds(s)
+    )
+    alias = _status_alias(s)
+    if not s.by_process:
+        return f"SELECT SUM(ordered_qty) AS {alias}\nFROM fact_order_daily{_where(conds)};"
+    return (
+        f"SELECT process, SUM(ordered_qty) AS {alias}\nFROM fact_order_daily{_where(conds)}"
+        f"\nGROUP BY process\nORDER BY {alias} DESC;"
+    )
+
+
+def _render_achievement(s: Slots) -> str:
+    status = s.status or "출고 대기"
+    period = _period_conds(s)
+    o_where = _where([f"order_status = '{status}'"] + period, "  ")
+    p_where = _where(period, "  ")
+    if not s.by_process:
+        return f"""WITH o AS (
+  SELECT SUM(ordered_qty) AS ordered_waiting
+  FROM fact_order_daily{o_where}
+),
+p AS (
+  SELECT SUM(produced_qty) AS produced_total
+  FROM fact_production_daily{p_where}
+)
+SELECT
+  o.ordered_waiting,
+  p.produced_total,
+  CASE
+    WHEN o.ordered_waiting = 0 THEN 0
+    ELSE ROUND((p.produced_total * 100.0) / o.ordered_waiting, 2)
+  END AS achievement_pct
+FROM o, p;"""
+    return f"""WITH o AS (
+  SELECT process, SUM(ordered_qty) AS ordered_waiting
+  FROM fact_order_daily{o_where}
+  GROUP BY process
+),
+p AS (
+  SELECT process, SUM(produced_qty) AS produced_total
+  FROM fact_production_daily{p_where}
+  GROUP BY process
+)
+SELECT
+  o.process,
+  o.ordered_waiting,
+  COALESCE(p.produced_total, 0) AS produced_total,
+  CASE
+    WHEN o.ordered_waiting = 0 THEN 0
+    ELSE ROUND((COALESCE(p.produced_total, 0) * 100.0) / o.ordered_waiting, 2)
+  END AS achievement_pct
+FROM o
+LEFT JOIN p ON p.process = o.process
+ORDER BY achievement_pct DESC;"""
+
+
+# ---- 템플릿 ----
+
+@dataclass(frozen=True)
+class SqlTemplate:
+    name: str
+    measure: re.Pattern  # 질문에 반드시 있어야 하는 측정값 표현
+    vocab: Tuple[str, ...]  # 이 템플릿이 설명할 수 있는 추가 단어
+    accepts: Callable[[Slots], bool]
+    render: Callable[[Slots], str]
+
+
+_PRODUCTION = re.compile(r"생산\s*(?:량|합계|실적)?")
+
+TEMPLATES: List[SqlTemplate] = [
+    SqlTemplate(
+        "production_total", _PRODUCTION, ("fact_production_daily", "공정"),
+        lambda s: not s.product and not s.status and (s.by_process or not s.threshold),
+        _render_production,
+    ),
+    SqlTemplate(
+        "production_by_product", _PRODUCTION, ("fact_production_daily", "dim_process", "product", "제품"),
+        lambda s: s.product and not s.process and not s.status and not s.by_process and not s.threshold,
+        _render_product,
+    ),
+    SqlTemplate(
+        "process_count", re.compile(r"공정\s*(?:종류|개수|수)"), ("fact_production_daily", "일별", "공정", "기록"),
+        lambda s: s.start is None and not (s.process or s.product or s.status or s.threshold or s.by_process),
+        _render_process_count,
+    ),
+    SqlTemplate(
+        "order_total", re.compile(r"주문\s*(?:량|수량)?"), ("fact_order_daily", "공정"),
+        lambda s: not s.product and not s.threshold,
+        _render_orders,
+    ),
+    SqlTemplate(
+        "achievement", re.compile(r"달성\s*률"), ("주문량", "주문", "생산량", "생산", "대비", "(%)", "%"),
+        lambda s: not (s.process or s.product or s.threshold or s.status == "출고 완료"),
+        _render_achievement,
+    ),
+]
+
+# 어느 템플릿이든 질문 의미를 바꾸지 않는 단어 / 조사·어미
+# (부터/까지는 범위 패턴 안에서만 설명됨: "10일부터"처럼 끝이 없는 기간은 설명되지 않아 LLM으로)
+_FILLER = (
+    "합계", "총합", "합", "총", "전체", "얼마", "얼마나", "몇", "개", "기준", "값",
+    "알려줘", "보여줘", "구해줘", "계산해줘", "줘", "주세요", "뭐야", "어때",
+)
+_PARTICLES_RE = re.compile(
+    r"(?:은|는|이|가|을|를|의|에|에서|로|으로|와|과|도|만|인|인가|인가요|이야|야|요|이에요|예요|입니까)*"
+)
+_TOKEN_RE = re.compile(r"[^\s?？!.,~()'\"]+")
+
+
+def _vocab_re(words) -> re.Pattern:
+    return re.compile("|".join(re.escape(w) for w in sorted(set(words), key=len, reverse=True)))
+
+
+def _coverage(text: str, spans: List[Tuple[int, int]], vocab: re.Pattern) -> float:
+    """
+    슬롯/단어로 설명되는 어절 비율.
+    어절에서 슬롯 글자와 vocab 단어를 지우고 조사/어미만 남으면 설명된 것으로 본다
+    """
+    residual = list(text)
+    for s, e in spans:
+        residual[s:e] = " " * (e - s)
+    tokens = list(_TOKEN_RE.finditer(text))
+    if not tokens:
+        return 0.0
+    explained = 0
+    for t in tokens:
+        rest = vocab.sub("", "".join(residual[t.start():t.end()]).replace(" ", ""))
+        if _PARTICLES_RE.fullmatch(rest):
+            explained += 1
+    return explained / len(tokens)
+
+
+@dataclass(frozen=True)
+class TemplateMatch:
+    name: str
+    sql: str
+    confidence: float
+    slots: dict
+
+
+def match_template(question: str, today: Optional[date] = None) -> Optional[TemplateMatch]:
+    """가장 잘 설명하는 템플릿 (확신도와 무관하게 최선 1개, 적용 가능한 템플릿이 없으면 None)"""
+    text = normalize_text(question)
+    slots = extract_slots(text, today)
+    if slots.conflict:
+        return None
+
+    best: Optional[TemplateMatch] = None
+    for tpl in TEMPLATES:
+        measures = [m.span() for m in tpl.measure.finditer(text)]
+        if not measures or not tpl.accepts(slots):
+            continue
+        vocab = _vocab_re(_FILLER + tpl.vocab)
+        confidence = round(_coverage(text, slots.spans + measures, vocab), 4)
+        if best is None or confidence > best.confidence:
+            best = TemplateMatch(tpl.name, tpl.render(slots), confidence, slots.asdict())
+    return best
+
+
+class TemplateSqlGenerator:
+    """확신도가 threshold 이상일 때만 템플릿 SQL을 돌려주고, 나머지는 None (호출 측이 LLM으로)"""
+
+    def __init__(self, threshold: float = 0.9):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "fallbacks": 0}
+
+    def generate(self, question: str, today: Optional[date] = None) -> Optional[TemplateMatch]:
+        match = match_template(question, today)
+        hit = match is not None and match.confidence >= self.threshold
+        with self._lock:
+            self._counters["hits" if hit else "fallbacks"] += 1
+        return match if hit else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._counters["hits"] + self._counters["fallbacks"]
+            return {
+                **self._counters,
+                "hit_rate": round(self._counters["hits"] / total, 4) if total else 0.0,
+                "threshold": self.threshold,
+            }
+
+
+_generator: Optional[TemplateSqlGenerator] = None
+
+
+def get_template_generator() -> Optional[TemplateSqlGenerator]:
+    """프로세스 공용 템플릿 생성기 (SQL_TEMPLATES=0 이면 None = 항상 LLM)"""
+    global _generator
+    if os.getenv("SQL_TEMPLATES", "1") != "1":
+        return None
+    if _generator is None:
+        _generator = TemplateSqlGenerator(threshold=float(os.getenv("SQL_TEMPLATE_THRESHOLD", "0.9")))
+    return _generator
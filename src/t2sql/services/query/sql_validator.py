@@ -1,3 +1,11 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Union
+
 import sqlglot
 from sqlglot import exp
 
@@ -6,59 +14,195 @@ ALLOWED_TABLES_BY_ROLE = {
     "user": {"fact_production_daily", "fact_order_daily", "dim_process"},
     "admin": {"fact_production_daily", "fact_order_daily", "dim_process", "dim_worker"},
 }
+# role별 실행 한도 (admission.py에서 사용)
+# - max_cost / max_rows: EXPLAIN 예상 비용 / 노드별 최대 예상 행 수가 넘으면 거절
+# - throttle_cost: 넘으면 무거운 쿼리로 보고 동시 실행 수 제한
+# - timeout_ms: 모든 실행의 statement_timeout
+QUERY_LIMITS_BY_ROLE = {
+    "user": {"max_cost": 1_000_000, "max_rows": 5_000_000, "throttle_cost": 100_000, "timeout_ms": 5_000},
+    "admin": {"max_cost": 10_000_000, "max_rows": 50_000_000, "throttle_cost": 1_000_000, "timeout_ms": 30_000},
+}
+# 결과 행 수 상한 (LIMIT이 없으면 붙이고, 더 크면 줄임)
 FORCE_LIMIT = 2000
 
 class SqlRejected(Exception):
     pass
 
-def _extract_cte_names(ast: exp.Expression) -> set[str]:
-    """WITH 절에서 정의된 CTE 이름들을 추출"""
+
+@dataclass(frozen=True)
+class ValidatedSql:
+    sql: str  # 정규화된 SQL
+    tables: frozenset  # 참조하는 실제 테이블 (CTE 제외)
+    limit_action: Optional[str] = None  # "injected" | "clamped" | None
+
+# SELECT 안에 있으면 안 되는 노드 (데이터 변경 CTE 등: WITH d AS (DELETE ... RETURNING *) SELECT ...)
+_FORBIDDEN_NODES = (
+    exp.Insert, exp.Update, exp.Delete, exp.Merge, exp.Create, exp.Drop, exp.Alter,
+    exp.TruncateTable, exp.Command,
+)
+
+# 파싱 전 빠른 거절: 문자열/식별자 따옴표와 주석을 지운 뒤 DML/DDL 키워드 또는 두 번째 문장
+_QUOTED_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/", re.S)
+_WRITE_KEYWORD_RE = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE|DROP|ALTER|TRUNCATE|CREATE|GRANT|REVOKE|COPY|CALL|VACUUM|REINDEX)\b",
+    re.I,
+)
+_SECOND_STATEMENT_RE = re.compile(r";\s*\S")
+# 치환되지 않은 예제 placeholder ({BASE_YEAR} 등): 따옴표 안에 있는 경우가 대부분이므로 원문에서 찾음
+_PLACEHOLDER_RE = re.compile(r"\{[A-Za-z_][A-Za-z0-9_]*\}")
+
+
+def _lexical_reject(sql: str) -> Optional[str]:
+    """명백한 DML/DDL/여러 문장/치환 안 된 placeholder면 거절 사유 (sqlglot 파싱 없이)"""
+    stripped = _QUOTED_RE.sub(" ", sql)
+    m = _WRITE_KEYWORD_RE.search(stripped)
+    if m:
+        return f"Only SELECT queries are allowed ({m.group(1).upper()})."
+    if _SECOND_STATEMENT_RE.search(stripped):
+        return "Only a single statement is allowed."
+    m = _PLACEHOLDER_RE.search(sql)
+    if m:
+        return f"Unresolved placeholder: {m.group(0)}"
+    return None
+
+
+def _collect_tables(ast: exp.Expression) -> set[str]:
+    """
+    AST를 한 번만 훑으며 CTE 이름 / 참조 테이블을 함께 모으고 금지 노드를 검사.
+    CTE 별칭은 실제 테이블이 아니므로 제외
+    """
     cte_names: set[str] = set()
-    for cte in ast.find_all(exp.CTE):
-        if cte.alias:
-            cte_names.add(cte.alias)
-    return cte_names
+    tables: set[str] = set()
+    for node in ast.walk():
+        if isinstance(node, exp.Table):
+            tables.add(node.name)
+        elif isinstance(node, exp.CTE):
+            if node.alias:
+                cte_names.add(node.alias)
+        elif isinstance(node, _FORBIDDEN_NODES):
+            raise SqlRejected("Only SELECT queries are allowed.")
+    return tables - cte_names
 
 
-def _extract_table_names(ast: exp.Expression) -> set[str]:
+class ValidationCache:
     """
-    AST에서 참조된 실제 테이블 이름들을 추출.
-    CTE 별칭은 제외함.
+    원문 SQL 해시 -> 검증 결과 (통과: ValidatedSql, 거절: 사유) LRU.
+    같은 SQL이 반복되면(NL 캐시 적중, 템플릿, 재시도) 파싱/정규화 생략
     """
-    names: set[str] = set()
-    cte_names = _extract_cte_names(ast)
 
-    # from/join 등에 등장하는 exp.Table 노드들을 훑음
-    for t in ast.find_all(exp.Table):
-        table = t.name
-        # CTE 별칭은 실제 테이블이 아니므로 제외
-        if table not in cte_names:
-            names.add(table)
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Union[ValidatedSql, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "lexical_rejects": 0}
+
+    @staticmethod
+    def key(sql: str, role: str) -> tuple:
+        return (role, hashlib.blake2b(sql.encode("utf-8"), digest_size=16).digest())
+
+    def get(self, key: tuple) -> Optional[Union[ValidatedSql, str]]:
+        with self._lock:
+            verdict = self._entries.get(key)
+            self._counters["misses" if verdict is None else "hits"] += 1
+            if verdict is not None:
+                self._entries.move_to_end(key)
+            return verdict
 
-    return names
+    def put(self, key: tuple, verdict: Union[ValidatedSql, str]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = verdict
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "size": len(self._entries),
+                "hit_rate": round(self._counters["hits"] / total, 4) if total else 0.0,
+            }
+
+
+validation_cache = ValidationCache(max_entries=int(os.getenv("SQL_VALIDATION_CACHE_MAX", "1024")))
+
+
+def _enforce_limit(select_node: exp.Select, max_rows: int) -> Optional[str]:
+    """최상위 SELECT의 LIMIT을 max_rows 이하로 (AST를 직접 수정)"""
+    limit = select_node.args.get("limit")
+    if limit is None:
+        select_node.limit(max_rows, copy=False)
+        return "injected"
+    value = limit.expression
+    if isinstance(value, exp.Literal) and value.is_int and int(value.name) <= max_rows:
+        return None
+    # 상한 초과 또는 LIMIT ALL / 식(expression)이면 상한으로 교체
+    select_node.limit(max_rows, copy=False)
+    return "clamped"
 
 
 def validate_and_normalize(sql: str, role: str = "user") -> str:
+    return validate_sql(sql, role=role).sql
+
+
+def validate_sql(sql: str, role: str = "user") -> ValidatedSql:
+    """검증 + 정규화 결과와 참조 테이블 목록을 함께 반환 (원문 SQL 해시로 결과 캐시)"""
+    key = ValidationCache.key(sql, role)
+    verdict = validation_cache.get(key)
+    if verdict is None:
+        verdict = _validate_uncached(sql, role)
+        validation_cache.put(key, verdict)
+    if isinstance(verdict, str):
+        raise SqlRejected(verdict)
+    return verdict
+
+
+def _validate_uncached(sql: str, role: str) -> Union[ValidatedSql, str]:
+    """통과하면 ValidatedSql, 거절이면 사유 문자열 (캐시에 그대로 저장)"""
+    reason = _lexical_reject(sql)
+    if reason:
+        validation_cache.count("lexical_rejects")
+        return reason
+
     try:
         ast = sqlglot.parse_one(sql, read="postgres")
     except Exception as e:
-        raise SqlRejected(f"SQL parse failed: {e}")
+        return f"SQL parse failed: {e}"
 
     # SELECT 또는 with(최종이 select인 경우) 허용
     if isinstance(ast, exp.With):
         if not isinstance(ast.this , exp.Select):
-            raise SqlRejected("Only SELECT queries are allowed.")
+            return "Only SELECT queries are allowed."
         select_node = ast.this
     elif isinstance(ast, exp.Select):
         select_node = ast
     else:
-        raise SqlRejected("Only SELECT queries are allowed.")
+        return "Only SELECT queries are allowed."
 
     # role에 따른 테이블 화이트리스트 검사
     allowed_tables = ALLOWED_TABLES_BY_ROLE.get(role, ALLOWED_TABLES_BY_ROLE["user"])
-    used_tables = _extract_table_names(ast)
+    try:
+        used_tables = _collect_tables(ast)
+    except SqlRejected as e:
+        return str(e)
     disallowed = used_tables - allowed_tables
     if disallowed:
-        raise SqlRejected(f"Disallowed tables: {sorted(disallowed)}")
+        return f"Disallowed tables: {sorted(disallowed)}"
 
-    return ast.sql(dialect="postgres")
\ No newline at end of file
+    limit_action = _enforce_limit(select_node, FORCE_LIMIT)
+    return ValidatedSql(
+        sql=ast.sql(dialect="postgres"),
+        tables=frozenset(used_tables),
+        limit_action=limit_action,
+    )
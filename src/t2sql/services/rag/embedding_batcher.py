@@ -0,0 +1,101 @@
+"""
+임베딩 요청 마이크로 배칭
+- 동시에 들어온 embed 요청을 max_wait_ms 동안(또는 max_batch개가 찰 때까지) 모아 API 한 번으로 보냄
+- 같은 텍스트는 한 번만 보내고 결과 벡터를 기다리던 호출자들에게 나눠 줌
+- 업스트림 오류는 그 배치를 기다리던 호출자 모두에게 그대로 전달
+- EMBED_BATCH_MAX / EMBED_BATCH_WAIT_MS 로 설정 (EMBED_BATCH_ENABLED=0이면 배칭 없이 바로 호출)
+"""
+import asyncio
+import os
+import threading
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+AsyncEmbedFn = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+class EmbeddingBatcher:
+    def __init__(self, embed_fn: AsyncEmbedFn, max_batch: int = 64, max_wait_ms: float = 5.0):
+        self.embed_fn = embed_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: Set[asyncio.Task] = set()  # 전송 중 태스크 참조 유지 (GC 방지)
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "texts": 0, "upstream_calls": 0, "upstream_texts": 0}
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """embed_fn과 같은 모양 (EmbeddingCache.get_or_embed_async에 그대로 넘길 수 있음)"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # 이벤트 루프가 바뀌면(테스트 등) 이전 루프의 대기열은 버림
+            self._loop, self._pending, self._timer, self._inflight = loop, [], None, set()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self._pending.append((text, future))
+            futures.append(future)
+        self._count(requests=1, texts=len(texts))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return list(await asyncio.gather(*futures))
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            task = asyncio.ensure_future(self._send(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        unique = list(dict.fromkeys(text for text, _ in batch))
+        self._count(upstream_calls=1, upstream_texts=len(unique))
+        try:
+            vectors = dict(zip(unique, await self.embed_fn(unique)))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for text, future in batch:
+            if not future.done():
+                future.set_result(vectors[text])
+
+    def _count(self, **deltas: int) -> None:
+        with self._lock:
+            for name, n in deltas.items():
+                self._counters[name] += n
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = self._counters["upstream_calls"]
+            return {
+                **self._counters,
+                "avg_batch": round(self._counters["upstream_texts"] / calls, 2) if calls else 0.0,
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+
+_batcher: Optional[EmbeddingBatcher] = None
+
+
+def get_embedding_batcher(embed_fn: AsyncEmbedFn) -> Optional[EmbeddingBatcher]:
+    """프로세스 공용 배처 (EMBED_BATCH_ENABLED=0 이면 None)"""
+    global _batcher
+    if os.getenv("EMBED_BATCH_ENABLED", "1") != "1":
+        return None
+    if _batcher is None:
+        _batcher = EmbeddingBatcher(
+            embed_fn,
+            max_batch=int(os.getenv("EMBED_BATCH_MAX", "64")),
+            max_wait_ms=float(os.getenv("EMBED_BATCH_WAIT_MS", "5")),
+        )
+    return _batcher
@@ -0,0 +1,251 @@
+"""
+임베딩 캐시 (content-addressed)
+- 키: sha256(model + 정규화된 텍스트)
+- 1단계: 프로세스 내 LRU (OrderedDict, 최대 개수 + TTL)
+- 2단계: Postgres embedding_cache 테이블 (TTL + 최대 행 수, 여러 워커/재시작 간 공유)
+  - 풀 대기는 db_timeout초까지만 (DB가 느려도 임베딩마다 풀 기본 대기 30초가 붙지 않도록)
+  - 오류가 나면 retry_seconds 동안 이 단계를 건너뛰고 이후 다시 시도 (메모리 단계 + API로 계속 동작)
+- hit/miss 카운터는 stats()로 확인
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+from t2sql.db.vector_pool import get_vector_pool
+
+logger = logging.getLogger(__name__)
+
+EmbedFn = Callable[[List[str]], List[List[float]]]
+AsyncEmbedFn = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+def normalize_text(text: str) -> str:
+    """유니코드 NFC + 앞뒤 공백 제거 + 연속 공백 하나로"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        ttl_seconds: float = 7 * 24 * 3600,
+        persistent: bool = True,
+        persist_max_rows: int = 200_000,
+        prune_every: int = 1_000,
+        db_timeout: float = 1.0,
+        retry_seconds: float = 30.0,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persistent = persistent
+        self.persist_max_rows = persist_max_rows
+        self.prune_every = prune_every
+        self.db_timeout = db_timeout
+        self.retry_seconds = retry_seconds
+        self._retry_at = 0.0  # 이 시각(monotonic) 전까지 Postgres 단계 건너뜀
+        self._memory: "OrderedDict[str, tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._counters = {"memory_hits": 0, "persistent_hits": 0, "misses": 0, "persistent_errors": 0}
+
+    # ---- 메모리 LRU ----
+    def _memory_get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            item = self._memory.get(key)
+            if item is None:
+                return None
+            stored_at, vec = item
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return vec
+
+    def _memory_put(self, key: str, vec: List[float]) -> None:
+        with self._lock:
+            self._memory[key] = (time.monotonic(), vec)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    # ---- Postgres 단계 ----
+    def _persistent_available(self) -> bool:
+        return self.persistent and time.monotonic() >= self._retry_at
+
+    def _persistent_failed(self, op: str, error: Exception) -> None:
+        self._retry_at = time.monotonic() + self.retry_seconds
+        self._count("persistent_errors")
+        logger.warning("embedding cache %s failed (%s); persistent tier skipped for %.0fs", op, error, self.retry_seconds)
+
+    def _persistent_get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        if not keys or not self._persistent_available():
+            return {}
+        try:
+            with get_vector_pool().connection(timeout=self.db_timeout) as conn:
+                rows = conn.execute(
+                    """
+                    SELECT cache_key, embedding
+                    FROM embedding_cache
+                    WHERE cache_key = ANY(%s)
+                      AND created_at > now() - make_interval(secs => %s)
+                    """,
+                    (list(keys), self.ttl_seconds),
+                ).fetchall()
+            return {k: list(v) for k, v in rows}
+        except Exception as e:
+            self._persistent_failed("read", e)
+            return {}
+
+    def _persistent_put_many(self, model: str, items: Dict[str, List[float]]) -> None:
+        if not items or not self._persistent_available():
+            return
+        try:
+            with get_vector_pool().connection(timeout=self.db_timeout) as conn:
+                with conn.cursor() as cur:
+                    cur.executemany(
+                        """
+                        INSERT INTO embedding_cache (cache_key, model, embedding, created_at)
+                        VALUES (%s, %s, %s, now())
+                        ON CONFLICT (cache_key)
+                        DO UPDATE SET embedding = EXCLUDED.embedding, created_at = now()
+                        """,
+                        [(k, model, v) for k, v in items.items()],
+                    )
+            self._writes += len(items)
+            if self._writes >= self.prune_every:
+                self._writes = 0
+                self.prune()
+        except Exception as e:
+            self._persistent_failed("write", e)
+
+    def prune(self) -> None:
+        """만료 행 + 최대 행 수 초과분(오래된 순) 삭제"""
+        with get_vector_pool().connection(timeout=self.db_timeout) as conn:
+            conn.execute(
+                "DELETE FROM embedding_cache WHERE created_at <= now() - make_interval(secs => %s)",
+                (self.ttl_seconds,),
+            )
+            conn.execute(
+                """
+                DELETE FROM embedding_cache
+                WHERE cache_key IN (
+                    SELECT cache_key FROM embedding_cache
+                    ORDER BY created_at DESC
+                    OFFSET %s
+                )
+                """,
+                (self.persist_max_rows,),
+            )
+
+    # ---- public ----
+    def get_or_embed(self, model: str, texts: Sequence[str], embed_fn: EmbedFn) -> List[List[float]]:
+        """
+        texts의 임베딩을 캐시에서 찾고, 없는 것만 embed_fn(리스트)으로 한 번에 계산해 채움.
+        반환 순서는 texts와 동일.
+        """
+        keys = [cache_key(model, t) for t in texts]
+        found = self._memory_lookup(keys)
+        self._absorb_persistent(found, self._persistent_get_many(self._pending(keys, found)))
+
+        missing = self._missing(keys, texts, found)
+        if missing:
+            new_items = dict(zip(missing.keys(), embed_fn(list(missing.values()))))
+            self._absorb_new(found, new_items)
+            self._persistent_put_many(model, new_items)
+        return [found[k] for k in keys]
+
+    async def get_or_embed_async(self, model: str, texts: Sequence[str], embed_fn: AsyncEmbedFn) -> List[List[float]]:
+        """get_or_embed의 async 버전 (Postgres 단계는 스레드로 넘겨 이벤트 루프를 막지 않음)"""
+        keys = [cache_key(model, t) for t in texts]
+        found = self._memory_lookup(keys)
+        pending = self._pending(keys, found)
+        if pending and self._persistent_available():
+            self._absorb_persistent(found, await asyncio.to_thread(self._persistent_get_many, pending))
+
+        missing = self._missing(keys, texts, found)
+        if missing:
+            new_items = dict(zip(missing.keys(), await embed_fn(list(missing.values()))))
+            self._absorb_new(found, new_items)
+            if self._persistent_available():
+                await asyncio.to_thread(self._persistent_put_many, model, new_items)
+        return [found[k] for k in keys]
+
+    def _memory_lookup(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        for k in keys:
+            vec = self._memory_get(k)
+            if vec is not None:
+                found[k] = vec
+                self._count("memory_hits")
+        return found
+
+    @staticmethod
+    def _pending(keys: Sequence[str], found: Dict[str, List[float]]) -> List[str]:
+        return [k for k in dict.fromkeys(keys) if k not in found]
+
+    def _absorb_persistent(self, found: Dict[str, List[float]], items: Dict[str, List[float]]) -> None:
+        for k, vec in items.items():
+            found[k] = vec
+            self._memory_put(k, vec)
+            self._count("persistent_hits")
+
+    def _missing(self, keys: Sequence[str], texts: Sequence[str], found: Dict[str, List[float]]) -> Dict[str, str]:
+        missing: Dict[str, str] = {}
+        for k, t in zip(keys, texts):
+            if k not in found and k not in missing:
+                missing[k] = t
+        if missing:
+            self._count("misses", len(missing))
+        return missing
+
+    def _absorb_new(self, found: Dict[str, List[float]], new_items: Dict[str, List[float]]) -> None:
+        for k, vec in new_items.items():
+            found[k] = vec
+            self._memory_put(k, vec)
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += n
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self._counters["memory_hits"] + self._counters["persistent_hits"]
+            total = hits + self._counters["misses"]
+            return {
+                **self._counters,
+                "memory_size": len(self._memory),
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "persistent_backoff_s": round(max(0.0, self._retry_at - time.monotonic()), 1) if self.persistent else None,
+            }
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+
+_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """프로세스 공용 캐시 (EMBED_CACHE_* 환경변수로 설정)"""
+    global _cache
+    if _cache is None:
+        _cache = EmbeddingCache(
+            max_entries=int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "10000")),
+            ttl_seconds=float(os.getenv("EMBED_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+            persistent=os.getenv("EMBED_CACHE_BACKEND", "postgres") == "postgres",
+            persist_max_rows=int(os.getenv("EMBED_CACHE_PERSIST_MAX_ROWS", "200000")),
+            db_timeout=float(os.getenv("EMBED_CACHE_DB_TIMEOUT_SECONDS", "1")),
+            retry_seconds=float(os.getenv("EMBED_CACHE_RETRY_SECONDS", "30")),
+        )
+    return _cache
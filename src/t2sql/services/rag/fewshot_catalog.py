@@ -0,0 +1,122 @@
+"""
+Few-shot 예제 (fewshot_embeddings 원본)
+- scripts/embedding/embed_fewshot이 질문을 임베딩해 적재
+- 의도 분류 학습 예시, SQL 프롬프트 고정부에서도 사용
+- SQL의 {BASE_YEAR}/{BASE_MONTH}는 요청 시점 날짜로 치환
+"""
+
+# Few-shot 예제들 (질문만 임베딩, SQL은 그대로 저장)
+FEWSHOTS = [
+    {
+        "question": "fact_production_daily에서 3월 5일~7일 생산량 합계는?",
+        "sql": """SELECT SUM(produced_qty) AS total_produced
+FROM fact_production_daily
+WHERE day >= DATE '{BASE_YEAR}-03-05'
+  AND day < DATE '{BASE_YEAR}-03-08';"""
+    },
+    {
+        "question": "1월 전체 생산량 합계는?",
+        "sql": """SELECT SUM(produced_qty) AS total_produced
+FROM fact_production_daily
+WHERE day >= DATE '{BASE_YEAR}-01-01'
+  AND day < DATE '{BASE_YEAR}-02-01';"""
+    },
+    {
+        "question": "15일 생산량 합계는?",
+        "sql": """SELECT SUM(produced_qty) AS total_produced
+FROM fact_production_daily
+WHERE day = DATE '{BASE_YEAR}-{BASE_MONTH}-15';"""
+    },
+    {
+        "question": "3월에 공정 C 생산량 총합은?",
+        "sql": """SELECT SUM(produced_qty) AS total_produced
+FROM fact_production_daily
+WHERE process = 'C'
+  AND day >= DATE '{BASE_YEAR}-03-01'
+  AND day < DATE '{BASE_YEAR}-04-01';"""
+    },
+    {
+        "question": "3월에 공정별 생산합계가 10 이상인 공정은?",
+        "sql": """SELECT process, SUM(produced_qty) AS total_produced
+FROM fact_production_daily
+WHERE day >= DATE '{BASE_YEAR}-03-01'
+  AND day < DATE '{BASE_YEAR}-04-01'
+GROUP BY process
+HAVING SUM(produced_qty) >= 10
+ORDER BY total_produced DESC;"""
+    },
+    {
+        "question": "일별 공정 기록에서 공정 종류는 몇 개인가?",
+        "sql": """SELECT COUNT(DISTINCT process) AS process_count
+FROM fact_production_daily;"""
+    },
+    {
+        "question": "fact_production_daily와 dim_process로 product '물건2'의 생산량 총합을 구해줘",
+        "sql": """SELECT dp.product, SUM(fp.produced_qty) AS total_produced
+FROM fact_production_daily AS fp
+JOIN dim_process AS dp ON fp.process = dp.process
+WHERE dp.product = '물건2'
+GROUP BY dp.product;"""
+    },
+    {
+        "question": "1월에 '출고 대기' 주문량 합계는?",
+        "sql": """SELECT SUM(ordered_qty) AS total_ordered_waiting
+FROM fact_order_daily
+WHERE order_status = '출고 대기'
+  AND day >= DATE '{BASE_YEAR}-01-01'
+  AND day < DATE '{BASE_YEAR}-02-01';"""
+    },
+    {
+        "question": "1월 '출고 대기' 주문량 대비 1월 생산량 달성률(%)은?",
+        "sql": """WITH o AS (
+  SELECT SUM(ordered_qty) AS ordered_waiting
+  FROM fact_order_daily
+  WHERE order_status = '출고 대기'
+    AND day >= DATE '{BASE_YEAR}-01-01'
+    AND day < DATE '{BASE_YEAR}-02-01'
+),
+p AS (
+  SELECT SUM(produced_qty) AS produced_total
+  FROM fact_production_daily
+  WHERE day >= DATE '{BASE_YEAR}-01-01'
+    AND day < DATE '{BASE_YEAR}-02-01'
+)
+SELECT
+  o.ordered_waiting,
+  p.produced_total,
+  CASE
+    WHEN o.ordered_waiting = 0 THEN 0
+    ELSE ROUND((p.produced_total * 100.0) / o.ordered_waiting, 2)
+  END AS achievement_pct
+FROM o, p;"""
+    },
+    {
+        "question": "1월 공정별로 '출고 대기' 주문량 대비 생산량 달성률(%)을 보여줘",
+        "sql": """WITH o AS (
+  SELECT process, SUM(ordered_qty) AS ordered_waiting
+  FROM fact_order_daily
+  WHERE order_status = '출고 대기'
+    AND day >= DATE '{BASE_YEAR}-01-01'
+    AND day < DATE '{BASE_YEAR}-02-01'
+  GROUP BY process
+),
+p AS (
+  SELECT process, SUM(produced_qty) AS produced_total
+  FROM fact_production_daily
+  WHERE day >= DATE '{BASE_YEAR}-01-01'
+    AND day < DATE '{BASE_YEAR}-02-01'
+  GROUP BY process
+)
+SELECT
+  o.process,
+  o.ordered_waiting,
+  COALESCE(p.produced_total, 0) AS produced_total,
+  CASE
+    WHEN o.ordered_waiting = 0 THEN 0
+    ELSE ROUND((COALESCE(p.produced_total, 0) * 100.0) / o.ordered_waiting, 2)
+  END AS achievement_pct
+FROM o
+LEFT JOIN p ON p.process = o.process
+ORDER BY achievement_pct DESC;"""
+    },
+]
@@ -0,0 +1,206 @@
+"""
+In-process 벡터 인덱스 (schema_embeddings / fewshot_embeddings)
+- 두 테이블은 작고 거의 바뀌지 않으므로 정규화된 NumPy 행렬로 메모리에 올려두고 코사인 top-k를 로컬 계산
+- pgvector `<=>`(cosine distance)와 같은 결과를 내도록 float32 값을 float64로 계산
+- 테이블 변경(table_versions NOTIFY) 시 전체를 다시 로딩해 스냅샷을 교체
+- RAG_LOCAL_INDEX=1 일 때만 앱 시작 시 로딩됨
+"""
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from psycopg import IsolationLevel
+
+from t2sql.db.table_versions import get_table_version_tracker
+from t2sql.db.vector_pool import get_vector_pool
+
+logger = logging.getLogger(__name__)
+
+INDEX_TABLES = ("schema_embeddings", "fewshot_embeddings")
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _as_query(qvec) -> np.ndarray:
+    # pgvector는 입력을 float4로 저장/계산하므로 같은 정밀도로 맞춘다
+    vec = np.asarray(qvec, dtype=np.float32).astype(np.float64)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def _top_k(matrix: np.ndarray, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    if matrix.shape[0] == 0 or k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    distances = 1.0 - matrix @ query
+    k = min(k, distances.shape[0])
+    if k < distances.shape[0]:
+        idx = np.argpartition(distances, k - 1)[:k]
+    else:
+        idx = np.arange(distances.shape[0])
+    # 거리 오름차순, 동률이면 로딩 순서
+    idx = idx[np.lexsort((idx, distances[idx]))]
+    return idx, distances[idx]
+
+
+def _masked_top_k(matrix: np.ndarray, query: np.ndarray, mask: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    positions = np.flatnonzero(mask)
+    idx, dist = _top_k(matrix[positions], query, k)
+    return positions[idx], dist
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    schema_rows: List[tuple]  # (doc_type, table_name, column_name, content)
+    schema_matrix: np.ndarray
+    schema_is_table: np.ndarray  # doc_type == 'table'
+    schema_tables: List[Optional[str]]  # table_name
+    fewshot_rows: List[tuple]  # (question, sql_example)
+    fewshot_matrix: np.ndarray
+    versions: Dict[str, int]
+
+
+class LocalVectorIndex:
+    def __init__(self):
+        self._snapshot: Optional[_Snapshot] = None
+        self._reload_lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._snapshot is not None
+
+    @property
+    def version(self) -> Tuple[int, ...]:
+        """로딩 시점의 (schema_embeddings, fewshot_embeddings) 버전"""
+        snap = self._snapshot
+        if snap is None:
+            return ()
+        return tuple(snap.versions.get(t, 0) for t in INDEX_TABLES)
+
+    def refresh(self) -> None:
+        """두 테이블과 버전을 한 스냅샷(REPEATABLE READ)에서 읽어 인덱스를 교체"""
+        with self._reload_lock:
+            with get_vector_pool().connection() as conn:
+                conn.isolation_level = IsolationLevel.REPEATABLE_READ
+                try:
+                    with conn.transaction():
+                        with conn.cursor() as cur:
+                            cur.execute(
+                                """
+                                SELECT doc_type, table_name, column_name, content,
+                                       embedding::real[]
+                                FROM schema_embeddings
+                                """
+                            )
+                            schema = cur.fetchall()
+                            cur.execute(
+                                """
+                                SELECT question, sql_example, embedding::real[]
+                                FROM fewshot_embeddings
+                                """
+                            )
+                            fewshots = cur.fetchall()
+                            cur.execute(
+                                "SELECT table_name, version FROM table_versions WHERE table_name = ANY(%s)",
+                                (list(INDEX_TABLES),),
+                            )
+                            versions = {name: int(v) for name, v in cur.fetchall()}
+                finally:
+                    conn.isolation_level = None
+
+            self._snapshot = self._build(schema, fewshots, versions)
+            logger.info(
+                "local vector index loaded: %d schema docs, %d fewshots",
+                len(schema), len(fewshots),
+            )
+
+    @classmethod
+    def from_rows(cls, schema_rows: List[tuple], fewshot_rows: List[tuple]) -> "LocalVectorIndex":
+        """DB 없이 행 목록으로 인덱스 구성 (각 행의 마지막 원소가 임베딩)"""
+        index = cls()
+        index._snapshot = cls._build(schema_rows, fewshot_rows, {})
+        return index
+
+    @classmethod
+    def _build(cls, schema: List[tuple], fewshots: List[tuple], versions: Dict[str, int]) -> _Snapshot:
+        return _Snapshot(
+            schema_rows=[tuple(r[:4]) for r in schema],
+            schema_matrix=cls._matrix([r[4] for r in schema]),
+            schema_is_table=np.array([r[0] == "table" for r in schema], dtype=bool),
+            schema_tables=[r[1] for r in schema],
+            fewshot_rows=[tuple(r[:2]) for r in fewshots],
+            fewshot_matrix=cls._matrix([r[2] for r in fewshots]),
+            versions=versions,
+        )
+
+    @staticmethod
+    def _matrix(vectors: List[list]) -> np.ndarray:
+        if not vectors:
+            return np.empty((0, 0))
+        return _normalize(np.asarray(vectors, dtype=np.float32).astype(np.float64))
+
+    def search_schema(self, qvec, k: int = 8, k_tables: Optional[int] = None) -> List[tuple]:
+        """
+        k_tables가 없으면 전체 문서 top-k.
+        있으면 2단계 (vector_search._schema_sql과 동일): 테이블 문서 top k_tables ->
+        그 테이블들의 컬럼/값 문서 top (k - k_tables), 테이블 문서가 앞에 옴
+        """
+        snap = self._snapshot
+        query = _as_query(qvec)
+        if k_tables is None:
+            idx, dist = _top_k(snap.schema_matrix, query, k)
+            return [(*snap.schema_rows[i], float(d)) for i, d in zip(idx, dist)]
+        k_tables = min(k_tables, k)
+        t_idx, t_dist = _masked_top_k(snap.schema_matrix, query, snap.schema_is_table, k_tables)
+        tables = {snap.schema_rows[i][1] for i in t_idx}
+        columns = ~snap.schema_is_table & np.array([t in tables for t in snap.schema_tables], dtype=bool)
+        c_idx, c_dist = _masked_top_k(snap.schema_matrix, query, columns, k - k_tables)
+        return [
+            (*snap.schema_rows[i], float(d))
+            for i, d in zip(np.concatenate([t_idx, c_idx]), np.concatenate([t_dist, c_dist]))
+        ]
+
+    def search_fewshots(self, qvec, k: int = 3) -> List[tuple]:
+        snap = self._snapshot
+        idx, dist = _top_k(snap.fewshot_matrix, _as_query(qvec), k)
+        return [(*snap.fewshot_rows[i], float(d)) for i, d in zip(idx, dist)]
+
+    def _on_table_changed(self, table: str) -> None:
+        if table in INDEX_TABLES:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("local vector index refresh failed")
+
+
+_index: Optional[LocalVectorIndex] = None
+
+
+def local_index_enabled() -> bool:
+    return os.getenv("RAG_LOCAL_INDEX", "0") == "1"
+
+
+def get_local_index() -> Optional[LocalVectorIndex]:
+    """로딩이 끝난 인덱스 (비활성/미로딩이면 None)"""
+    if _index is not None and _index.ready:
+        return _index
+    return None
+
+
+def load_local_index() -> LocalVectorIndex:
+    """앱 시작 시 호출: 변경 감지 리스너를 켜고 인덱스를 로딩"""
+    global _index
+    index = LocalVectorIndex()
+    tracker = get_table_version_tracker()
+    tracker.subscribe(index._on_table_changed)
+    tracker.start()
+    tracker.wait_loaded()
+    index.refresh()
+    _index = index
+    return index
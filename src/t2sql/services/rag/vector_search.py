@@ -1,66 +1,414 @@
-from openai import OpenAI
-import psycopg
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import NamedTuple, Optional
+from openai import AsyncOpenAI, OpenAI
 import os
+import time
+
+from t2sql.db.vector_pool import get_async_vector_pool, get_vector_pool
+from t2sql.services.rag.embedding_batcher import get_embedding_batcher
+from t2sql.services.rag.embedding_cache import get_embedding_cache
+from t2sql.services.rag.local_index import get_local_index
 
 client = OpenAI()
+async_client = AsyncOpenAI()
 
 EMBED_MODEL = "text-embedding-3-small"
 
-def _get_db_url() -> str:
-    """DATABASE_URL 환경변수에서 DB URL 가져오기"""
-    url = os.environ.get("DATABASE_URL")
-    if not url:
-        raise RuntimeError("DATABASE_URL 환경변수가 설정되지 않았습니다.")
-    # psycopg.connect()는 순수 postgresql:// 형식만 받음
-    return url.replace("postgresql+psycopg://", "postgresql://")
+# schema/few-shot 동시 검색 방식: "single"(한 SQL 문) | "concurrent"(풀 커넥션 2개로 병렬)
+RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "single")
+
+# 스키마 검색은 2단계: 질문과 가까운 테이블 문서 SCHEMA_K_TABLES개 -> 그 테이블들의 컬럼/값 문서로 나머지(k - 테이블 수) 채움
+# (테이블이 늘어도 프롬프트에 들어가는 스키마 문서 수는 k로 고정)
+SCHEMA_K = int(os.getenv("RAG_SCHEMA_K", "12"))
+SCHEMA_K_TABLES = int(os.getenv("RAG_SCHEMA_K_TABLES", "3"))
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rag")
+
+
+class RetrievalResult(NamedTuple):
+    schema_rows: list
+    fewshot_rows: list
+
+def _embed_batch(texts: list[str]) -> list[list[float]]:
+    res = client.embeddings.create(model=EMBED_MODEL, input=texts)
+    return [d.embedding for d in res.data]
 
 def embed_query(q: str) -> list[float]:
-    res = client.embeddings.create(model=EMBED_MODEL, input=q)
-    return res.data[0].embedding
+    # (model, 정규화 텍스트) 캐시에 없을 때만 API 호출
+    return get_embedding_cache().get_or_embed(EMBED_MODEL, [q], _embed_batch)[0]
+
+async def _embed_batch_async(texts: list[str]) -> list[list[float]]:
+    res = await async_client.embeddings.create(model=EMBED_MODEL, input=texts)
+    return [d.embedding for d in res.data]
+
+def get_query_embed_batcher():
+    return get_embedding_batcher(_embed_batch_async)
+
+def _async_embed_fn():
+    # 캐시 미스는 마이크로 배처를 거쳐 동시 요청과 합쳐서 호출 (EMBED_BATCH_ENABLED=0이면 바로 호출)
+    batcher = get_query_embed_batcher()
+    return batcher.embed if batcher is not None else _embed_batch_async
+
+async def embed_query_async(q: str) -> list[float]:
+    vectors = await get_embedding_cache().get_or_embed_async(EMBED_MODEL, [q], _async_embed_fn())
+    return vectors[0]
+
+async def embed_many_async(texts: list[str]) -> list[list[float]]:
+    """여러 질문을 캐시에 없는 것만 모아 임베딩 (배처가 EMBED_BATCH_MAX개씩 나눠 동시에 호출)"""
+    return await get_embedding_cache().get_or_embed_async(EMBED_MODEL, texts, _async_embed_fn())
+
+
+@dataclass
+class RetrievalContext:
+    """
+    요청 단위 검색 컨텍스트.
+    질문 임베딩을 한 번만 계산해 두고 schema/few-shot 등 모든 검색기가 같은 벡터를 재사용한다.
+    timings에는 단계별 소요 시간(ms)이 쌓인다.
+    """
+    question: str
+    qvec: Optional[list[float]] = None
+    embed_calls: int = 0
+    timings: dict[str, float] = field(default_factory=dict)
+    # (k_schema, k_fewshot) -> 진행 중/완료된 async 검색 (prefetch 결과 재사용)
+    _retrievals: dict = field(default_factory=dict, repr=False)
+    _embedding: Optional[asyncio.Future] = field(default=None, repr=False)
+
+    @property
+    def vector(self) -> list[float]:
+        if self.qvec is None:
+            with self.timer("embed_ms"):
+                self.qvec = embed_query(self.question)
+            self.embed_calls += 1
+        return self.qvec
+
+    async def vector_async(self) -> list[float]:
+        # 동시에 여러 코루틴이 기다려도 임베딩 요청은 한 번만
+        if self.qvec is None:
+            if self._embedding is None:
+                self._embedding = asyncio.ensure_future(self._embed_async())
+            await self._embedding
+        return self.qvec
+
+    async def _embed_async(self) -> None:
+        with self.timer("embed_ms"):
+            self.qvec = await embed_query_async(self.question)
+        self.embed_calls += 1
+
+    @contextmanager
+    def timer(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.timings[name] = round(self.timings.get(name, 0.0) + elapsed, 2)
+
+    def search_schema(self, k: int = SCHEMA_K):
+        qvec = self.vector
+        with self.timer("schema_search_ms"):
+            return search_schema(self.question, k=k, qvec=qvec)
+
+    def search_fewshots(self, k: int = 3):
+        qvec = self.vector
+        with self.timer("fewshot_search_ms"):
+            return search_fewshots(self.question, k=k, qvec=qvec)
+
+    def retrieve(self, k_schema: int = SCHEMA_K, k_fewshot: int = 3) -> RetrievalResult:
+        """schema + few-shot을 한 번에 검색 (RETRIEVAL_MODE에 따라 단일 SQL 또는 병렬)"""
+        qvec = self.vector
+        with self.timer("retrieval_ms"):
+            if RETRIEVAL_MODE == "concurrent":
+                return search_schema_and_fewshots_concurrent(self.question, k_schema, k_fewshot, qvec=qvec)
+            return search_schema_and_fewshots(self.question, k_schema, k_fewshot, qvec=qvec)
+
+    def prefetch(self, k_schema: int = SCHEMA_K, k_fewshot: int = 3) -> asyncio.Task:
+        """
+        검색을 백그라운드 task로 미리 시작 (예: 의도 분류와 동시에).
+        이후 같은 k로 retrieve_async를 부르면 이 task의 결과를 기다린다.
+        """
+        key = (k_schema, k_fewshot)
+        if key not in self._retrievals:
+            self._retrievals[key] = asyncio.ensure_future(self._retrieve_async(k_schema, k_fewshot))
+        return self._retrievals[key]
+
+    async def retrieve_async(self, k_schema: int = SCHEMA_K, k_fewshot: int = 3) -> RetrievalResult:
+        return await self.prefetch(k_schema, k_fewshot)
+
+    def provide(self, result: RetrievalResult, k_schema: int = SCHEMA_K, k_fewshot: int = 3) -> None:
+        """밖에서(배치 검색 등) 미리 구한 검색 결과를 넣어 둠. 이후 retrieve_async는 바로 반환"""
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(result)
+        self._retrievals[(k_schema, k_fewshot)] = future
+
+    async def _retrieve_async(self, k_schema: int, k_fewshot: int) -> RetrievalResult:
+        qvec = await self.vector_async()
+        with self.timer("retrieval_ms"):
+            if RETRIEVAL_MODE == "concurrent":
+                return await search_schema_and_fewshots_concurrent_async(self.question, k_schema, k_fewshot, qvec=qvec)
+            return await search_schema_and_fewshots_async(self.question, k_schema, k_fewshot, qvec=qvec)
+
+    def stats(self) -> dict:
+        return {"embed_calls": self.embed_calls, **self.timings}
+
+
+def _schema_sql(qvec: str) -> str:
+    """2단계 스키마 검색 SQL 조각 (qvec: 질문 벡터 SQL 식)"""
+    return f"""
+        (SELECT doc_type, table_name, column_name, content,
+                (embedding <=> {qvec}) AS distance
+         FROM schema_embeddings
+         WHERE doc_type = 'table'
+         ORDER BY embedding <=> {qvec}
+         LIMIT %(k_tables)s)
+        UNION ALL
+        (SELECT doc_type, table_name, column_name, content,
+                (embedding <=> {qvec}) AS distance
+         FROM schema_embeddings
+         WHERE doc_type <> 'table'
+           AND table_name IN (
+               SELECT table_name FROM schema_embeddings
+               WHERE doc_type = 'table'
+               ORDER BY embedding <=> {qvec}
+               LIMIT %(k_tables)s
+           )
+         ORDER BY embedding <=> {qvec}
+         LIMIT %(k_columns)s)
+    """
 
-def search_schema(q: str, k: int = 8):
-    qvec = embed_query(q)
-    with psycopg.connect(_get_db_url()) as conn:
+def _schema_params(k: int) -> dict:
+    k_tables = min(SCHEMA_K_TABLES, k)
+    return {"k_tables": k_tables, "k_columns": k - k_tables}
+
+_SCHEMA_SQL = _schema_sql("%(qvec)s::vector")
+
+_ALL_SCHEMA_SQL = """
+    SELECT doc_type, table_name, column_name, content,
+           NULL AS distance
+    FROM schema_embeddings
+    WHERE doc_type = 'table'
+    ORDER BY table_name
+"""
+
+_FEWSHOT_SQL = """
+    SELECT question, sql_example,
+           (embedding <=> %(qvec)s::vector) AS distance
+    FROM fewshot_embeddings
+    ORDER BY embedding <=> %(qvec)s::vector
+    LIMIT %(k)s
+"""
+
+# schema(2단계)/few-shot top-k를 한 문장으로 (벡터는 이름 있는 파라미터로 한 번만 바인딩)
+_COMBINED_SQL = """
+    WITH s AS (
+        {schema}
+    ),
+    f AS (
+        SELECT question, sql_example,
+               (embedding <=> %(qvec)s::vector) AS distance
+        FROM fewshot_embeddings
+        ORDER BY embedding <=> %(qvec)s::vector
+        LIMIT %(k_fewshot)s
+    )
+    SELECT 0 AS part, doc_type, table_name, column_name, content,
+           NULL::text AS question, NULL::text AS sql_example, distance
+    FROM s
+    UNION ALL
+    SELECT 1 AS part, NULL, NULL, NULL, NULL,
+           question, sql_example, distance
+    FROM f
+    ORDER BY part, distance
+""".format(schema=_schema_sql("%(qvec)s::vector"))
+
+# 여러 질문 벡터의 schema/few-shot top-k를 한 문장으로 (unnest + LATERAL, 질문 순번 ord로 구분)
+_BATCH_SQL = """
+    WITH q AS (
+        SELECT ord, v::vector AS qvec
+        FROM unnest(%(qvecs)s::text[]) WITH ORDINALITY AS t(v, ord)
+    )
+    SELECT q.ord, 0 AS part, s.doc_type, s.table_name, s.column_name, s.content,
+           NULL::text AS question, NULL::text AS sql_example, s.distance
+    FROM q CROSS JOIN LATERAL (
+        {schema}
+    ) AS s
+    UNION ALL
+    SELECT q.ord, 1 AS part, NULL, NULL, NULL, NULL,
+           f.question, f.sql_example, f.distance
+    FROM q CROSS JOIN LATERAL (
+        SELECT question, sql_example,
+               (embedding <=> q.qvec) AS distance
+        FROM fewshot_embeddings
+        ORDER BY embedding <=> q.qvec
+        LIMIT %(k_fewshot)s
+    ) AS f
+    ORDER BY ord, part, distance
+""".format(schema=_schema_sql("q.qvec"))
+
+def _tables_first(rows) -> list:
+    # 테이블 문서 다음에 컬럼/값 문서 (각각 거리순 유지)
+    return sorted(rows, key=lambda r: r[0] != "table")
+
+def _split_combined(rows) -> RetrievalResult:
+    schema_rows = _tables_first(
+        (doc_type, table_name, column_name, content, dist)
+        for part, doc_type, table_name, column_name, content, _, _, dist in rows
+        if part == 0
+    )
+    fewshot_rows = [
+        (question, sql_example, dist)
+        for part, _, _, _, _, question, sql_example, dist in rows
+        if part == 1
+    ]
+    return RetrievalResult(schema_rows, fewshot_rows)
+
+def _local_result(qvec, k_schema: int, k_fewshot: int) -> Optional[RetrievalResult]:
+    index = get_local_index()
+    if index is None:
+        return None
+    return RetrievalResult(
+        index.search_schema(qvec, k_schema, k_tables=SCHEMA_K_TABLES),
+        index.search_fewshots(qvec, k_fewshot),
+    )
+
+def _fetch(sql: str, params: Optional[dict] = None):
+    with get_vector_pool().connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT doc_type, table_name, column_name, content,
-                        (embedding <=> %s::vector) AS distance
-                FROM schema_embeddings
-                ORDER BY embedding <=> %s::vector
-                LIMIT %s
-                """,
-                (qvec, qvec, k),
-            )
+            cur.execute(sql, params)
             return cur.fetchall()
 
+async def _fetch_async(sql: str, params: Optional[dict] = None):
+    pool = await get_async_vector_pool()
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(sql, params)
+            return await cur.fetchall()
+
+
+def search_schema(q: str, k: int = SCHEMA_K, qvec: Optional[list[float]] = None):
+    """질문과 유사한 스키마 문서 검색 (qvec이 있으면 임베딩 생략)"""
+    if qvec is None:
+        qvec = embed_query(q)
+    index = get_local_index()
+    if index is not None:
+        return index.search_schema(qvec, k, k_tables=SCHEMA_K_TABLES)
+    return _tables_first(_fetch(_SCHEMA_SQL, {"qvec": qvec, **_schema_params(k)}))
+
 def fetch_all_schema():
-    """Return all schema metadata rows without vector search."""
-    with psycopg.connect(_get_db_url()) as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT doc_type, table_name, column_name, content,
-                       NULL AS distance
-                FROM schema_embeddings
-                ORDER BY table_name, column_name NULLS FIRST
-                """
-            )
-            return cur.fetchall()
+    """Return all table-level schema docs without vector search (column/value docs are excluded)."""
+    return _fetch(_ALL_SCHEMA_SQL)
 
-def search_fewshots(q: str, k: int = 3):
-    """질문과 유사한 few-shot 예제를 검색"""
-    qvec = embed_query(q)
-    with psycopg.connect(_get_db_url()) as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT question, sql_example,
-                       (embedding <=> %s::vector) AS distance
-                FROM fewshot_embeddings
-                ORDER BY embedding <=> %s::vector
-                LIMIT %s
-                """,
-                (qvec, qvec, k),
-            )
-            return cur.fetchall()
+def search_fewshots(q: str, k: int = 3, qvec: Optional[list[float]] = None):
+    """질문과 유사한 few-shot 예제를 검색 (qvec이 있으면 임베딩 생략)"""
+    if qvec is None:
+        qvec = embed_query(q)
+    index = get_local_index()
+    if index is not None:
+        return index.search_fewshots(qvec, k)
+    return _fetch(_FEWSHOT_SQL, {"qvec": qvec, "k": k})
+
+def search_schema_and_fewshots(
+    q: str,
+    k_schema: int = SCHEMA_K,
+    k_fewshot: int = 3,
+    qvec: Optional[list[float]] = None,
+) -> RetrievalResult:
+    """
+    schema/few-shot top-k를 한 번의 왕복(단일 SQL 문)으로 검색.
+    반환 행 형식은 search_schema / search_fewshots와 동일.
+    """
+    if qvec is None:
+        qvec = embed_query(q)
+    local = _local_result(qvec, k_schema, k_fewshot)
+    if local is not None:
+        return local
+    rows = _fetch(_COMBINED_SQL, {"qvec": qvec, "k_fewshot": k_fewshot, **_schema_params(k_schema)})
+    return _split_combined(rows)
+
+def search_schema_and_fewshots_concurrent(
+    q: str,
+    k_schema: int = SCHEMA_K,
+    k_fewshot: int = 3,
+    qvec: Optional[list[float]] = None,
+) -> RetrievalResult:
+    """schema/few-shot 검색을 풀 커넥션 2개에서 동시에 실행"""
+    if qvec is None:
+        qvec = embed_query(q)
+    local = _local_result(qvec, k_schema, k_fewshot)
+    if local is not None:
+        return local
+    schema_future = _executor.submit(search_schema, q, k_schema, qvec)
+    fewshot_future = _executor.submit(search_fewshots, q, k_fewshot, qvec)
+    return RetrievalResult(schema_future.result(), fewshot_future.result())
+
+
+# ============ async (AsyncConnectionPool) ============
+
+async def search_schema_async(q: str, k: int = SCHEMA_K, qvec: Optional[list[float]] = None):
+    if qvec is None:
+        qvec = await embed_query_async(q)
+    index = get_local_index()
+    if index is not None:
+        return index.search_schema(qvec, k, k_tables=SCHEMA_K_TABLES)
+    return _tables_first(await _fetch_async(_SCHEMA_SQL, {"qvec": qvec, **_schema_params(k)}))
+
+async def fetch_all_schema_async():
+    return await _fetch_async(_ALL_SCHEMA_SQL)
+
+async def search_fewshots_async(q: str, k: int = 3, qvec: Optional[list[float]] = None):
+    if qvec is None:
+        qvec = await embed_query_async(q)
+    index = get_local_index()
+    if index is not None:
+        return index.search_fewshots(qvec, k)
+    return await _fetch_async(_FEWSHOT_SQL, {"qvec": qvec, "k": k})
+
+async def search_schema_and_fewshots_async(
+    q: str,
+    k_schema: int = SCHEMA_K,
+    k_fewshot: int = 3,
+    qvec: Optional[list[float]] = None,
+) -> RetrievalResult:
+    if qvec is None:
+        qvec = await embed_query_async(q)
+    local = _local_result(qvec, k_schema, k_fewshot)
+    if local is not None:
+        return local
+    rows = await _fetch_async(_COMBINED_SQL, {"qvec": qvec, "k_fewshot": k_fewshot, **_schema_params(k_schema)})
+    return _split_combined(rows)
+
+async def search_schema_and_fewshots_concurrent_async(
+    q: str,
+    k_schema: int = SCHEMA_K,
+    k_fewshot: int = 3,
+    qvec: Optional[list[float]] = None,
+) -> RetrievalResult:
+    if qvec is None:
+        qvec = await embed_query_async(q)
+    local = _local_result(qvec, k_schema, k_fewshot)
+    if local is not None:
+        return local
+    schema_rows, fewshot_rows = await asyncio.gather(
+        search_schema_async(q, k_schema, qvec),
+        search_fewshots_async(q, k_fewshot, qvec),
+    )
+    return RetrievalResult(schema_rows, fewshot_rows)
+
+async def search_schema_and_fewshots_many_async(
+    qvecs: list[list[float]],
+    k_schema: int = SCHEMA_K,
+    k_fewshot: int = 3,
+) -> list[RetrievalResult]:
+    """여러 질문 벡터의 검색을 한 번의 왕복으로 (반환 순서는 qvecs와 동일)"""
+    if not qvecs:
+        return []
+    index = get_local_index()
+    if index is not None:
+        return [_local_result(v, k_schema, k_fewshot) for v in qvecs]
+    literals = ["[" + ",".join(map(str, v)) + "]" for v in qvecs]
+    rows = await _fetch_async(_BATCH_SQL, {"qvecs": literals, "k_fewshot": k_fewshot, **_schema_params(k_schema)})
+    grouped: list[list] = [[] for _ in qvecs]
+    for ord_, *rest in rows:
+        grouped[ord_ - 1].append(rest)
+    return [_split_combined(g) for g in grouped]
@@ -0,0 +1,140 @@
+"""
+배치 NL -> SQL 단위 테스트 (DB/LLM 호출 없음, 가짜 검색/생성/실행)
+- 임베딩/검색은 배치 전체에 한 번
+- 결과는 끝나는 순서대로, DB 동시 사용은 BATCH_DB_CONCURRENCY 이하
+- unnest + LATERAL 검색 결과를 질문별로 나눔
+- 임베딩/검색 실패는 error + done 이벤트로 끝남
+
+실행: pytest tests/pytest/test_batch.py -v
+"""
+import asyncio
+
+from t2sql.services.query import batch
+from t2sql.services.rag import vector_search
+from t2sql.services.rag.vector_search import RetrievalResult
+
+
+class _FakeSession:
+    active = 0
+    peak = 0
+
+    async def __aenter__(self):
+        _FakeSession.active += 1
+        _FakeSession.peak = max(_FakeSession.peak, _FakeSession.active)
+        return self
+
+    async def __aexit__(self, *exc):
+        _FakeSession.active -= 1
+
+
+def _patch(monkeypatch, delays):
+    calls = {"embed": 0, "search": 0}
+
+    async def embed_many(texts):
+        calls["embed"] += 1
+        return [[float(i)] for i in range(len(texts))]
+
+    async def search_many(qvecs):
+        calls["search"] += 1
+        return [RetrievalResult([], [(f"q{v[0]}", "SELECT 1", 0.0)]) for v in qvecs]
+
+    async def prepare(question, role, ctx):
+        # 검색 결과는 배치에서 넣어 둔 것 (추가 임베딩/검색 없음)
+        retrieval = await ctx.retrieve_async()
+        return {"sql": retrieval.fewshot_rows[0][1], "tables": frozenset(), "meta": {}}
+
+    async def run(db, question, role, ctx, prepared):
+        prepared = await prepared
+        await asyncio.sleep(delays[question])
+        return {"sql": prepared["sql"], "rows": [{"q": question}], "meta": {"ok": True}}
+
+    monkeypatch.setattr(batch, "embed_many_async", embed_many)
+    monkeypatch.setattr(batch, "search_schema_and_fewshots_many_async", search_many)
+    monkeypatch.setattr(batch, "prepare_sql_async", prepare)
+    monkeypatch.setattr(batch, "run_nl_query_async", run)
+    return calls
+
+
+class TestBatch:
+    """run_batch_async 테스트"""
+
+    def test_results_stream_in_completion_order(self, monkeypatch):
+        delays = {"slow": 0.05, "fast": 0.0, "mid": 0.02}
+        calls = _patch(monkeypatch, delays)
+
+        async def main():
+            return [e async for e in batch.run_batch_async(list(delays), "user", _FakeSession)]
+
+        events = asyncio.run(main())
+        assert events[0]["type"] == "start" and events[-1]["type"] == "done"
+        assert [e["question"] for e in events[1:-1]] == ["fast", "mid", "slow"]
+        assert [e["index"] for e in events[1:-1]] == [1, 2, 0]
+        assert events[-1]["ok"] == 3
+        assert calls == {"embed": 1, "search": 1}
+
+    def test_db_concurrency_is_bounded(self, monkeypatch):
+        questions = [f"q{i}" for i in range(10)]
+        _patch(monkeypatch, {q: 0.01 for q in questions})
+        monkeypatch.setattr(batch, "DB_CONCURRENCY", 3)
+        _FakeSession.peak = 0
+
+        async def main():
+            return [e async for e in batch.run_batch_async(questions, "user", _FakeSession)]
+
+        events = asyncio.run(main())
+        assert len(events) == 12
+        assert _FakeSession.peak == 3
+
+    def test_embed_failure_emits_error_then_done(self, monkeypatch):
+        _patch(monkeypatch, {"a": 0.0, "b": 0.0})
+
+        async def embed_many(texts):
+            raise ConnectionError("embedding api down")
+
+        monkeypatch.setattr(batch, "embed_many_async", embed_many)
+
+        async def main():
+            return [e async for e in batch.run_batch_async(["a", "b"], "user", _FakeSession)]
+
+        events = asyncio.run(main())
+        assert [e["type"] for e in events] == ["error", "done"]
+        assert events[0]["stage"] == "embed" and "embedding api down" in events[0]["message"]
+        assert events[1]["count"] == 2 and events[1]["ok"] == 0 and events[1]["failed"] == 2
+
+    def test_retrieval_failure_emits_error_then_done(self, monkeypatch):
+        _patch(monkeypatch, {"a": 0.0})
+
+        async def search_many(qvecs):
+            raise TimeoutError("pool timeout")
+
+        monkeypatch.setattr(batch, "search_schema_and_fewshots_many_async", search_many)
+
+        async def main():
+            return [e async for e in batch.run_batch_async(["a"], "user", _FakeSession)]
+
+        events = asyncio.run(main())
+        assert [e["type"] for e in events] == ["error", "done"]
+        assert events[0]["stage"] == "retrieval"
+        assert "embed_ms" in events[1]["timings"]
+
+
+class TestBatchSearch:
+    """여러 질문 벡터 검색 (unnest + LATERAL) 결과 분리"""
+
+    def test_groups_rows_by_question(self, monkeypatch):
+        rows = [
+            (1, 0, "table", "t1", None, "c1", None, None, 0.1),
+            (1, 1, None, None, None, None, "fq1", "SELECT 1", 0.2),
+            (2, 1, None, None, None, None, "fq2", "SELECT 2", 0.3),
+        ]
+
+        async def fetch(sql, params):
+            assert params["qvecs"] == ["[1.0,0.0]", "[0.0,1.0]"]
+            return rows
+
+        monkeypatch.setattr(vector_search, "_fetch_async", fetch)
+        monkeypatch.setattr(vector_search, "get_local_index", lambda: None)
+        result = asyncio.run(vector_search.search_schema_and_fewshots_many_async([[1.0, 0.0], [0.0, 1.0]]))
+
+        assert result[0] == RetrievalResult([("table", "t1", None, "c1", 0.1)], [("fq1", "SELECT 1", 0.2)])
+        assert result[1] == RetrievalResult([], [("fq2", "SELECT 2", 0.3)])
@@ -0,0 +1,209 @@
+"""
+캐시 계층 단위 테스트 (DB/LLM 호출 없음)
+- 임베딩 캐시: 정규화 키, LRU/TTL, hit/miss 카운터, Postgres 단계 오류 시 일시 건너뛰기
+- 질문 -> SQL 캐시: 정확 일치, 유사도 매칭, 컨텍스트 무효화
+- 쿼리 결과 캐시: 크기 제한, 테이블 단위 무효화
+
+실행: pytest tests/pytest/test_caches.py -v
+"""
+from datetime import date
+
+import pytest
+
+from t2sql.db.table_versions import get_table_version_tracker
+from t2sql.services.query.nl_cache import NlQueryCache, cache_context
+from t2sql.services.query.result_cache import ResultCache, estimate_size
+from t2sql.services.rag import embedding_cache
+from t2sql.services.rag.embedding_cache import EmbeddingCache, cache_key
+from t2sql.services.rag.vector_search import RetrievalContext
+
+
+class _FakeEmbedder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+class _DownPool:
+    """connection()마다 풀 타임아웃처럼 실패 (받은 timeout 기록)"""
+
+    def __init__(self):
+        self.timeouts = []
+
+    def connection(self, timeout=None):
+        self.timeouts.append(timeout)
+        raise TimeoutError("couldn't get a connection")
+
+
+class TestEmbeddingCache:
+    """임베딩 캐시 테스트"""
+
+    def test_key_normalizes_whitespace(self):
+        assert cache_key("m", "  이번 달   생산량 ") == cache_key("m", "이번 달 생산량")
+        assert cache_key("m", "이번 달 생산량") != cache_key("other", "이번 달 생산량")
+
+    def test_repeat_question_hits_memory(self):
+        cache = EmbeddingCache(persistent=False)
+        embed = _FakeEmbedder()
+
+        first = cache.get_or_embed("m", ["이번 달 생산량"], embed)
+        second = cache.get_or_embed("m", ["이번 달  생산량"], embed)
+
+        assert first == second
+        assert len(embed.calls) == 1
+        stats = cache.stats()
+        assert stats["misses"] == 1
+        assert stats["memory_hits"] == 1
+
+    def test_only_missing_texts_are_embedded(self):
+        cache = EmbeddingCache(persistent=False)
+        embed = _FakeEmbedder()
+        cache.get_or_embed("m", ["a"], embed)
+
+        result = cache.get_or_embed("m", ["a", "bb", "bb"], embed)
+
+        assert embed.calls == [["a"], ["bb"]]
+        assert result == [[1.0, 1.0], [2.0, 1.0], [2.0, 1.0]]
+
+    def test_lru_eviction(self):
+        cache = EmbeddingCache(max_entries=2, persistent=False)
+        embed = _FakeEmbedder()
+        for t in ["a", "b", "c"]:
+            cache.get_or_embed("m", [t], embed)
+
+        assert cache.stats()["memory_size"] == 2
+        cache.get_or_embed("m", ["a"], embed)
+        assert embed.calls[-1] == ["a"]
+
+    def test_ttl_expiry(self):
+        cache = EmbeddingCache(ttl_seconds=0, persistent=False)
+        embed = _FakeEmbedder()
+        cache.get_or_embed("m", ["a"], embed)
+        cache.get_or_embed("m", ["a"], embed)
+        assert len(embed.calls) == 2
+
+    def test_db_error_backs_off_then_retries(self, monkeypatch):
+        pool = _DownPool()
+        monkeypatch.setattr(embedding_cache, "get_vector_pool", lambda: pool)
+        cache = EmbeddingCache(db_timeout=0.5, retry_seconds=60)
+        embed = _FakeEmbedder()
+
+        assert cache.get_or_embed("m", ["a"], embed) == [[1.0, 1.0]]
+        assert pool.timeouts == [0.5]  # 읽기 실패 -> 쓰기는 건너뜀
+        cache.get_or_embed("m", ["bb"], embed)
+        assert len(pool.timeouts) == 1  # 백오프 중에는 DB를 건드리지 않음
+        assert cache.persistent and cache.stats()["persistent_backoff_s"] > 0
+
+        cache._retry_at = 0.0  # 백오프 만료
+        cache.get_or_embed("m", ["ccc"], embed)
+        assert len(pool.timeouts) == 2
+        assert cache.stats()["persistent_errors"] == 2
+
+
+class TestNlQueryCache:
+    """질문 -> SQL 캐시 테스트"""
+
+    CTX = ("user", "2026-03-18", (1, 1))
+    SQL = "SELECT SUM(produced_qty) FROM fact_production_daily"
+
+    def test_exact_hit_ignores_case_and_punctuation(self):
+        cache = NlQueryCache()
+        cache.put("이번 달 생산량 합계는?", self.CTX, self.SQL)
+
+        hit = cache.lookup("이번 달  생산량 합계는", self.CTX)
+
+        assert hit is not None
+        assert hit.kind == "exact"
+        assert hit.sql == self.SQL
+
+    @pytest.mark.parametrize("other_ctx", [
+        ("admin", "2026-03-18", (1, 1)),  # role
+        ("user", "2026-03-19", (1, 1)),   # 기준 날짜 (오늘/어제가 가리키는 날이 바뀜)
+        ("user", "2026-03-18", (2, 1)),   # schema 버전
+    ])
+    def test_context_change_misses(self, other_ctx):
+        cache = NlQueryCache()
+        cache.put("이번 달 생산량 합계는?", self.CTX, self.SQL)
+        assert cache.lookup("이번 달 생산량 합계는?", other_ctx) is None
+
+    def test_semantic_hit_above_threshold(self):
+        cache = NlQueryCache(similarity=0.9)
+        cache.put("공정 C 3월 생산량", self.CTX, self.SQL, qvec=[1.0, 0.0, 0.1])
+
+        ctx = RetrievalContext(question="3월 공정 C 생산량 알려줘", qvec=[1.0, 0.0, 0.12])
+        hit = cache.lookup(ctx.question, self.CTX, ctx)
+
+        assert hit is not None
+        assert hit.kind == "semantic"
+        assert hit.similarity >= 0.9
+
+    def test_semantic_requires_same_literals(self):
+        cache = NlQueryCache(similarity=0.5)
+        cache.put("3월 생산량 합계", self.CTX, self.SQL, qvec=[1.0, 0.0])
+
+        ctx = RetrievalContext(question="4월 생산량 합계", qvec=[1.0, 0.0])
+        assert cache.lookup(ctx.question, self.CTX, ctx) is None
+        assert ctx.embed_calls == 0
+
+    def test_semantic_requires_same_relative_period(self):
+        cache = NlQueryCache(similarity=0.5)
+        cache.put("이번 달 생산량 합계", self.CTX, self.SQL, qvec=[1.0, 0.0])
+
+        assert cache.lookup("지난달 생산량 합계", self.CTX, RetrievalContext("지난달 생산량 합계", qvec=[1.0, 0.0])) is None
+        hit = cache.lookup("이번달 생산량 총합", self.CTX, RetrievalContext("이번달 생산량 총합", qvec=[1.0, 0.0]))
+        assert hit is not None and hit.kind == "semantic"
+
+    def test_context_is_per_day(self):
+        assert cache_context("user", date(2026, 3, 18)) != cache_context("user", date(2026, 3, 19))
+
+
+class TestResultCache:
+    """쿼리 결과 캐시 테스트"""
+
+    SQL = "SELECT process, SUM(produced_qty) FROM fact_production_daily GROUP BY process"
+    TABLES = frozenset({"fact_production_daily"})
+    ROWS = [{"process": "A", "sum": 10}, {"process": "B", "sum": 7}]
+
+    def _put(self, cache, sql=SQL, role="user", tables=TABLES, rows=ROWS):
+        return cache.put(sql, role, tables, rows, cache.versions(tables))
+
+    def test_hit_is_scoped_by_role(self):
+        cache = ResultCache()
+        self._put(cache)
+        assert cache.get(self.SQL, "user") == self.ROWS
+        assert cache.get(self.SQL, "admin") is None
+
+    def test_table_write_invalidates(self):
+        cache = ResultCache()
+        self._put(cache)
+        self._put(cache, sql="SELECT * FROM dim_process", tables=frozenset({"dim_process"}))
+
+        cache.invalidate_table("fact_production_daily")
+
+        assert cache.get(self.SQL, "user") is None
+        assert cache.get("SELECT * FROM dim_process", "user") is not None
+
+    def test_version_change_invalidates(self, monkeypatch):
+        cache = ResultCache()
+        self._put(cache)
+        tracker = get_table_version_tracker()
+        monkeypatch.setattr(tracker, "_versions", {"fact_production_daily": 99})
+        assert cache.get(self.SQL, "user") is None
+
+    def test_bytes_bound_evicts_lru(self):
+        size = estimate_size(self.ROWS)
+        cache = ResultCache(max_bytes=size * 2, max_entry_ratio=1.0)
+        for i in range(3):
+            self._put(cache, sql=f"{self.SQL} -- {i}")
+
+        stats = cache.stats()
+        assert stats["entries"] == 2
+        assert stats["bytes"] <= size * 2
+        assert cache.get(f"{self.SQL} -- 0", "user") is None
+
+    def test_oversized_result_not_stored(self):
+        cache = ResultCache(max_bytes=10)
+        assert self._put(cache) is False
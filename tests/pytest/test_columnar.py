@@ -0,0 +1,59 @@
+"""
+열 단위 결과 직렬화 단위 테스트 (DB/LLM 호출 없음)
+- Accept 협상
+- columns JSON / Arrow IPC 왕복, 2000행 기준 크기 비교
+
+실행: pytest tests/pytest/test_columnar.py -v
+"""
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from t2sql.services.query.columnar import (
+    ARROW_MEDIA_TYPE,
+    COLUMNS_MEDIA_TYPE,
+    encode_arrow,
+    encode_columns_json,
+    negotiate,
+)
+
+
+def _result(n=2000):
+    columns = ["day", "process", "produced_qty", "achievement_pct"]
+    rows = [
+        (date(2026, 1, 1) + timedelta(days=i % 365), "ABCDEFGHI"[i % 9], i % 500, Decimal(i % 1000) / 10)
+        for i in range(n)
+    ]
+    data = [list(col) for col in zip(*rows)]
+    return {"sql": "SELECT ...", "columns": columns, "data": data, "meta": {"ok": True, "row_count": n}}
+
+
+class TestColumnar:
+    """열 단위 형식 테스트"""
+
+    def test_negotiate(self):
+        assert negotiate(ARROW_MEDIA_TYPE) == ARROW_MEDIA_TYPE
+        assert negotiate(f"{COLUMNS_MEDIA_TYPE}, application/json") == COLUMNS_MEDIA_TYPE
+        assert negotiate("application/json") is None
+
+    def test_columns_json_smaller_than_rows(self):
+        result = _result()
+        rows = [dict(zip(result["columns"], r)) for r in zip(*result["data"])]
+        rows_json = json.dumps({"sql": result["sql"], "rows": rows, "meta": result["meta"]}, default=str)
+
+        body = encode_columns_json(result)
+        decoded = json.loads(body)
+        assert decoded["columns"] == result["columns"]
+        assert decoded["data"][0][0] == "2026-01-01"
+        assert len(body) < len(rows_json) * 0.6
+
+    def test_arrow_roundtrip(self):
+        pa = pytest.importorskip("pyarrow")
+        result = _result()
+        table = pa.ipc.open_stream(encode_arrow(result)).read_all()
+        assert table.column_names == result["columns"]
+        assert table.num_rows == 2000
+        assert table.column("produced_qty").to_pylist() == result["data"][2]
+        assert json.loads(table.schema.metadata[b"meta"])["row_count"] == 2000
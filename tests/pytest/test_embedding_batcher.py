@@ -0,0 +1,95 @@
+"""
+임베딩 마이크로 배칭 테스트 (가짜 임베딩 서버, API 호출 없음)
+- 동시 요청을 모아 업스트림 호출 수를 줄이는지, 벡터가 호출자별로 맞게 돌아가는지
+- 같은 부하에서 배칭 없이 보낼 때보다 처리량이 높은지
+- 업스트림 오류가 배치를 기다리던 호출자 모두에게 전달되는지
+
+실행: pytest tests/pytest/test_embedding_batcher.py -v
+"""
+import asyncio
+import time
+
+from t2sql.services.rag.embedding_batcher import EmbeddingBatcher
+
+
+class _FakeServer:
+    """호출마다 latency 지연, 동시 처리 max_connections개 (레이트 리밋 흉내)"""
+
+    def __init__(self, latency: float = 0.02, max_connections: int = 8, fail: bool = False):
+        self.latency = latency
+        self.max_connections = max_connections
+        self.fail = fail
+        self.calls = []
+
+    async def __call__(self, texts):
+        async with self._slots:
+            self.calls.append(list(texts))
+            await asyncio.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError("upstream 429")
+        return [[float(len(t)), float(i)] for i, t in enumerate(texts)]
+
+    async def run(self, embed, questions):
+        self._slots = asyncio.Semaphore(self.max_connections)
+        start = time.perf_counter()
+        vectors = await asyncio.gather(*(embed([q]) for q in questions), return_exceptions=True)
+        return vectors, time.perf_counter() - start
+
+
+class TestEmbeddingBatcher:
+    """EmbeddingBatcher 테스트"""
+
+    def test_coalesces_concurrent_requests(self):
+        server = _FakeServer()
+        batcher = EmbeddingBatcher(server, max_batch=64, max_wait_ms=5)
+        questions = [f"질문 {i}" for i in range(150)]
+
+        vectors, _ = asyncio.run(server.run(batcher.embed, questions))
+
+        assert len(server.calls) == 3
+        assert max(len(c) for c in server.calls) == 64
+        # 각 호출자는 자기 텍스트의 벡터를 받음
+        for q, vec in zip(questions, vectors):
+            call = next(c for c in server.calls if q in c)
+            assert vec == [[float(len(q)), float(call.index(q))]]
+        stats = batcher.stats()
+        assert stats["requests"] == 150 and stats["upstream_calls"] == 3
+
+    def test_higher_throughput_than_direct(self):
+        questions = [f"질문 {i}" for i in range(128)]
+        direct = _FakeServer()
+        _, direct_elapsed = asyncio.run(direct.run(direct, questions))
+        batched = _FakeServer()
+        _, batched_elapsed = asyncio.run(batched.run(EmbeddingBatcher(batched).embed, questions))
+
+        assert len(direct.calls) == 128
+        assert len(batched.calls) <= 2
+        # direct: 128회 / 동시 8 * 20ms ~= 320ms, batched: 5ms 대기 + 20ms 2회 병렬
+        assert batched_elapsed < direct_elapsed / 3
+
+    def test_duplicate_texts_sent_once(self):
+        server = _FakeServer()
+        batcher = EmbeddingBatcher(server, max_wait_ms=5)
+
+        vectors, _ = asyncio.run(server.run(batcher.embed, ["같은 질문"] * 10 + ["다른 질문"]))
+
+        assert server.calls == [["같은 질문", "다른 질문"]]
+        assert all(v == vectors[0] for v in vectors[:10])
+
+    def test_upstream_error_reaches_every_caller(self):
+        server = _FakeServer(fail=True)
+        batcher = EmbeddingBatcher(server, max_wait_ms=5)
+
+        results, _ = asyncio.run(server.run(batcher.embed, [f"질문 {i}" for i in range(5)]))
+
+        assert len(server.calls) == 1
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    def test_survives_new_event_loop(self):
+        server = _FakeServer()
+        batcher = EmbeddingBatcher(server, max_wait_ms=1)
+
+        asyncio.run(server.run(batcher.embed, ["첫 루프"]))
+        vectors, _ = asyncio.run(server.run(batcher.embed, ["두 번째 루프"]))
+
+        assert vectors == [[[float(len("두 번째 루프")), 0.0]]]
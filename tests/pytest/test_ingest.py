@@ -0,0 +1,97 @@
+"""
+임베딩 증분 적재 계획 테스트 (DB/API 호출 없음)
+- 바뀐 문서만 임베딩 대상이 되는지 (content_hash)
+- 임베딩을 배치 크기 단위로 묶어 호출하는지
+- 카탈로그 + DOCS로 table/column/value 문서를 만드는지
+
+실행: pytest tests/pytest/test_ingest.py -v
+"""
+from t2sql.scripts.embedding.ingest import (
+    IngestTarget,
+    content_hash,
+    embed_in_batches,
+    plan_ingest,
+)
+from t2sql.scripts.embedding.schema_docs import CATALOG_TABLES, CatalogColumn, build_schema_docs
+from t2sql.services.rag.embedding_cache import EmbeddingCache
+from t2sql.services.rag.schema_catalog import DOCS
+
+TARGET = IngestTarget(table="schema_embeddings", columns=("table_name", "content"), text_column="content")
+
+
+def _docs(n):
+    return [{"table_name": f"t{i}", "content": f"[TABLE] t{i}"} for i in range(n)]
+
+
+class TestIngestPlan:
+    """plan_ingest / embed_in_batches 테스트"""
+
+    def test_only_new_or_changed_docs_are_embedded(self):
+        docs = _docs(1000)
+        existing = {content_hash("m", TARGET, d) for d in docs}
+        docs[10] = {**docs[10], "content": "[TABLE] t10 (설명 변경)"}
+        docs.append({"table_name": "t_new", "content": "[TABLE] t_new"})
+
+        plan = plan_ingest("m", TARGET, docs, existing)
+
+        assert [d["table_name"] for d in plan.new_docs] == ["t10", "t_new"]
+        assert len(plan.hashes) == 1001
+        assert content_hash("m", TARGET, docs[10]) not in existing
+
+    def test_duplicates_and_model_change(self):
+        docs = _docs(3) + _docs(3)
+        existing = {content_hash("m", TARGET, d) for d in docs}
+
+        assert plan_ingest("m", TARGET, docs, existing).new_docs == []
+        # 모델이 바뀌면 전부 다시 임베딩 (중복은 한 번만)
+        assert len(plan_ingest("other", TARGET, docs, existing).new_docs) == 3
+
+    def test_embeds_in_batches(self):
+        calls = []
+
+        def embed(texts):
+            calls.append(len(texts))
+            return [[float(len(t)), 1.0] for t in texts]
+
+        texts = [d["content"] for d in _docs(600)]
+        vectors = embed_in_batches("m", texts, embed, batch_size=256, cache=EmbeddingCache(persistent=False))
+
+        assert calls == [256, 256, 88]
+        assert vectors[599] == [float(len(texts[599])), 1.0]
+
+
+class TestSchemaDocs:
+    """build_schema_docs 테스트 (카탈로그/값 목록은 DB에서 읽은 것으로 가정)"""
+
+    CATALOG = {
+        "fact_order_daily": [
+            CatalogColumn("fact_order_daily", "day", "date", True, True),
+            CatalogColumn("fact_order_daily", "process", "text", True, True),
+            CatalogColumn("fact_order_daily", "order_status", "text", True, True),
+            CatalogColumn("fact_order_daily", "ordered_qty", "integer", True),
+        ],
+        "fact_shipments": [CatalogColumn("fact_shipments", "qty", "integer", comment="출고 수량")],
+    }
+    VALUES = {("fact_order_daily", "order_status"): ["출고 대기", "출고 완료"]}
+
+    def test_splits_tables_into_column_and_value_docs(self):
+        docs = {(d["doc_type"], d["table_name"], d["column_name"]): d["content"]
+                for d in build_schema_docs(self.CATALOG, self.VALUES, DOCS, {"fact_shipments": "출고 내역"})}
+
+        table = docs[("table", "fact_order_daily", None)]
+        assert "컬럼: day, process, order_status, ordered_qty" in table
+        assert "- ordered_qty" not in table
+        assert "설명: '출고 대기'|'출고 완료'" in docs[("column", "fact_order_daily", "order_status")]
+        assert "설명" not in docs[("column", "fact_order_daily", "day")]
+        value = docs[("value", "fact_order_daily", "order_status")]
+        assert "값: '출고 대기', '출고 완료'" in value and "미출고 수요" in value
+        # DOCS에 없는 테이블은 카탈로그 주석으로
+        assert "설명: 출고 내역" in docs[("table", "fact_shipments", None)]
+        assert "설명: 출고 수량" in docs[("column", "fact_shipments", "qty")]
+        # 카탈로그에 없는 DOCS 테이블은 그대로
+        assert ("table", "dim_process", None) in docs
+
+    def test_admin_only_tables_are_not_read_from_catalog(self):
+        """dim_worker(작업자 이름)는 컬럼/값 문서를 만들지 않음 (공용 임베딩/프롬프트로 나가지 않도록)"""
+        assert "dim_worker" not in CATALOG_TABLES
+        assert "fact_order_daily" in CATALOG_TABLES
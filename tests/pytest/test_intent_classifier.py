@@ -0,0 +1,138 @@
+"""
+단계별 의도 분류기 단위 테스트 (LLM 호출 없음)
+- 규칙 단계: 인사 / 스키마 식별자 / 스키마 용어 + 컬럼을 가리키는 말
+- n-gram 단계: held-out으로 보정한 확신도 이상일 때만 결정, 애매하면(도메인 밖 포함) LLM으로
+- centroid 단계: 질문 임베딩 재사용, 임베딩 실패 시 LLM으로
+- 단계별 카운터
+
+실행: pytest tests/pytest/test_intent_classifier.py -v
+"""
+import asyncio
+
+import pytest
+
+from t2sql.services.rag.schema_catalog import DOCS
+from t2sql.services.llm.intent_classifier import (
+    EXAMPLES,
+    HELD_OUT,
+    CentroidIntentClassifier,
+    TieredIntentClassifier,
+    schema_terms,
+    training_examples,
+)
+
+
+@pytest.fixture
+def classifier():
+    return TieredIntentClassifier(training_examples(), schema_terms(DOCS))
+
+
+class TestTieredIntentClassifier:
+    """TieredIntentClassifier 테스트"""
+
+    def test_schema_terms_from_docs(self):
+        """DOCS에서 테이블/컬럼/한국어 용어 추출"""
+        terms = schema_terms(DOCS)
+        assert {"fact_production_daily", "produced_qty", "생산", "주문", "작업자"} <= terms
+
+    @pytest.mark.parametrize("message", ["안녕", "안녕하세요!", "하이~", "반가워요"])
+    def test_greeting_rule(self, classifier, message):
+        decision = classifier.classify_local(message)
+        assert (decision.intent, decision.tier) == ("greeting", "rule")
+
+    @pytest.mark.parametrize("message", ["이번 달 생산량 알려줘", "최근 주문 현황", "dim_worker 보여줘"])
+    def test_schema_term_rule(self, classifier, message):
+        decision = classifier.classify_local(message)
+        assert (decision.intent, decision.tier) == ("data_query", "rule")
+
+    @pytest.mark.parametrize(
+        "message", ["커피 한잔 주문하고 싶어", "특별한 주문 있어?", "생산적인 하루 보내", "피자 주문 몇 시까지 돼?"]
+    )
+    def test_schema_term_without_measure_is_not_rule(self, classifier, message):
+        """일상 문장의 "주문"/"생산"만으로는 data_query로 확정하지 않음"""
+        decision = classifier.classify_local(message)
+        assert decision is None or decision.tier != "rule"
+
+    def test_identifier_needs_word_boundary(self, classifier):
+        """영문 컬럼명 'day'가 'today'에 걸리지 않음"""
+        decision = classifier.classify_local("happy birthday today")
+        assert decision is None or decision.tier != "rule"
+
+    @pytest.mark.parametrize("message", ["아이폰 가격 얼마야?", "뭐 하고 있어?", "B 라인 어때?"])
+    def test_out_of_domain_not_decided_locally(self, classifier, message):
+        """학습 예시와 글자만 비슷한 질문은 n-gram이 확신하지 않고 다음 단계로"""
+        assert classifier.classify_local(message) is None
+
+    def test_threshold_calibrated_on_held_out(self, classifier):
+        """held-out에서 틀리는 예측은 모두 임계값 아래"""
+        for label, texts in HELD_OUT.items():
+            for text in texts:
+                predicted, prob = classifier.model.predict(text)
+                assert predicted == label or prob < classifier.threshold
+
+    def test_ngram_off_topic(self, classifier):
+        decision = classifier.classify_local("맛집 추천해줘")
+        assert (decision.intent, decision.tier) == ("off_topic", "ngram")
+
+    def test_ambiguous_escalates_to_llm(self, classifier):
+        """로컬에서 확신하지 못하면 LLM 호출, 카운터 기록"""
+        calls = []
+
+        def fake_llm(message):
+            calls.append(message)
+            return "data_query"
+
+        decision = classifier.classify("지난달 대비 증가율", fake_llm)
+        classifier.classify("안녕", fake_llm)
+        assert (decision.intent, decision.tier) == ("data_query", "llm")
+        assert calls == ["지난달 대비 증가율"]
+        stats = classifier.stats()
+        assert stats["llm"]["hits"] == 1 and stats["rule"]["hits"] == 1
+        assert stats["rule"]["hit_rate"] == 0.5
+
+
+class TestCentroidIntentClassifier:
+    """CentroidIntentClassifier 테스트"""
+
+    CENTROIDS = {"greeting": [1.0, 0.0, 0.0], "data_query": [0.0, 1.0, 0.0], "off_topic": [0.0, 0.0, 1.0]}
+
+    def test_decides_when_margin_is_large(self):
+        centroids = CentroidIntentClassifier(self.CENTROIDS, margin=0.1)
+        decision = centroids.decide([0.1, 0.9, 0.2])
+        assert (decision.intent, decision.tier) == ("data_query", "centroid")
+
+    def test_abstains_when_close(self):
+        centroids = CentroidIntentClassifier(self.CENTROIDS, margin=0.1)
+        assert centroids.decide([0.5, 0.52, 0.0]) is None
+
+    def test_tiered_uses_shared_vector_before_llm(self):
+        """로컬 단계가 애매하면 RAG용 벡터로 centroid 판단, LLM 호출 없음"""
+        classifier = TieredIntentClassifier(
+            EXAMPLES, schema_terms(DOCS), centroids=CentroidIntentClassifier(self.CENTROIDS)
+        )
+
+        def fail_llm(message):
+            raise AssertionError("LLM should not be called")
+
+        decision = classifier.classify("지난달 대비 증가율", fail_llm, lambda: [0.0, 1.0, 0.1])
+        assert (decision.intent, decision.tier) == ("data_query", "centroid")
+
+    def test_embedding_failure_falls_through_to_llm(self):
+        """질문 임베딩이 실패해도 예외 없이 LLM 단계로"""
+        classifier = TieredIntentClassifier(
+            EXAMPLES, schema_terms(DOCS), centroids=CentroidIntentClassifier(self.CENTROIDS)
+        )
+
+        def broken_vector():
+            raise TimeoutError("embeddings timed out")
+
+        async def broken_vector_async():
+            raise TimeoutError("embeddings timed out")
+
+        async def llm_async(message):
+            return "off_topic"
+
+        decision = classifier.classify("지난달 대비 증가율", lambda m: "data_query", broken_vector)
+        assert (decision.intent, decision.tier) == ("data_query", "llm")
+        decision = asyncio.run(classifier.classify_async("지난달 대비 증가율", llm_async, broken_vector_async))
+        assert (decision.intent, decision.tier) == ("off_topic", "llm")
@@ -0,0 +1,126 @@
+"""
+In-process 벡터 인덱스 테스트
+- 로컬 top-k 계산이 코사인 거리 정의와 일치하는지
+- DB(pgvector) 검색 결과와 동일한지 (parity, integration: DB에 못 붙으면 skip)
+
+실행: pytest tests/pytest/test_local_index.py -v
+"""
+import math
+import random
+
+import pytest
+
+from t2sql.services.rag.local_index import LocalVectorIndex
+
+
+def _cosine_distance(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    na = math.sqrt(sum(x * x for x in a))
+    nb = math.sqrt(sum(y * y for y in b))
+    return 1.0 - dot / (na * nb)
+
+
+class TestLocalTopK:
+    """DB 없이 로컬 top-k 정합성 확인"""
+
+    @pytest.fixture
+    def index_and_rows(self):
+        rng = random.Random(7)
+        schema = [
+            ("table", f"t{i}", None, f"doc {i}", [rng.uniform(-1, 1) for _ in range(16)])
+            for i in range(20)
+        ]
+        fewshots = [
+            (f"q{i}", f"SELECT {i}", [rng.uniform(-1, 1) for _ in range(16)])
+            for i in range(10)
+        ]
+        return LocalVectorIndex.from_rows(schema, fewshots), schema, fewshots
+
+    def test_schema_top_k_matches_bruteforce(self, index_and_rows):
+        index, schema, _ = index_and_rows
+        query = [random.Random(1).uniform(-1, 1) for _ in range(16)]
+
+        expected = sorted(schema, key=lambda r: _cosine_distance(r[4], query))[:8]
+        got = index.search_schema(query, k=8)
+
+        assert [r[1] for r in got] == [r[1] for r in expected]
+        for row, exp_row in zip(got, expected):
+            assert row[4] == pytest.approx(_cosine_distance(exp_row[4], query), abs=1e-6)
+
+    def test_fewshot_k_larger_than_rows(self, index_and_rows):
+        index, _, fewshots = index_and_rows
+        got = index.search_fewshots(fewshots[3][2], k=50)
+        assert len(got) == len(fewshots)
+        # 자기 자신이 가장 가까움
+        assert got[0][0] == "q3"
+        assert got[0][2] == pytest.approx(0.0, abs=1e-6)
+
+    def test_schema_two_stage(self):
+        """테이블 top-k_tables -> 그 테이블의 컬럼/값 문서만, 테이블 문서가 앞"""
+        rows = [
+            ("table", "orders", None, "orders", [1.0, 0.0, 0.0]),
+            ("table", "workers", None, "workers", [0.0, 1.0, 0.0]),
+            ("column", "orders", "status", "orders.status", [0.9, 0.0, 0.1]),
+            ("value", "orders", "status", "'출고 대기'", [0.8, 0.0, 0.2]),
+            # 질문과 가장 가깝지만 선택되지 않은 테이블의 컬럼
+            ("column", "workers", "name", "workers.name", [1.0, 0.0, 0.0]),
+        ]
+        index = LocalVectorIndex.from_rows(rows, [])
+
+        got = index.search_schema([1.0, 0.0, 0.0], k=3, k_tables=1)
+
+        assert [r[:3] for r in got] == [
+            ("table", "orders", None),
+            ("column", "orders", "status"),
+            ("value", "orders", "status"),
+        ]
+
+
+@pytest.mark.integration
+class TestLocalIndexParity:
+    """DB 검색(search_schema/search_fewshots)과 로컬 인덱스 결과 비교"""
+
+    @pytest.fixture(scope="class")
+    def db_available(self):
+        """짧은 타임아웃으로 DB/임베딩 테이블 확인 (풀 기본 대기 30초 동안 붙잡히지 않도록)"""
+        import psycopg
+        from t2sql.db.vector_pool import get_vector_db_url
+        try:
+            with psycopg.connect(get_vector_db_url(), connect_timeout=2) as conn:
+                found = conn.execute("SELECT to_regclass('fewshot_embeddings') IS NOT NULL").fetchone()[0]
+        except (RuntimeError, psycopg.Error) as e:
+            pytest.skip(f"DB 연결 불가: {e}")
+        if not found:
+            pytest.skip("fewshot_embeddings 테이블 없음 (alembic upgrade head 후 embed_fewshot 실행)")
+
+    @pytest.fixture(scope="class")
+    def index(self, db_available):
+        index = LocalVectorIndex()
+        index.refresh()
+        return index
+
+    @pytest.fixture(scope="class")
+    def query_vectors(self, db_available):
+        """저장된 few-shot 임베딩을 질의 벡터로 재사용 (임베딩 API 호출 없음)"""
+        from t2sql.db.vector_pool import get_vector_pool
+        with get_vector_pool().connection() as conn:
+            rows = conn.execute("SELECT embedding::real[] FROM fewshot_embeddings").fetchall()
+        return [list(r[0]) for r in rows]
+
+    def test_schema_parity(self, index, query_vectors):
+        from t2sql.services.rag.vector_search import SCHEMA_K_TABLES, search_schema
+        for qvec in query_vectors:
+            db_rows = search_schema("", k=8, qvec=qvec)
+            local_rows = index.search_schema(qvec, k=8, k_tables=SCHEMA_K_TABLES)
+            assert [r[:4] for r in local_rows] == [r[:4] for r in db_rows]
+            for a, b in zip(local_rows, db_rows):
+                assert a[4] == pytest.approx(b[4], abs=1e-6)
+
+    def test_fewshot_parity(self, index, query_vectors):
+        from t2sql.services.rag.vector_search import search_fewshots
+        for qvec in query_vectors:
+            db_rows = search_fewshots("", k=3, qvec=qvec)
+            local_rows = index.search_fewshots(qvec, k=3)
+            assert [r[:2] for r in local_rows] == [r[:2] for r in db_rows]
+            for a, b in zip(local_rows, db_rows):
+                assert a[2] == pytest.approx(b[2], abs=1e-6)
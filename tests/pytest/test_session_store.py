@@ -0,0 +1,204 @@
+"""
+채팅 세션 저장소 단위 테스트 (DB 호출 없음)
+- 세션 수 LRU / TTL 만료
+- 세션당 턴 수 / 토큰 상한
+- Postgres 저장소: DB 오류 시 일정 시간만 메모리로 처리 후 다시 Postgres
+- 프롬프트용 기록 압축 (최근 턴 원문 + 캐시된 롤링 요약, 긴 턴에서도 요약은 refresh_turns마다)
+
+실행: pytest tests/pytest/test_session_store.py -v
+"""
+from contextlib import contextmanager
+
+import pytest
+
+from t2sql.services.llm import session_store
+from t2sql.services.llm.history import HistoryCompactor
+from t2sql.services.llm.session_store import (
+    MemorySessionStore,
+    PostgresSessionStore,
+    SessionStore,
+    message_tokens,
+    trim_history,
+)
+
+
+def _turn(i: int, text: str = "안녕하세요") -> list:
+    return [{"role": "user", "content": f"{i} {text}"}, {"role": "assistant", "content": f"{i} 응답"}]
+
+
+class TestMemorySessionStore:
+    """프로세스 내 세션 저장소 테스트"""
+
+    def test_append_and_get(self):
+        store = MemorySessionStore()
+        store.append("s1", _turn(1))
+        store.append("s1", _turn(2))
+        assert [m["content"] for m in store.get("s1")] == ["1 안녕하세요", "1 응답", "2 안녕하세요", "2 응답"]
+        assert store.get("other") == []
+
+    def test_lru_bounds_session_count(self):
+        store = MemorySessionStore(max_sessions=2)
+        store.append("a", _turn(1))
+        store.append("b", _turn(1))
+        store.get("a")  # a를 최근 사용으로
+        store.append("c", _turn(1))
+
+        assert store.get("b") == []
+        assert store.get("a") != []
+        stats = store.stats()
+        assert stats["sessions"] == 2
+        assert stats["evicted"] == 1
+
+    def test_ttl_expiry(self):
+        store = MemorySessionStore(ttl_seconds=0)
+        store.append("a", _turn(1))
+        assert store.get("a") == []
+        assert store.stats()["sessions"] == 0
+
+    def test_turn_cap_keeps_latest(self):
+        store = MemorySessionStore(max_turns=2)
+        for i in range(5):
+            history = store.append("a", _turn(i))
+        assert [m["content"] for m in history] == ["3 안녕하세요", "3 응답", "4 안녕하세요", "4 응답"]
+
+    def test_token_cap_drops_whole_turns(self):
+        history = _turn(1, "가" * 100) + _turn(2)
+        kept = trim_history(history, max_turns=10, max_tokens=message_tokens(_turn(2)))
+        assert kept == _turn(2)
+
+
+class _FakeSummarizer:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, previous, messages):
+        self.calls.append((previous, len(messages) // 2))
+        return f"{previous}+{len(messages) // 2}턴"
+
+
+class _FlakyPool:
+    """down이면 connection()이 실패, 아니면 chat_sessions 조회 결과로 rows를 돌려줌"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.down = False
+        self.calls = 0
+        self.timeouts = []
+
+    @contextmanager
+    def connection(self, timeout=None):
+        self.calls += 1
+        self.timeouts.append(timeout)
+        if self.down:
+            raise OSError("connection refused")
+        yield self
+
+    def execute(self, query, params=None):
+        return self
+
+    def fetchone(self):
+        return (self.rows,)
+
+
+class TestSessionStoreInterface:
+    """세션 저장소 인터페이스 테스트"""
+
+    def test_base_is_abstract(self):
+        with pytest.raises(TypeError):
+            SessionStore()
+
+
+class TestPostgresSessionStoreFallback:
+    """Postgres 세션 저장소 장애 대응 테스트"""
+
+    def test_transient_error_falls_back_then_retries(self, monkeypatch):
+        pool = _FlakyPool(_turn(1))
+        monkeypatch.setattr(session_store, "get_vector_pool", lambda: pool)
+        store = PostgresSessionStore(retry_seconds=60, db_timeout=0.5)
+
+        pool.down = True
+        assert store.get("s") == []  # 실패한 호출은 메모리로
+        pool.down = False
+        store.append("s", _turn(2))  # 쿨다운 중에는 DB를 건드리지 않음
+        assert pool.calls == 1
+        assert store.stats()["backend"] == "memory (postgres failed)"
+
+        store._retry_at = 0.0  # 쿨다운 만료
+        assert store.get("s") == _turn(1)
+        assert pool.calls == 2
+        assert pool.timeouts == [0.5, 0.5]  # 풀 기본 대기(30초) 대신 짧게
+        stats = store.stats()
+        assert stats["backend"] == "postgres" and stats["failures"] == 1
+
+
+class TestHistoryCompactor:
+    """대화 기록 압축 테스트"""
+
+    def _history(self, n: int) -> list:
+        return [m for i in range(n) for m in _turn(i)]
+
+    def test_short_history_sent_verbatim(self):
+        summarize = _FakeSummarizer()
+        compact = HistoryCompactor(keep_turns=4).compact("s", self._history(3), summarize)
+        assert compact.messages == self._history(3)
+        assert compact.stats["summary"] == "none"
+        assert summarize.calls == []
+
+    def test_older_turns_folded_and_summary_reused(self):
+        compactor = HistoryCompactor(keep_turns=2, refresh_turns=2, budget_tokens=10_000)
+        summarize = _FakeSummarizer()
+
+        first = compactor.compact("s", self._history(4), summarize)
+        assert first.stats["summary"] == "refreshed"
+        assert first.messages[0]["role"] == "system"
+        assert first.messages[1:] == self._history(4)[-4:]
+
+        # 한 턴 추가: 접을 턴이 refresh_turns 미만이므로 요약 재사용 + 그 턴은 원문
+        second = compactor.compact("s", self._history(5), summarize)
+        assert second.stats["summary"] == "cached"
+        assert second.stats["turns_verbatim"] == 3
+        assert len(summarize.calls) == 1
+
+        # 두 턴 더 쌓이면 이전 요약 + 새 턴만으로 다시 요약
+        compactor.compact("s", self._history(6), summarize)
+        assert summarize.calls[-1] == ("+2턴", 2)
+
+    def test_per_request_budget(self):
+        compactor = HistoryCompactor(keep_turns=10, budget_tokens=10_000)
+        history = self._history(6)
+        compact = compactor.compact("s", history, _FakeSummarizer(), keep_turns=10, budget_tokens=message_tokens(_turn(0)))
+        assert compact.messages == history[-2:]
+        assert compact.stats["history_tokens"] <= compact.stats["history_budget"]
+
+    def test_summary_dropped_when_its_turns_are_gone(self):
+        compactor = HistoryCompactor(keep_turns=2, refresh_turns=2, budget_tokens=10_000)
+        compactor.compact("s", self._history(4), _FakeSummarizer())
+
+        # 세션 만료 후 같은 session_id로 새 대화: 이전 요약이 붙으면 안 됨
+        fresh = _turn(0, "새 대화")
+        compact = compactor.compact("s", fresh, _FakeSummarizer())
+        assert compact.messages == fresh
+        assert compact.stats["summary"] == "none"
+        assert compactor.stats()["summary_dropped"] == 1
+        assert compactor.stats()["sessions"] == 0
+
+    def test_long_turns_do_not_resummarize_every_request(self):
+        """최근 턴만으로 예산을 넘어도 요약은 refresh_turns개가 쌓일 때만 (기본값, 턴당 ~500토큰)"""
+        compactor = HistoryCompactor()
+        summarize = _FakeSummarizer()
+        history = []
+        for i in range(20):
+            history += [{"role": "user", "content": f"{i} " + "가" * 250}, {"role": "assistant", "content": "나" * 250}]
+            compactor.compact("s", history, summarize)
+        assert [n for _, n in summarize.calls] == [4, 4, 4, 4]
+
+    def test_repeated_identical_turns_keep_cut_point(self):
+        """같은 내용의 턴이 반복돼도 이미 접은 턴을 다시 접지 않음"""
+        compactor = HistoryCompactor(keep_turns=2, refresh_turns=2, budget_tokens=10_000)
+        summarize = _FakeSummarizer()
+        same = _turn(0)
+
+        compactor.compact("s", same * 4, summarize)
+        assert compactor.compact("s", same * 5, summarize).stats["summary"] == "cached"
+        compactor.compact("s", same * 6, summarize)
+        assert summarize.calls == [("", 2), ("+2턴", 2)]
@@ -0,0 +1,53 @@
+"""
+SQL 생성 프롬프트 구성 단위 테스트 (LLM 호출 없음)
+- 고정 규칙(system)은 날짜/질문/검색 결과와 무관하게 항상 같은 문자열 (prefix 캐시 적중)
+- 고정부가 provider 캐시 최소 길이(1024토큰) 이상
+- 날짜 블록 / few-shot 치환은 날짜별 메모
+- cached_tokens 비율 집계
+
+실행: pytest tests/pytest/test_sql_prompt.py -v
+"""
+from datetime import date
+from types import SimpleNamespace
+
+from t2sql.services.llm.llm_client import PromptCacheStats, SQL_SYSTEM_PROMPT, build_sql_messages
+from t2sql.services.llm.session_store import estimate_tokens
+
+FEWSHOT = ("1월 전체 생산량 합계는?", "SELECT 1 WHERE day >= DATE '{BASE_YEAR}-{BASE_MONTH}-01'", 0.1)
+SCHEMA = ("table", "fact_production_daily", None, "[TABLE] fact_production_daily", 0.2)
+
+
+class TestSqlPrompt:
+    """프롬프트 구성 테스트"""
+
+    def test_static_prefix_is_stable(self):
+        a = build_sql_messages("3월 생산량", [SCHEMA], [FEWSHOT], today=date(2026, 3, 18))
+        b = build_sql_messages("공정별 주문량", [], [], today=date(2026, 12, 31))
+
+        assert a[0] == b[0] == {"role": "system", "content": SQL_SYSTEM_PROMPT}
+        assert "2026" not in SQL_SYSTEM_PROMPT
+
+    def test_static_prefix_is_cacheable(self):
+        """prompt caching은 1024토큰 이상 prefix에만 적용"""
+        assert estimate_tokens(SQL_SYSTEM_PROMPT) >= 1024
+        assert "[TABLE] dim_worker" not in SQL_SYSTEM_PROMPT
+
+    def test_static_prefix_has_no_placeholders(self):
+        """고정부 예제 SQL은 예시 날짜로 치환 (모델이 {BASE_YEAR}를 그대로 따라 쓰지 않도록)"""
+        assert "{BASE_" not in SQL_SYSTEM_PROMPT
+        assert "2000-01-01" in SQL_SYSTEM_PROMPT
+
+    def test_volatile_parts_follow_prefix(self):
+        messages = build_sql_messages("3월 생산량", [SCHEMA], [FEWSHOT], today=date(2026, 12, 5))
+        user = messages[1]["content"]
+
+        assert user.startswith("날짜 기준:\n- 오늘 날짜: 2026-12-05")
+        assert "day < '2027-01-01'" in user
+        assert "DATE '2026-12-01'" in user
+        assert user.index("참고할 유사 예제") < user.index("스키마 컨텍스트") < user.index("질문: 3월 생산량")
+
+    def test_cached_ratio(self):
+        stats = PromptCacheStats()
+        stats.record(SimpleNamespace(prompt_tokens=2000, prompt_tokens_details=SimpleNamespace(cached_tokens=1536)))
+        stats.record(SimpleNamespace(prompt_tokens=2000, prompt_tokens_details=None))
+        assert stats.stats()["cached_ratio"] == 0.384
@@ -0,0 +1,65 @@
+"""
+few-shot 템플릿 SQL 생성 단위 테스트 (DB/LLM 호출 없음)
+- FEWSHOTS 질문은 템플릿이 같은 SQL을 만든다
+- 슬롯 추출 (기간, 공정, 출고 상태)
+- 모르는 단어 / 충돌하는 기간이면 LLM으로 넘김
+
+실행: pytest tests/pytest/test_sql_templates.py -v
+"""
+from datetime import date
+
+import pytest
+
+from t2sql.services.query.sql_templates import TemplateSqlGenerator, extract_slots, match_template
+from t2sql.services.query.sql_validator import validate_sql
+from t2sql.services.rag.fewshot_catalog import FEWSHOTS
+
+TODAY = date(2026, 3, 18)
+
+
+class TestSqlTemplates:
+    """템플릿 매칭 테스트"""
+
+    @pytest.mark.parametrize("fewshot", FEWSHOTS, ids=lambda fs: fs["question"][:20])
+    def test_fewshot_questions_render_fewshot_sql(self, fewshot):
+        expected = fewshot["sql"].replace("{BASE_YEAR}", "2026").replace("{BASE_MONTH}", "03")
+
+        match = match_template(fewshot["question"], TODAY)
+
+        assert match is not None
+        assert match.confidence == 1.0
+        assert validate_sql(match.sql).sql == validate_sql(expected).sql
+
+    def test_extracts_slots(self):
+        slots = extract_slots("작년 2월 10일~12일 C공정 미출고 주문량", TODAY)
+        assert (slots.start, slots.end) == (date(2025, 2, 10), date(2025, 2, 13))
+        assert slots.process == "C"
+        assert slots.status == "출고 대기"
+        assert not slots.conflict
+
+    @pytest.mark.parametrize("question", [
+        "3월 공정별 평균 생산량",     # 평균: 템플릿이 모르는 집계
+        "생산량이 가장 많은 공정은?",  # 순위
+        "작업자 수는 몇 명이야?",      # 측정값 없음
+        "3월 10일부터 생산량",         # 끝이 없는 기간 (10일 하루가 아님)
+        "3월 20일까지 생산량",
+    ])
+    def test_unknown_words_fall_back(self, question):
+        generator = TemplateSqlGenerator(threshold=0.9)
+        assert generator.generate(question, TODAY) is None
+        assert generator.stats()["fallbacks"] == 1
+
+    @pytest.mark.parametrize("question", ["1월과 2월 생산량", "2월 30일 생산량", "3월 7일~5일 생산량", "13월 생산량"])
+    def test_conflicting_or_invalid_period_has_no_match(self, question):
+        assert match_template(question, TODAY) is None
+
+    @pytest.mark.parametrize("question, period", [
+        ("2025년 12월 ~ 2월 생산량", (date(2025, 12, 1), date(2026, 3, 1))),
+        ("2025년 12월 30일 ~ 1월 2일 생산량", (date(2025, 12, 30), date(2026, 1, 3))),
+    ])
+    def test_cross_year_range_rolls_end_year(self, question, period):
+        slots = extract_slots(question, TODAY)
+        assert (slots.start, slots.end) == period
+        assert not slots.conflict
+        match = match_template(question, TODAY)
+        assert match is not None and match.confidence == 1.0
@@ -0,0 +1,263 @@
+"""
+SQL 검증기 단위 테스트 (DB/LLM 호출 없음)
+- SELECT/테이블 화이트리스트, 데이터 변경 CTE / 여러 문장 거절
+- FORCE_LIMIT 주입/축소
+- 검증 결과 캐시 + 쿼리당 검증 비용 예산
+- EXPLAIN 기반 실행 승인 (비용/행 수 한도, timeout)
+- 리터럴 파라미터화 (쿼리 모양)
+
+실행: pytest tests/pytest/test_sql_validator.py -v
+"""
+import asyncio
+import time
+
+import pytest
+
+from t2sql.services.query.shapes import ShapeRegistry, parameterize
+from t2sql.services.query.admission import (
+    Admission,
+    AdmissionCache,
+    QueryRejected,
+    admit_async,
+    decide,
+    get_admission_cache,
+    limits_for,
+    plan_estimates,
+)
+from t2sql.services.query.sql_validator import FORCE_LIMIT, SqlRejected, validate_sql, validation_cache
+
+
+class TestValidateSql:
+    """validate_sql 테스트"""
+
+    def test_rejects_non_select(self):
+        with pytest.raises(SqlRejected):
+            validate_sql("DELETE FROM fact_order_daily")
+
+    @pytest.mark.parametrize("sql", [
+        "WITH d AS (DELETE FROM fact_order_daily RETURNING *) SELECT * FROM d",
+        "SELECT 1; DROP TABLE fact_order_daily",
+    ])
+    def test_rejects_hidden_writes(self, sql):
+        with pytest.raises(SqlRejected):
+            validate_sql(sql)
+
+    def test_keywords_inside_literals_are_not_rejected(self):
+        v = validate_sql("SELECT updated_at FROM fact_order_daily WHERE order_status = 'delete; drop'")
+        assert v.tables == {"fact_order_daily"}
+
+    @pytest.mark.parametrize("sql", [
+        "SELECT SUM(qty) FROM fact_production_daily WHERE day >= '{BASE_YEAR}-{BASE_MONTH}-01'",
+        "SELECT SUM(qty) FROM fact_production_daily WHERE EXTRACT(YEAR FROM day) = {BASE_YEAR}",
+    ])
+    def test_rejects_unresolved_placeholders(self, sql):
+        with pytest.raises(SqlRejected, match="placeholder"):
+            validate_sql(sql)
+
+    def test_array_literal_is_not_placeholder(self):
+        v = validate_sql("SELECT * FROM fact_order_daily WHERE order_qty = ANY('{1,2}')")
+        assert v.tables == {"fact_order_daily"}
+
+    def test_rejects_table_by_role(self):
+        with pytest.raises(SqlRejected):
+            validate_sql("SELECT * FROM dim_worker", role="user")
+        assert validate_sql("SELECT * FROM dim_worker", role="admin").tables == {"dim_worker"}
+
+    def test_injects_limit(self):
+        v = validate_sql("SELECT * FROM fact_order_daily")
+        assert v.sql.endswith(f"LIMIT {FORCE_LIMIT}")
+        assert v.limit_action == "injected"
+
+    def test_keeps_small_limit(self):
+        v = validate_sql("SELECT * FROM fact_order_daily LIMIT 10")
+        assert v.sql.endswith("LIMIT 10")
+        assert v.limit_action is None
+
+    @pytest.mark.parametrize("clause", ["LIMIT 100000", "LIMIT ALL", "LIMIT 1 + 1"])
+    def test_clamps_limit(self, clause):
+        v = validate_sql(f"SELECT * FROM fact_order_daily {clause} OFFSET 5")
+        assert f"LIMIT {FORCE_LIMIT} OFFSET 5" in v.sql
+        assert v.limit_action == "clamped"
+
+    def test_limit_applies_to_outer_query_of_cte(self):
+        v = validate_sql("WITH o AS (SELECT process FROM fact_order_daily LIMIT 5) SELECT * FROM o")
+        assert "LIMIT 5)" in v.sql
+        assert v.sql.endswith(f"LIMIT {FORCE_LIMIT}")
+        assert v.tables == {"fact_order_daily"}
+
+
+def _plan(cost, rows, child_rows):
+    return [{"Plan": {"Node Type": "Limit", "Total Cost": cost, "Plan Rows": rows,
+                      "Plans": [{"Node Type": "Nested Loop", "Total Cost": cost, "Plan Rows": child_rows}]}}]
+
+
+class _FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+
+class _FakeAsyncSession:
+    def __init__(self, plan):
+        self.plan = plan
+        self.statements = []
+
+    async def execute(self, stmt, params=None):
+        self.statements.append((str(stmt), params))
+        return _FakeResult(self.plan if str(stmt).startswith("EXPLAIN") else None)
+
+
+class TestAdmission:
+    """EXPLAIN 기반 실행 승인 테스트"""
+
+    @pytest.fixture(autouse=True)
+    def _fresh_cache(self):
+        get_admission_cache().clear()
+        yield
+        get_admission_cache().clear()
+
+    def test_plan_estimates_uses_largest_node(self):
+        assert plan_estimates(_plan(120.5, 2000, 10_000_000)) == (120.5, 10_000_000)
+
+    def test_decide_by_role(self):
+        user, admin = limits_for("user"), limits_for("admin")
+        assert decide(10, 100, user).decision == "admitted"
+        assert decide(user["throttle_cost"] + 1, 100, user).decision == "throttled"
+        assert decide(user["max_cost"] + 1, 100, user).decision == "rejected"
+        assert decide(user["max_cost"] + 1, 100, admin).decision != "rejected"
+
+    def test_admit_sets_timeout_and_rejects(self):
+        session = _FakeAsyncSession(_plan(1e9, 2000, 1e9))
+        meta = {}
+
+        async def run():
+            async with admit_async(session, "SELECT 1", "user", meta):
+                raise AssertionError("rejected query must not run")
+
+        with pytest.raises(QueryRejected):
+            asyncio.run(run())
+        assert "statement_timeout" in session.statements[0][0]
+        assert session.statements[0][1] == {"ms": str(limits_for("user")["timeout_ms"])}
+        assert meta["admission"]["decision"] == "rejected"
+
+    def test_verdict_cached_per_shape_and_role(self):
+        """같은 (모양, role)은 EXPLAIN 없이 캐시된 판단으로 실행"""
+        session = _FakeAsyncSession(_plan(10, 5, 5))
+
+        async def run(role, meta):
+            async with admit_async(session, "SELECT 1 WHERE 1 = :p0", role, meta, {"p0": 1}):
+                pass
+
+        metas = [{}, {}, {}]
+        asyncio.run(run("user", metas[0]))
+        asyncio.run(run("user", metas[1]))
+        asyncio.run(run("admin", metas[2]))
+
+        explains = [stmt for stmt, _ in session.statements if stmt.startswith("EXPLAIN")]
+        assert len(explains) == 2  # user 1회 + admin 1회
+        assert [m["admission"]["cached"] for m in metas] == [False, True, False]
+        assert metas[1]["admission"]["decision"] == "admitted"
+
+    def test_cache_ttl(self):
+        cache = AdmissionCache(ttl_seconds=0)
+        cache.put("SELECT 1", "user", Admission("admitted", 1000))
+        time.sleep(0.001)
+        assert cache.get("SELECT 1", "user") is None
+
+
+class TestParameterize:
+    """리터럴 -> 바인드 파라미터 (같은 모양은 같은 SQL 텍스트)"""
+
+    SQL = (
+        "SELECT SUM(produced_qty) FROM fact_production_daily "
+        "WHERE process = '{p}' AND day >= DATE '{start}' AND day < DATE '{end}'"
+    )
+
+    def test_same_shape_for_different_literals(self):
+        a = parameterize(validate_sql(self.SQL.format(p="C", start="2026-03-01", end="2026-04-01")).sql)
+        b = parameterize(validate_sql(self.SQL.format(p="A", start="2026-01-05", end="2026-01-08")).sql)
+        assert a.sql == b.sql
+        assert "'" not in a.sql
+        assert sorted(a.params.values()) == ["2026-03-01", "2026-04-01", "C"]
+
+    def test_keeps_structural_literals(self):
+        """GROUP/ORDER BY 위치 번호, SELECT 목록, INTERVAL, LIMIT은 그대로"""
+        sql = validate_sql(
+            "SELECT process, ROUND(SUM(produced_qty) * 100.0, 2) FROM fact_production_daily "
+            "WHERE day > CURRENT_DATE - INTERVAL '7 days' GROUP BY 1 HAVING SUM(produced_qty) >= 10 ORDER BY 2"
+        ).sql
+        shape = parameterize(sql)
+        assert shape.params == {"p0": 10}
+        assert "INTERVAL '7 DAYS'" in shape.sql.upper()
+        assert "GROUP BY 1" in shape.sql and "ORDER BY 2" in shape.sql and "100.0" in shape.sql
+        assert "HAVING SUM(produced_qty) >= :p0" in shape.sql
+
+    @pytest.mark.parametrize("sql, kept, params", [
+        (
+            "SELECT SUM(produced_qty) FROM fact_production_daily WHERE TO_CHAR(day, 'YYYY-MM') = '2025-03'",
+            "'YYYY-MM'",
+            {"p0": "2025-03"},
+        ),
+        (
+            "SELECT SUM(produced_qty) FROM fact_production_daily WHERE day >= TO_DATE('202503', 'YYYYMM')",
+            "'202503', 'YYYYMM'",
+            {},
+        ),
+    ])
+    def test_format_strings_stay_literal(self, sql, kept, params):
+        """형식 문자열을 sqlglot 내부 표현('%Y-%m')으로 바인드하지 않음"""
+        shape = parameterize(validate_sql(sql).sql)
+        assert kept in shape.sql
+        assert shape.params == params
+
+    def test_registry_counts_reuse(self):
+        registry = ShapeRegistry(max_shapes=2)
+        for shape in ["A", "A", "B", "A", "C"]:
+            registry.record(shape)
+        stats = registry.stats()
+        assert stats["executions"] == 5
+        assert stats["shapes"] == 2  # LRU로 B가 밀려남
+        assert stats["top"][0] == {"count": 3, "shape": "A"}
+
+
+class TestValidationCost:
+    """검증 결과 캐시 / 쿼리당 검증 비용 (벤치마크)"""
+
+    # 느린 CI에서도 넘지 않을 넉넉한 상한 (로컬 측정: 파싱 포함 ~1ms, 캐시 적중 ~2us)
+    UNCACHED_BUDGET_MS = 20.0
+    CACHED_BUDGET_MS = 0.2
+    SQLS = [
+        "SELECT SUM(produced_qty) FROM fact_production_daily WHERE day >= DATE '2026-03-01' AND day < DATE '2026-04-01'",
+        """WITH o AS (SELECT process, SUM(ordered_qty) AS q FROM fact_order_daily WHERE order_status = '출고 대기' GROUP BY process),
+        p AS (SELECT process, SUM(produced_qty) AS q FROM fact_production_daily GROUP BY process)
+        SELECT o.process, ROUND(COALESCE(p.q, 0) * 100.0 / NULLIF(o.q, 0), 2) FROM o LEFT JOIN p ON p.process = o.process""",
+        "SELECT dp.product, SUM(fp.produced_qty) FROM fact_production_daily AS fp JOIN dim_process AS dp ON fp.process = dp.process GROUP BY dp.product",
+    ]
+
+    def _avg_ms(self, rounds: int, clear: bool) -> float:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            if clear:
+                validation_cache.clear()
+            for sql in self.SQLS:
+                validate_sql(sql)
+        return (time.perf_counter() - start) * 1000 / (rounds * len(self.SQLS))
+
+    def test_repeat_is_served_from_cache(self):
+        validation_cache.clear()
+        first = validate_sql(self.SQLS[0])
+        hits = validation_cache.stats()["hits"]
+        assert validate_sql(self.SQLS[0]) is first
+        assert validation_cache.stats()["hits"] == hits + 1
+
+    def test_rejection_is_cached(self):
+        validation_cache.clear()
+        for _ in range(2):
+            with pytest.raises(SqlRejected, match="Disallowed"):
+                validate_sql("SELECT * FROM dim_worker")
+
+    def test_cost_per_query_within_budget(self):
+        assert self._avg_ms(rounds=20, clear=True) < self.UNCACHED_BUDGET_MS
+        assert self._avg_ms(rounds=200, clear=False) < self.CACHED_BUDGET_MS
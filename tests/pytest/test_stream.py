@@ -0,0 +1,113 @@
+"""
+SSE 스트리밍 단위 테스트 (LLM 호출 없음, 가짜 async 스트림 사용)
+- 토큰 대기 중에도 이벤트 루프가 다른 작업을 처리하는지
+- 소비자가 중간에 끊으면 업스트림 스트림이 닫히는지
+- 단건 답변(/chat)도 응답 대기 중 이벤트 루프를 막지 않는지
+
+실행: pytest tests/pytest/test_stream.py -v
+"""
+import asyncio
+from types import SimpleNamespace
+
+from t2sql.services.llm import llm_stream_sse
+
+
+class _FakeStream:
+    def __init__(self, chunks, delay):
+        self.chunks = chunks
+        self.delay = delay
+        self.closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.closed = True
+
+    def __aiter__(self):
+        return self._gen()
+
+    async def _gen(self):
+        for c in self.chunks:
+            await asyncio.sleep(self.delay)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=c))])
+
+
+def _patch_client(monkeypatch, stream):
+    async def create(**kwargs):
+        assert kwargs["stream"] is True
+        return stream
+
+    fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(llm_stream_sse, "async_client", fake)
+
+
+class TestLlmAnswerStream:
+    """llm_answer_stream 테스트"""
+
+    def test_does_not_block_event_loop(self, monkeypatch):
+        """스트리밍 중에도 다른 코루틴이 진행됨"""
+        _patch_client(monkeypatch, _FakeStream(["a", "b", "c"], delay=0.02))
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(1)
+                await asyncio.sleep(0.005)
+
+        async def main():
+            t = asyncio.create_task(ticker())
+            out = [c async for c in llm_stream_sse.llm_answer_stream("hi", history=[])]
+            t.cancel()
+            return out
+
+        assert asyncio.run(main()) == ["a", "b", "c"]
+        assert len(ticks) >= 5
+
+    def test_closes_upstream_on_disconnect(self, monkeypatch):
+        """소비자가 generator를 닫으면 업스트림도 닫힘"""
+        stream = _FakeStream(["a", "b", "c"], delay=0)
+        _patch_client(monkeypatch, stream)
+
+        async def main():
+            gen = llm_stream_sse.llm_answer_stream("hi", history=[])
+            first = await gen.__anext__()
+            await gen.aclose()
+            return first
+
+        assert asyncio.run(main()) == "a"
+        assert stream.closed
+
+
+class TestLlmAnswerOnceAsync:
+    """llm_answer_once_async 테스트"""
+
+    def test_does_not_block_event_loop(self, monkeypatch):
+        async def create(**kwargs):
+            assert "stream" not in kwargs
+            await asyncio.sleep(0.05)
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content="답변"))],
+                usage=SimpleNamespace(prompt_tokens=12, completion_tokens=3),
+            )
+
+        fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        monkeypatch.setattr(llm_stream_sse, "async_client", fake)
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(1)
+                await asyncio.sleep(0.005)
+
+        async def main():
+            t = asyncio.create_task(ticker())
+            usage = {}
+            answer = await llm_stream_sse.llm_answer_once_async("hi", history=[], usage=usage)
+            t.cancel()
+            return answer, usage
+
+        answer, usage = asyncio.run(main())
+        assert answer == "답변"
+        assert usage == {"prompt_tokens": 12, "completion_tokens": 3}
+        assert len(ticks) >= 5